@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from option_wiz.PricingModels import AnalyticFormula
+from option_wiz.ImpliedVolatility import ImpliedVolatilityTracker
+from option_wiz.Calibration import HestonCalibrator, MertonCalibrator
+
+BATCH_SIZES = [1, 100, 10_000, 1_000_000]
+ANALYTIC_FORMULA = AnalyticFormula()
+
+
+def chain(batch_size: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    K = rng.uniform(70, 130, batch_size)
+    return {
+        'S': 100.0,
+        'K': K,
+        'r': 0.03,
+        'sigma': rng.uniform(0.1, 0.5, batch_size),
+        'T': rng.uniform(0.05, 2.0, batch_size),
+        'option_type': np.where(K > 100, 'call', 'put'),
+    }
+
+
+@pytest.mark.benchmark(group='analytic-price')
+@pytest.mark.parametrize('batch_size', BATCH_SIZES)
+def bench_black_scholes_price(measure, batch_size):
+    measure(ANALYTIC_FORMULA.black_scholes_price, **chain(batch_size))
+
+
+@pytest.mark.benchmark(group='analytic-greeks')
+@pytest.mark.parametrize('greek', ['delta', 'gamma', 'vega', 'theta', 'rho'])
+@pytest.mark.parametrize('batch_size', BATCH_SIZES)
+def bench_greek(measure, batch_size, greek):
+    params = chain(batch_size)
+    if greek in ('gamma', 'vega'):
+        del params['option_type']
+    measure(getattr(ANALYTIC_FORMULA, greek), **params)
+
+
+@pytest.mark.benchmark(group='analytic-greeks')
+@pytest.mark.parametrize('batch_size', [1, 100, 10_000, 100_000])
+def bench_sensitivities(measure, batch_size):
+    # every first and second order Greek from one automatic differentiation sweep, every
+    # contract carries a 4 x 4 Hessian so the batch stops short of 1M
+    measure(ANALYTIC_FORMULA.sensitivities, **chain(batch_size))
+
+
+@pytest.mark.benchmark(group='implied-volatility')
+@pytest.mark.parametrize('batch_size', [1, 100, 10_000, 100_000])
+def bench_implied_volatility_newton(measure, batch_size):
+    # the scipy Newton solve of AnalyticFormula takes one option type per call and diverges
+    # from its initial guess far from the money, so it is timed on near the money calls
+    params = dict(chain(batch_size), option_type='call')
+    params['K'] = np.linspace(95, 105, batch_size)
+    option_price = ANALYTIC_FORMULA.black_scholes_price(**params)
+    measure(ANALYTIC_FORMULA.implied_volatility, params['S'], params['K'], params['r'],
+            params['T'], option_price, 'call', rounds=3)
+
+
+@pytest.mark.benchmark(group='implied-volatility')
+@pytest.mark.parametrize('warm', [False, True])
+@pytest.mark.parametrize('batch_size', [1, 100, 10_000, 100_000])
+def bench_implied_volatility_tracker(measure, batch_size, warm):
+    params = chain(batch_size)
+    sigma = params.pop('sigma')
+    option_price = ANALYTIC_FORMULA.black_scholes_price(sigma=sigma, **params)
+    keys = range(batch_size)
+
+    def solve():
+        tracker = ImpliedVolatilityTracker()
+        if warm:
+            tracker.update(keys, option_price=option_price * 1.001, **params)
+        tracker.update(keys, option_price=option_price, **params)
+
+    measure(solve, rounds=3)
+
+
+CALIBRATION_MODELS = {
+    'heston': (HestonCalibrator, {'sigma': 0.04, 'kappa': 1.5, 'theta': 0.06, 'epsilon': 0.5, 'corr': -0.7}),
+    'merton': (MertonCalibrator, {'sigma': 0.15, 'lambda_j': 0.8, 'mu_j': -0.15, 'sigma_j': 0.2}),
+}
+
+
+@pytest.mark.benchmark(group='calibration')
+@pytest.mark.parametrize('model', list(CALIBRATION_MODELS))
+def bench_calibration(measure, model):
+    """Calibration to a 13 strikes x 8 maturities chain priced by the model itself"""
+    calibrator, params = CALIBRATION_MODELS[model]
+    K = np.tile(np.linspace(70, 130, 13), 8)
+    T = np.repeat(np.linspace(0.1, 2.0, 8), 13)
+    option_price = calibrator(100.0, K, 0.03, T, np.zeros_like(K)).prices(params)
+    measure(calibrator(100.0, K, 0.03, T, option_price).calibrate, rounds=3)
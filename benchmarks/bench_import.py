@@ -0,0 +1,32 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# each statement runs in a fresh interpreter, 'pass' is the bare interpreter startup
+STATEMENTS = {
+    'interpreter': 'pass',
+    'package': 'import option_wiz',
+    'options': 'from option_wiz import EuropeanOption',
+    'first-price': 'from option_wiz import EuropeanOption; '
+                   'EuropeanOption(100, 0.05, 1.0, 100, 0.2).black_scholes_price()',
+    'monte-carlo': 'from option_wiz import EuropeanOption; '
+                   'EuropeanOption(100, 0.05, 1.0, 100, 0.2).monte_carlo_pricing(num_sims=100)',
+}
+HEAVY_MODULES = ('scipy.stats', 'scipy.optimize', 'scipy.special')
+
+
+def _run(statement: str) -> str:
+    report = "import sys; print(','.join(m for m in %r if m in sys.modules))" % (HEAVY_MODULES,)
+    return subprocess.run([sys.executable, '-c', f'{statement}\n{report}'], cwd=ROOT,
+                          check=True, capture_output=True, text=True).stdout.strip()
+
+
+@pytest.mark.benchmark(group='cold-import')
+@pytest.mark.parametrize('name', list(STATEMENTS))
+def bench_cold_import(benchmark, name):
+    benchmark.extra_info['heavy_modules_loaded'] = _run(STATEMENTS[name])
+    benchmark.pedantic(_run, args=(STATEMENTS[name],), rounds=5, iterations=1)
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from option_wiz.PayOff import PayOffEuropean, PayOffBasket
+from option_wiz.PricingModels import MonteCarlo, StochasticVolatility, MultiAssetMonteCarlo
+from option_wiz.Multilevel import MultilevelMonteCarlo
+from option_wiz.backends import available_backends, get_backend, set_backend
+
+S0, K, R, SIGMA = 100.0, 100.0, 0.05, 0.2
+NUM_SIMS = [1_000, 10_000]
+MATURITIES = [0.1, 0.5]
+DTYPES = ['float64', 'float32']
+
+
+def engine(model: str, T: float, dtype: str):
+    pay_off = PayOffEuropean(K, 'call')
+    if model == 'gbm':
+        return MonteCarlo(S0, K, R, SIGMA, T, pay_off, lambda_j=0.0, dtype=dtype)
+    if model == 'merton':
+        return MonteCarlo(S0, K, R, SIGMA, T, pay_off, dtype=dtype)
+    return StochasticVolatility(S0, K, R, T, SIGMA ** 2, -0.7, 0.3, 2.0, SIGMA ** 2, pay_off,
+                                dtype=dtype)
+
+
+@pytest.mark.benchmark(group='monte-carlo-price')
+@pytest.mark.parametrize('dtype', DTYPES)
+@pytest.mark.parametrize('T', MATURITIES)
+@pytest.mark.parametrize('num_sims', NUM_SIMS)
+@pytest.mark.parametrize('model', ['gbm', 'merton', 'heston'])
+def bench_option_price(measure, model, num_sims, T, dtype):
+    measure(engine(model, T, dtype).option_price, num_sims, rounds=3)
+
+
+@pytest.mark.benchmark(group='monte-carlo-greeks')
+@pytest.mark.parametrize('model', ['gbm', 'merton', 'heston'])
+def bench_simulator_greeks(measure, model):
+    measure(engine(model, 0.1, 'float64').greeks, 1_000, rounds=3)
+
+
+@pytest.mark.benchmark(group='monte-carlo-model-pricing')
+@pytest.mark.parametrize('num_sims', NUM_SIMS)
+def bench_model_pricing_pre_sampled(measure, num_sims):
+    """MonteCarlo._model_pricing alone, with the draws sampled outside the timing"""
+    model = engine('merton', 0.1, 'float64')
+    np.random.seed(0)
+    params = model._get_pricing_params(num_sims)
+    measure(model._model_pricing, rounds=5, **params)
+
+
+@pytest.fixture(params=available_backends())
+def backend(request):
+    previous = get_backend().name
+    yield set_backend(request.param)
+    set_backend(previous)
+
+
+@pytest.mark.benchmark(group='backend-model-pricing')
+@pytest.mark.parametrize('model', ['gbm', 'merton', 'heston'])
+def bench_backend_model_pricing(measure, backend, model):
+    """_model_pricing on pre-sampled draws per compute backend, compiled kernels warmed up"""
+    simulator = engine(model, 0.5, 'float64')
+    np.random.seed(0)
+    params = simulator._get_pricing_params(10_000)
+    simulator._model_pricing(**params)
+    measure(simulator._model_pricing, rounds=3, **params)
+
+
+@pytest.mark.benchmark(group='multi-asset-basket')
+@pytest.mark.parametrize('num_sims', [100_000, 1_000_000])
+@pytest.mark.parametrize('n_assets', [5, 50])
+def bench_multi_asset_basket(measure, n_assets, num_sims):
+    """Terminal mode basket call on equally weighted, 40% correlated assets"""
+    correlation = np.full((n_assets, n_assets), 0.4)
+    np.fill_diagonal(correlation, 1.0)
+    simulator = MultiAssetMonteCarlo(np.full(n_assets, S0), K, R, np.linspace(0.15, 0.35, n_assets),
+                                     1.0, PayOffBasket(K, 'call', np.full(n_assets, 1 / n_assets)),
+                                     correlation)
+    measure(simulator.option_price, num_sims, rounds=1)
+
+
+@pytest.mark.benchmark(group='multilevel')
+@pytest.mark.parametrize('rmse', [0.05, 0.02])
+@pytest.mark.parametrize('model', ['merton', 'heston'])
+def bench_multilevel(measure, model, rmse):
+    """Multilevel Monte Carlo price of a one year call to a target root mean square error"""
+    measure(MultilevelMonteCarlo(engine(model, 1.0, 'float64')).option_price, rmse, rounds=1)
@@ -0,0 +1,26 @@
+import sys
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture
+def measure(benchmark):
+    """Benchmarks fn and records the peak traced memory of one extra call in extra_info"""
+
+    def run(fn, *args, rounds: int = None, **kwargs):
+        np.random.seed(0)
+        tracemalloc.start()
+        fn(*args, **kwargs)
+        benchmark.extra_info['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        if rounds is None:
+            return benchmark(fn, *args, **kwargs)
+        return benchmark.pedantic(fn, args=args, kwargs=kwargs, rounds=rounds, iterations=1)
+
+    return run
@@ -0,0 +1,73 @@
+"""Accuracy/speed tradeoff of the float32 simulation mode.
+
+Prices an at-the-money European call with every Simulator engine in float64 and in
+float32 over several seeds and reports the mean wall time, the price, the Monte Carlo
+standard error across seeds and, where a closed form exists, the error against it.
+
+    python benchmarks/float32_tradeoff.py
+"""
+import sys
+import time
+from math import factorial
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from option_wiz.PayOff import PayOffEuropean  # noqa: E402
+from option_wiz.PricingModels import AnalyticFormula, MonteCarlo, StochasticVolatility  # noqa: E402
+
+S0, K, R, SIGMA, T = 100.0, 100.0, 0.05, 0.2, 0.25
+LAMBDA_J, MU_J, SIGMA_J = 0.1, -0.2, 0.3
+SEEDS = range(5)
+
+
+def merton_reference(n_terms: int = 20) -> float:
+    """Series price of the jump diffusion simulated by quant_math.merton_jump_diff"""
+    analytic = AnalyticFormula()
+    price = 0.0
+    for n in range(n_terms):
+        weight = np.exp(- LAMBDA_J * T) * (LAMBDA_J * T) ** n / factorial(n)
+        sigma_n = np.sqrt(SIGMA ** 2 + n * SIGMA_J ** 2 / T)
+        S_n = S0 * np.exp(n * (MU_J + SIGMA_J ** 2 / 2))
+        price += weight * analytic.black_scholes_price(S_n, K, R, sigma_n, T)
+    return price
+
+
+ENGINES = {
+    'gbm': (lambda dtype: MonteCarlo(S0, K, R, SIGMA, T, PayOffEuropean(K, 'call'),
+                                     lambda_j=0.0, dtype=dtype),
+            AnalyticFormula().black_scholes_price(S0, K, R, SIGMA, T)),
+    'merton': (lambda dtype: MonteCarlo(S0, K, R, SIGMA, T, PayOffEuropean(K, 'call'),
+                                        LAMBDA_J, MU_J, SIGMA_J, dtype=dtype),
+               merton_reference()),
+    'heston': (lambda dtype: StochasticVolatility(S0, K, R, T, SIGMA ** 2, -0.7, 0.3, 2.0,
+                                                  SIGMA ** 2, PayOffEuropean(K, 'call'),
+                                                  dtype=dtype),
+               None),
+}
+
+
+def main(num_sims_list=(10_000, 50_000)) -> None:
+    print(f"{'engine':<8}{'dtype':<9}{'num_sims':>9}{'seconds':>10}{'price':>10}"
+          f"{'std err':>10}{'abs err':>10}")
+    for name, (build, reference) in ENGINES.items():
+        for num_sims in num_sims_list:
+            for dtype in (np.float64, np.float32):
+                engine = build(dtype)
+                prices, seconds = [], []
+                for seed in SEEDS:
+                    np.random.seed(seed)
+                    start = time.perf_counter()
+                    prices.append(engine.option_price(num_sims))
+                    seconds.append(time.perf_counter() - start)
+                price = np.mean(prices)
+                std_err = np.std(prices, ddof=1) / np.sqrt(len(prices))
+                error = f"{abs(price - reference):>10.4f}" if reference is not None else f"{'-':>10}"
+                print(f"{name:<8}{np.dtype(dtype).name:<9}{num_sims:>9}{np.mean(seconds):>10.4f}"
+                      f"{price:>10.4f}{std_err:>10.4f}{error}")
+
+
+if __name__ == '__main__':
+    main()
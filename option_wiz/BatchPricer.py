@@ -0,0 +1,302 @@
+import argparse
+import itertools
+import os
+import struct
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .Curves import RateCurve, zero_rate, discount_factor
+from .PricingModels import AnalyticFormula
+from .ImpliedVolatility import ImpliedVolatilityTracker
+
+FIELDS = ('price', 'delta', 'gamma', 'vega', 'theta', 'rho', 'implied_volatility')
+COLUMNS = ('S', 'K', 'r', 'q', 'sigma', 'T', 'option_type', 'option_price')
+
+# input columns every output field is computed from, option_type defaults to 'call' and q to 0
+_REQUIRED = {field: ('S', 'K', 'r', 'sigma', 'T') for field in FIELDS}
+_REQUIRED['implied_volatility'] = ('S', 'K', 'r', 'T', 'option_price')
+
+
+def _option_types(column) -> np.array:
+    """Returns 'call'/'put' strings from a column of strings, bytes or signs (+1 call, -1 put)"""
+
+    column = np.asarray(column)
+    if column.dtype.kind in 'fiu':
+        return np.where(column > 0, 'call', 'put')
+    if column.dtype.kind == 'S':
+        column = column.astype(str)
+    return np.char.lower(np.char.strip(column))
+
+
+def _price_chunk(columns: dict, fields: tuple, rate_curve: RateCurve = None,
+                 dividend_curve: RateCurve = None) -> np.array:
+    """Prices one chunk of contracts, returns a (len(fields), rows) array. The curves, when
+    given, take the place of the r and q columns"""
+
+    analytic_formula = AnalyticFormula()
+    option_type = _option_types(columns['option_type']) if 'option_type' in columns else 'call'
+    S, K, T = columns['S'], columns['K'], columns['T']
+    r = columns['r'] if rate_curve is None else rate_curve
+    q = columns.get('q', 0.0) if dividend_curve is None else dividend_curve
+    sigma = columns.get('sigma')
+
+    values = np.empty((len(fields), len(S)))
+    for row, field in enumerate(fields):
+        if field == 'price':
+            values[row] = analytic_formula.black_scholes_price(S, K, r, sigma, T, option_type, q)
+        elif field in ('delta', 'theta', 'rho'):
+            values[row] = getattr(analytic_formula, field)(S, K, r, sigma, T, option_type, q)
+        elif field in ('gamma', 'vega'):
+            values[row] = getattr(analytic_formula, field)(S, K, r, sigma, T, q)
+        else:
+            # the tracker prices without dividends, on the dividend discounted spot
+            values[row] = ImpliedVolatilityTracker().update(
+                range(len(S)), S * discount_factor(q, T), K, zero_rate(r, T), T,
+                columns['option_price'], option_type)
+    return values
+
+
+def _npz_memmaps(path: str) -> dict:
+    """Memory maps every member of an uncompressed .npz archive without reading it"""
+
+    columns = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as file:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path} is compressed and cannot be memory mapped, "
+                                 "write it with np.savez rather than np.savez_compressed.")
+            # the member's data follows its 30 byte local header, file name and extra field
+            file.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', file.read(4))
+            file.seek(info.header_offset + 30 + name_length + extra_length)
+
+            version = np.lib.format.read_magic(file)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) \
+                else np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(file)
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            columns[name] = np.memmap(
+                path, dtype=dtype, mode='r', offset=file.tell(), shape=shape,
+                order='F' if fortran_order else 'C')
+    return columns
+
+
+def _array_chunks(columns: dict, chunk_size: int):
+    """Yields (start, columns) chunks sliced out of memory mapped columns"""
+
+    rows = len(next(iter(columns.values())))
+    for start in range(0, rows, chunk_size):
+        yield start, {name: np.array(column[start:start + chunk_size])
+                      for name, column in columns.items()}
+
+
+def _csv_chunks(path: str, chunk_size: int):
+    """Yields (start, columns) chunks parsed from a CSV file with a header row, columns
+    other than COLUMNS, e.g. a ticker, are skipped"""
+
+    with open(path, 'r') as file:
+        header = [name.strip() for name in file.readline().split(',')]
+        usecols = [column for column, name in enumerate(header) if name in COLUMNS]
+        names = [header[column] for column in usecols]
+        # option types are parsed straight to a sign so every column stays numeric
+        converters = {header.index('option_type'): lambda value: 1.0 if value.strip().lower() == 'call'
+                      else -1.0} if 'option_type' in names else None
+
+        start = 0
+        while True:
+            lines = list(itertools.islice(file, chunk_size))
+            if not lines:
+                return
+            table = np.loadtxt(lines, delimiter=',', usecols=usecols, converters=converters,
+                               ndmin=2)
+            yield start, {name: table[:, column] for column, name in enumerate(names)}
+            start += len(lines)
+
+
+def _count_csv_rows(path: str) -> int:
+    """Counts the rows below the header without parsing them"""
+
+    lines, last = 0, b'\n'
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 24), b''):
+            lines += block.count(b'\n')
+            last = block
+    return max(lines + (not last.endswith(b'\n')) - 1, 0)
+
+
+class BatchPricer():
+    """Streams a chain file through the vectorized analytic pricer in fixed-size chunks.
+
+    Inputs are a CSV file with a header row, a structured .npy array or an uncompressed .npz
+    archive with one array per column. Columns are named S, K, r, q, sigma, T, option_type
+    ('call'/'put', or +1/-1 in numeric files) and option_price, the latter only needed for
+    implied volatility, and q, the dividend yield, defaults to 0. A YieldCurve or a
+    DividendCurve replaces the r or q column, every contract reading the curve at its own
+    maturity. Array inputs are memory mapped, and chunks are priced by a process
+    pool with a bounded number of chunks in flight, so memory stays constant with file size.
+    Results are written chunk by chunk, in input order, to a CSV file or a structured .npy
+    array with one field per output.
+
+    Parameters
+    ----------
+    fields : (tuple) outputs among price, delta, gamma, vega, theta, rho and implied_volatility
+
+    chunk_size : (int) rows priced per chunk
+
+    workers : (int) processes of the pool, 0 prices every chunk in the calling process
+
+    rate_curve : (YieldCurve) risk-free curve used in place of the r column
+
+    dividend_curve : (DividendCurve) dividend yield curve used in place of the q column"""
+
+    def __init__(self, fields: tuple = FIELDS[:-1], chunk_size: int = 100_000,
+                 workers: int = None, rate_curve: RateCurve = None,
+                 dividend_curve: RateCurve = None) -> None:
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields {sorted(unknown)}, expected some of {FIELDS}.")
+        self.fields = tuple(fields)
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.rate_curve = rate_curve
+        self.dividend_curve = dividend_curve
+
+    def _open(self, input_path: str):
+        """Returns the chunk iterator and row count of input_path"""
+
+        if input_path.endswith('.csv'):
+            return _csv_chunks(input_path, self.chunk_size), _count_csv_rows(input_path)
+
+        if input_path.endswith('.npz'):
+            columns = _npz_memmaps(input_path)
+        elif input_path.endswith('.npy'):
+            table = np.load(input_path, mmap_mode='r')
+            if table.dtype.names is None:
+                raise ValueError(f"{input_path} must hold a structured array with one field per column.")
+            columns = {name: table[name] for name in table.dtype.names}
+        else:
+            raise ValueError("Input files must end with .csv, .npy or .npz.")
+        columns = {name: column for name, column in columns.items() if name in COLUMNS}
+        if not columns:
+            raise ValueError(f"{input_path} holds no columns.")
+        return _array_chunks(columns, self.chunk_size), len(next(iter(columns.values())))
+
+    def _check_columns(self, columns: dict) -> None:
+        provided = set(columns) | ({'r'} if self.rate_curve is not None else set())
+        missing = sorted({name for field in self.fields for name in _REQUIRED[field]} - provided)
+        if missing:
+            raise ValueError(f"Input is missing the columns {missing} needed for {self.fields}.")
+
+    def run(self, input_path: str, output_path: str) -> dict:
+        """Prices every row of input_path and writes the fields to output_path
+
+        Parameters
+        ----------
+            input_path : (str) .csv, .npy or .npz chain file
+
+            output_path : (str) .csv or .npy file the results are written to
+
+        Returns
+        -------
+            summary : (dict) rows, chunks, seconds and rows_per_second of the run"""
+
+        if not output_path.endswith(('.csv', '.npy')):
+            raise ValueError("Output files must end with .csv or .npy.")
+
+        start_time = time.perf_counter()
+        chunks, rows = self._open(input_path)
+
+        if output_path.endswith('.npy'):
+            output = np.lib.format.open_memmap(
+                output_path, mode='w+', dtype=[(field, np.float64) for field in self.fields],
+                shape=(rows,))
+        else:
+            output = open(output_path, 'w')
+            output.write(','.join(self.fields) + '\n')
+
+        def write(start: int, values: np.array) -> None:
+            if isinstance(output, np.memmap):
+                for field, column in zip(self.fields, values):
+                    output[field][start:start + column.size] = column
+            else:
+                np.savetxt(output, values.T, delimiter=',', fmt='%.10g')
+
+        workers = os.cpu_count() if self.workers is None else self.workers
+        pool = ProcessPoolExecutor(workers) if workers > 0 else None
+        max_pending = 2 * workers
+        pending = deque()
+        num_chunks = 0
+        try:
+            for start, columns in chunks:
+                if num_chunks == 0:
+                    self._check_columns(columns)
+                num_chunks += 1
+                if pool is None:
+                    write(start, _price_chunk(columns, self.fields, self.rate_curve,
+                                              self.dividend_curve))
+                    continue
+                # at most max_pending chunks are held in memory, results are written in order
+                if len(pending) >= max_pending:
+                    done_start, future = pending.popleft()
+                    write(done_start, future.result())
+                pending.append((start, pool.submit(_price_chunk, columns, self.fields,
+                                                   self.rate_curve, self.dividend_curve)))
+            while pending:
+                done_start, future = pending.popleft()
+                write(done_start, future.result())
+        finally:
+            if pool is not None:
+                # shutdown(cancel_futures=True) needs Python 3.9, chunks not started are
+                # cancelled by hand so an error does not wait for the rest of the file
+                for _, future in pending:
+                    future.cancel()
+                pool.shutdown(wait=True)
+            if isinstance(output, np.memmap):
+                output.flush()
+            else:
+                output.close()
+
+        seconds = time.perf_counter() - start_time
+        return {'rows': rows, 'chunks': num_chunks, 'seconds': seconds,
+                'rows_per_second': rows / seconds if seconds > 0 else float('inf')}
+
+
+def main(argv: list = None) -> int:
+    """Command line entry point, see option-wiz-price --help"""
+
+    parser = argparse.ArgumentParser(
+        prog='option-wiz-price',
+        description="Prices a chain file with Black-Scholes in streamed chunks. Input columns are "
+                    "S, K, r, q (optional), sigma, T, option_type and option_price (implied "
+                    "volatility only).")
+    parser.add_argument('input', help=".csv, structured .npy or uncompressed .npz chain file")
+    parser.add_argument('output', help=".csv or .npy file the results are written to")
+    parser.add_argument('--fields', default=','.join(FIELDS[:-1]),
+                        help=f"comma separated outputs among {','.join(FIELDS)}")
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="rows priced per chunk")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="pool processes, 0 prices in the calling process (default: CPU count)")
+    parser.add_argument('--quiet', action='store_true', help="do not report the throughput")
+    args = parser.parse_args(argv)
+
+    try:
+        pricer = BatchPricer([field.strip() for field in args.fields.split(',')],
+                             args.chunk_size, args.workers)
+        summary = pricer.run(args.input, args.output)
+    except (OSError, ValueError) as error:
+        parser.exit(1, f"option-wiz-price: error: {error}\n")
+
+    if not args.quiet:
+        print(f"priced {summary['rows']} rows in {summary['chunks']} chunks, "
+              f"{summary['seconds']:.2f}s, {summary['rows_per_second']:,.0f} rows/sec",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
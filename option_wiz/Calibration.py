@@ -0,0 +1,259 @@
+import os
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .quant_math import norm_cdf
+from .utils import option_type_sign
+
+
+class Calibrator(ABC):
+    """Base class of the calibration of a pricing model to a chain of option quotes.
+
+    The quotes are fixed when the calibrator is built, so everything that only depends on
+    them, e.g. quadrature nodes, strike and maturity terms, is computed once and reused by
+    every evaluation of the objective. _prices prices the whole chain for a batch of
+    parameter vectors in one vectorized call, which also gives the Jacobian of the least
+    squares problem as a single call on the bumped parameters.
+
+    Parameters
+    ----------
+    S : (float) underlying price
+
+    K : (np.array) strike prices of the quotes
+
+    r : (float) risk-free rate, 0.05 means 5%
+
+    T : (np.array) times till maturity in years of the quotes
+
+    option_price : (np.array) quoted option prices
+
+    option_type : (str or np.array) 'call' or 'put', for all quotes or per quote
+
+    weights : (np.array) optional weight of every quote's price error"""
+
+    # names of the calibrated parameters, as the keyword arguments of the simulator
+    PARAMS = ()
+    # (lower, upper) bounds of every parameter
+    BOUNDS = ()
+
+    def __init__(self, S: float, K, r: float, T, option_price, option_type='call',
+                 weights=None) -> None:
+        self.S = S
+        self.r = r
+        self.K = np.asarray(K, dtype=np.float64)
+        self.T = np.broadcast_to(np.asarray(T, dtype=np.float64), self.K.shape)
+        self.option_price = np.asarray(option_price, dtype=np.float64)
+        self.sign = np.broadcast_to(option_type_sign(option_type), self.K.shape)
+        self.weights = np.ones_like(self.K) if weights is None else np.asarray(weights, dtype=np.float64)
+
+        # quotes share few maturities, maturity terms are computed per unique maturity
+        self.maturities, self.maturity_index = np.unique(self.T, return_inverse=True)
+        self.discount = np.exp(- r * self.T)
+
+    @abstractmethod
+    def _prices(self, params: np.array) -> np.array:
+        """Returns the (batch, n_quotes) model prices of a (batch, n_params) parameter batch"""
+        pass
+
+    def prices(self, params) -> np.array:
+        """Returns the model price of every quote
+
+        Parameters
+        ----------
+            params : (dict or np.array) model parameters, by name or in the order of PARAMS
+
+        Returns
+        -------
+            prices : (np.array) model price of every quote"""
+
+        if isinstance(params, dict):
+            params = [params[name] for name in self.PARAMS]
+        return self._prices(np.asarray(params, dtype=np.float64)[np.newaxis])[0]
+
+    def _residuals(self, x: np.array) -> np.array:
+        return self.weights * (self._prices(x[np.newaxis])[0] - self.option_price)
+
+    def _jacobian(self, x: np.array) -> np.array:
+        """Forward differences of the residuals, the chain being priced once for x and every
+        bumped parameter vector together"""
+
+        upper = np.array([bound[1] for bound in self.BOUNDS])
+        steps = 1e-6 * np.maximum(1.0, np.abs(x))
+        # bumps at the upper bound go downwards
+        steps = np.where(x + steps > upper, -steps, steps)
+        batch = np.vstack([x, x + np.diag(steps)])
+        prices = self._prices(batch)
+        return (self.weights * (prices[1:] - prices[0])).T / steps
+
+    def _solve(self, x0: np.array) -> dict:
+        from scipy.optimize import least_squares
+
+        lower, upper = np.array(self.BOUNDS).T
+        result = least_squares(self._residuals, np.clip(x0, lower, upper), jac=self._jacobian,
+                               bounds=(lower, upper), x_scale='jac', ftol=1e-12, xtol=1e-12,
+                               gtol=1e-12, max_nfev=500)
+        return {
+            'params': dict(zip(self.PARAMS, result.x.tolist())),
+            'rmse': float(np.sqrt(np.mean(result.fun ** 2))),
+            'evaluations': int(result.nfev),
+            'success': bool(result.success),
+        }
+
+    def calibrate(self, x0=None, starts: int = 1, workers: int = 0, seed: int = None) -> dict:
+        """Fits the model parameters to the quotes by bounded non-linear least squares
+
+        Parameters
+        ----------
+            x0 : (dict or np.array) initial parameters, the middle of the bounds by default
+
+            starts : (int) number of starting points, the ones after x0 drawn uniformly
+                     within the bounds, the best fit is kept
+
+            workers : (int) processes solving the starts in parallel, 0 solves them in the
+                      calling process and None uses every cpu
+
+            seed : (int) seed of the random starting points
+
+        Returns
+        -------
+            calibration : (dict) params of the best fit by name, its weighted price rmse, the
+                          number of objective evaluations, success, the seconds of wall time
+                          taken and the rmse of every start"""
+
+        started = time.perf_counter()
+        lower, upper = np.array(self.BOUNDS).T
+        if x0 is None:
+            x0 = (lower + upper) / 2
+        elif isinstance(x0, dict):
+            x0 = np.array([x0[name] for name in self.PARAMS], dtype=np.float64)
+        rng = np.random.default_rng(seed)
+        initial = [np.asarray(x0, dtype=np.float64)] + \
+            [rng.uniform(lower, upper) for _ in range(starts - 1)]
+
+        workers = os.cpu_count() if workers is None else workers
+        if workers > 0 and len(initial) > 1:
+            with ProcessPoolExecutor(min(workers, len(initial))) as pool:
+                results = list(pool.map(self._solve, initial))
+        else:
+            results = [self._solve(x) for x in initial]
+
+        best = dict(min(results, key=lambda result: result['rmse']))
+        best['evaluations'] = sum(result['evaluations'] for result in results)
+        best['seconds'] = time.perf_counter() - started
+        best['start_rmse'] = [result['rmse'] for result in results]
+        return best
+
+
+class HestonCalibrator(Calibrator):
+    """Calibrates StochasticVolatility's initial variance sigma, kappa, theta, epsilon and corr.
+
+    The chain is priced with Lewis' formula
+
+        C = S - sqrt(F K) e^(-rT) / pi * integral Re[e^(iu log(F / K)) phi_T(u - i/2)] / (u^2 + 1/4) du
+
+    F = S e^(rT) being the forward and phi_T Heston's characteristic function of log(S_T / S) - rT, in the form of Albrecher
+    et al. that stays on the principal branch of the logarithm. The integral is a Gauss-Legendre
+    quadrature on [0, u_max]: the nodes and every quote's e^(iu log(F / K)) / (u^2 + 1/4)
+    kernel are fixed by the quotes and computed once, an evaluation of the objective computes
+    phi_T on the nodes once per maturity and reduces it against the kernels. Puts follow from
+    put-call parity.
+
+    Parameters
+    ----------
+    S, K, r, T, option_price, option_type, weights : as in Calibrator
+
+    n_nodes : (int) quadrature nodes
+
+    u_max : (float) upper limit of the integral"""
+
+    PARAMS = ('sigma', 'kappa', 'theta', 'epsilon', 'corr')
+    BOUNDS = ((1e-4, 1.0), (1e-3, 10.0), (1e-4, 1.0), (1e-3, 2.0), (-0.99, 0.99))
+
+    def __init__(self, S: float, K, r: float, T, option_price, option_type='call',
+                 weights=None, n_nodes: int = 128, u_max: float = 200.0) -> None:
+        super().__init__(S, K, r, T, option_price, option_type, weights)
+
+        nodes, node_weights = np.polynomial.legendre.leggauss(n_nodes)
+        self.u = u_max / 2 * (nodes + 1)
+        # phi_T is evaluated at u - i/2
+        self.z = self.u - 0.5j
+        log_moneyness = np.log(S / self.K) + r * self.T
+        self.kernel = (u_max / 2 * node_weights / (self.u ** 2 + 0.25)) * \
+            np.exp(1j * np.outer(log_moneyness, self.u))
+        # sqrt(F K) e^(-rT) with the forward F = S e^(rT)
+        self.scale = np.sqrt(S * self.K * np.exp(r * self.T)) * self.discount / np.pi
+        self.parity = np.where(self.sign > 0, 0.0, S - self.K * self.discount)
+
+    def characteristic_function(self, params: np.array) -> np.array:
+        """Returns phi_T(u - i/2) as a (batch, n_maturities, n_nodes) array for a
+        (batch, n_params) batch of parameters"""
+
+        v0, kappa, theta, epsilon, corr = (params[:, i, np.newaxis, np.newaxis] for i in range(5))
+        z = self.z
+        T = self.maturities[np.newaxis, :, np.newaxis]
+
+        beta = kappa - corr * epsilon * 1j * z
+        d = np.sqrt(beta ** 2 + epsilon ** 2 * (1j * z + z ** 2))
+        g = (beta - d) / (beta + d)
+        decay = np.exp(- d * T)
+        C = kappa * theta / epsilon ** 2 * ((beta - d) * T - 2 * np.log((1 - g * decay) / (1 - g)))
+        D = (beta - d) / epsilon ** 2 * (1 - decay) / (1 - g * decay)
+        return np.exp(C + D * v0)
+
+    def _prices(self, params: np.array) -> np.array:
+        phi = self.characteristic_function(params)[:, self.maturity_index]
+        integral = np.einsum('bqn,qn->bq', phi, self.kernel).real
+        return self.S - self.scale * integral - self.parity
+
+
+class MertonCalibrator(Calibrator):
+    """Calibrates MonteCarlo's diffusion volatility sigma and jump parameters lambda_j, mu_j and
+    sigma_j to prices of the engine's model, in which log(S_T / S) is
+    (r - sigma^2 / 2) T + sigma W_T plus a compound Poisson sum of N(mu_j, sigma_j) jumps.
+
+    Conditionally on k jumps the terminal price is lognormal, so the chain is priced as the
+    Poisson weighted series of n_terms Black-Scholes like prices, every quote and number of
+    jumps being one element of a single array expression. The log strikes, maturities and
+    log factorials of the series are computed once.
+
+    Parameters
+    ----------
+    S, K, r, T, option_price, option_type, weights : as in Calibrator
+
+    n_terms : (int) numbers of jumps 0 to n_terms - 1 kept in the series"""
+
+    PARAMS = ('sigma', 'lambda_j', 'mu_j', 'sigma_j')
+    BOUNDS = ((1e-3, 1.0), (0.0, 5.0), (-1.0, 1.0), (1e-3, 1.0))
+
+    def __init__(self, S: float, K, r: float, T, option_price, option_type='call',
+                 weights=None, n_terms: int = 40) -> None:
+        super().__init__(S, K, r, T, option_price, option_type, weights)
+        from scipy.special import gammaln
+
+        self.jumps = np.arange(n_terms, dtype=np.float64)
+        self.log_factorial = gammaln(self.jumps + 1)
+        self.log_strike = np.log(self.K)[:, np.newaxis]
+        self.maturity = self.T[:, np.newaxis]
+        self.log_forward = (np.log(S) + r * self.T)[:, np.newaxis]
+
+    def _prices(self, params: np.array) -> np.array:
+        sigma, lambda_j, mu_j, sigma_j = (params[:, i, np.newaxis, np.newaxis] for i in range(4))
+        T, k = self.maturity, self.jumps
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Poisson weights of 0 to n_terms - 1 jumps, 0 ** 0 = 1 without jumps
+            log_weights = k * np.log(lambda_j * T) - lambda_j * T - self.log_factorial
+        weights = np.where((lambda_j == 0) & (k == 0), 1.0, np.exp(log_weights))
+
+        variance = sigma ** 2 * T + k * sigma_j ** 2
+        mean = self.log_forward - sigma ** 2 / 2 * T + k * mu_j
+        std = np.sqrt(variance)
+        d_1 = (mean + variance - self.log_strike) / std
+        d_2 = d_1 - std
+        sign = self.sign[:, np.newaxis]
+        prices = sign * (np.exp(mean + variance / 2) * norm_cdf(sign * d_1)
+                         - self.K[:, np.newaxis] * norm_cdf(sign * d_2))
+        return self.discount * np.sum(weights * prices, axis=-1)
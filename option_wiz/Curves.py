@@ -0,0 +1,141 @@
+import numpy as np
+
+from typing import Sequence
+
+
+class RateCurve():
+    """Term structure of continuously compounded rates
+
+    The log discount factor -integral of the rate is linear between the knots, i.e. forward
+    rates are flat between them and the last one is extended past the final knot. The knot
+    times, log discount factors and forwards are precomputed, together with the knot index of
+    every cell of a uniform grid no coarser than the closest knots: a lookup reads the cell of
+    T, which holds at most one knot, and moves at most one segment, so discount factors, zero
+    and forward rates of a whole book of maturities come from O(1) vectorized work per
+    maturity whatever the number of knots.
+
+        curve = YieldCurve([0.25, 1, 5, 10], [0.040, 0.042, 0.045, 0.047])
+        curve.discount(book_maturities)
+
+    Parameters
+    ----------
+    times : (np.array) increasing knot times in years
+
+    rates : (np.array or float) zero rates to the knots, 0.05 means 5%"""
+
+    def __init__(self, times: Sequence[float], rates) -> None:
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+        rates = np.broadcast_to(np.asarray(rates, dtype=np.float64), times.shape)
+        if times.ndim != 1 or times[0] <= 0 or np.any(np.diff(times) <= 0):
+            raise ValueError("Curve knot times must be positive and strictly increasing.")
+        self.knots = times
+        self.rates = rates.copy()
+
+        self.times = np.concatenate([[0.0], times])
+        self.log_discounts = np.concatenate([[0.0], - rates * times])
+        forwards = - np.diff(self.log_discounts) / np.diff(self.times)
+        # index i holds the forward from knot i, the last one past the final knot
+        self.forwards = np.append(forwards, forwards[-1])
+
+        self._step = np.min(np.diff(self.times))
+        grid = np.arange(int(np.ceil(self.times[-1] / self._step)) + 1) * self._step
+        self._cells = np.searchsorted(self.times, grid, side='right') - 1
+
+    @classmethod
+    def flat(cls, rate: float) -> 'RateCurve':
+        """Returns the curve of a constant rate"""
+        return cls([1.0], [rate])
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.knots.tolist()}, {self.rates.tolist()})"
+
+    def _index(self, T: np.array) -> np.array:
+        """Returns the segment of every T, knot i starting segment i"""
+
+        cells = np.minimum((T / self._step).astype(np.intp), len(self._cells) - 1)
+        index = self._cells[cells]
+        # the cell's knot, and rounding of T / step at its edges, move T by one segment
+        last = len(self.times) - 1
+        index += (index < last) & (T >= self.times[np.minimum(index + 1, last)])
+        index -= (index > 0) & (T < self.times[index])
+        return index
+
+    def _lookup(self, T) -> tuple:
+        T = np.maximum(np.asarray(T, dtype=np.float64), 0.0)
+        return T, self._index(T)
+
+    @staticmethod
+    def _result(values: np.array):
+        return values if values.ndim else float(values)
+
+    def log_discount(self, T) -> np.array:
+        """Returns the log discount factor to T, -integral of the rate from 0 to T"""
+
+        T, index = self._lookup(T)
+        return self._result(self.log_discounts[index] - self.forwards[index] * (T - self.times[index]))
+
+    def discount(self, T) -> np.array:
+        """Returns the discount factor to T"""
+        return self._result(np.exp(self.log_discount(T)))
+
+    def zero_rate(self, T) -> np.array:
+        """Returns the continuously compounded zero rate to T, the first forward at T = 0"""
+
+        T, index = self._lookup(T)
+        log_discount = self.log_discounts[index] - self.forwards[index] * (T - self.times[index])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = np.where(T > 0, - log_discount / T, self.forwards[0])
+        return self._result(rates)
+
+    def forward_rate(self, T) -> np.array:
+        """Returns the instantaneous forward rate at T"""
+        return self._result(self.forwards[self._lookup(T)[1]])
+
+    # a shift by a number moves the whole curve, curves combine knot by knot
+
+    def __add__(self, other) -> 'RateCurve':
+        if isinstance(other, RateCurve):
+            # between the last two knots of the union both curves run at their last forward,
+            # so the combined curve extends exactly
+            knots = np.union1d(self.knots, other.knots)
+            return RateCurve(knots, self.zero_rate(knots) + other.zero_rate(knots))
+        return type(self)(self.knots, self.rates + other)
+
+    __radd__ = __add__
+
+    def __neg__(self) -> 'RateCurve':
+        return type(self)(self.knots, - self.rates)
+
+    def __sub__(self, other) -> 'RateCurve':
+        return self + (- other)
+
+    def __rsub__(self, other) -> 'RateCurve':
+        return (- self) + other
+
+
+class YieldCurve(RateCurve):
+    """Risk-free rates discounting the cash flows and drifting the simulated prices, see RateCurve"""
+
+
+class DividendCurve(RateCurve):
+    """Continuous dividend yields of the underlying, see RateCurve"""
+
+
+def zero_rate(rate, T):
+    """Returns the zero rate to T of a rate given as a number or a RateCurve"""
+    return rate.zero_rate(T) if isinstance(rate, RateCurve) else rate
+
+
+def forward_rate(rate, T):
+    """Returns the instantaneous forward rate at T of a rate given as a number or a RateCurve"""
+    return rate.forward_rate(T) if isinstance(rate, RateCurve) else rate
+
+
+def log_growth(rate, T):
+    """Returns the integral of the rate from 0 to T, rate * T for a number"""
+    return - rate.log_discount(T) if isinstance(rate, RateCurve) else rate * T
+
+
+def discount_factor(rate, T):
+    """Returns the discount factor to T of a rate given as a number or a RateCurve"""
+    return rate.discount(T) if isinstance(rate, RateCurve) else np.exp(- rate * T)
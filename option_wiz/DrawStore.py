@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from typing import Callable
+
+
+class DrawStore():
+    """On-disk store of pre-generated random draws and paths served through memory maps.
+
+    An entry is keyed by (generator, seed, shape, dtype, scheme) and holds one or more named
+    arrays, each written once as a .npy file and read back by later runs with
+    np.load(mmap_mode='r'), so a rerun of an identical simulation pages its draws in from disk
+    instead of sampling them again. Entries are evicted least recently used first once the
+    store grows past max_bytes. The index is rewritten atomically on every change, entries are
+    meant to be shared by runs, not written concurrently by several processes.
+
+        store = DrawStore('~/.option_wiz/draws', max_bytes=2 * 2 ** 30)
+        engine.use_draw_store(store, seed=42)
+        engine.option_price(10_000)  # samples and stores the draws
+        engine.option_price(10_000)  # reads them back through np.memmap
+
+    Parameters
+    ----------
+    directory : (str) folder of the .npy files and of the index, created when missing
+
+    max_bytes : (int) total size of the stored arrays above which entries are evicted"""
+
+    INDEX = 'index.json'
+
+    def __init__(self, directory: str, max_bytes: int = 2 * 2 ** 30) -> None:
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._index = self._read_index()
+
+        # hits and misses of fetch since the store was opened
+        self.hits = 0
+        self.misses = 0
+
+    def _read_index(self) -> dict:
+        try:
+            with open(os.path.join(self.directory, self.INDEX)) as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        # entries whose files were removed behind the store's back are forgotten
+        return {key: entry for key, entry in index.items()
+                if all(os.path.exists(self._path(key, name)) for name in entry['arrays'])}
+
+    def _write_index(self) -> None:
+        path = os.path.join(self.directory, self.INDEX)
+        with open(path + '.tmp', 'w') as file:
+            json.dump(self._index, file)
+        os.replace(path + '.tmp', path)
+
+    def _path(self, key: str, name: str) -> str:
+        return os.path.join(self.directory, f'{key}.{name}.npy')
+
+    @staticmethod
+    def key(generator: str, seed: int, shape: tuple, dtype, scheme: tuple) -> str:
+        """Returns the hex digest identifying an entry"""
+
+        description = json.dumps([generator, seed, list(shape), np.dtype(dtype).str, list(scheme)],
+                                 default=repr)
+        return hashlib.sha1(description.encode()).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def size(self) -> int:
+        """Returns the bytes taken by the stored arrays"""
+        return sum(entry['bytes'] for entry in self._index.values())
+
+    def fetch(self, seed: int, shape: tuple, dtype, scheme: tuple, sample: Callable[[], dict],
+              generator: str = 'numpy.random.RandomState') -> dict:
+        """Returns the arrays of an entry, sampling and storing them on a miss
+
+        On a miss the global NumPy random state is seeded with seed while sample runs and
+        restored afterwards, so an entry holds exactly the draws of
+        np.random.seed(seed) followed by sample(), and fetching never moves the caller's stream.
+
+        Parameters
+        ----------
+            seed : (int) seed of the global NumPy random state the arrays are sampled under
+
+            shape : (tuple) shape of the main array, e.g. (n_steps, num_sims)
+
+            dtype : (np.dtype) float type of the arrays
+
+            scheme : (tuple) JSON serialisable description of how the arrays are sampled,
+                     e.g. ('merton', lambda_j, mu_j, sigma_j, T)
+
+            sample : (callable) returns a dict of the named arrays of the entry
+
+            generator : (str) name of the generator the seed applies to
+
+        Returns
+        -------
+            arrays : (dict) read-only np.memmap of every named array"""
+
+        key = self.key(generator, seed, shape, dtype, scheme)
+        entry = self._index.get(key)
+        if entry is not None:
+            self.hits += 1
+            entry['last_used'] = time.time()
+            self._write_index()
+            return {name: np.load(self._path(key, name), mmap_mode='r') for name in entry['arrays']}
+
+        self.misses += 1
+        state = np.random.get_state()
+        np.random.seed(seed)
+        try:
+            arrays = sample()
+        finally:
+            np.random.set_state(state)
+
+        nbytes = sum(np.asarray(array).nbytes for array in arrays.values())
+        if nbytes > self.max_bytes:
+            # an entry larger than the whole store is served from memory without being kept
+            return arrays
+
+        for name, array in arrays.items():
+            path = self._path(key, name)
+            np.save(path + '.tmp.npy', array)
+            os.replace(path + '.tmp.npy', path)
+        self._index[key] = {'arrays': list(arrays), 'bytes': nbytes, 'last_used': time.time(),
+                            'generator': generator, 'seed': seed, 'shape': list(shape),
+                            'dtype': np.dtype(dtype).str, 'scheme': list(scheme)}
+        self._evict(keep=key)
+        self._write_index()
+        return {name: np.load(self._path(key, name), mmap_mode='r') for name in arrays}
+
+    def _evict(self, keep: str = None) -> None:
+        """Removes least recently used entries until the store fits in max_bytes"""
+
+        total = self.size()
+        for key in sorted(self._index, key=lambda key: self._index[key]['last_used']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self._index[key]['bytes']
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        for name in self._index.pop(key)['arrays']:
+            try:
+                os.remove(self._path(key, name))
+            except OSError:
+                # still mapped on platforms that forbid it, the file is orphaned not served
+                pass
+
+    def clear(self) -> None:
+        """Removes every entry of the store"""
+
+        for key in list(self._index):
+            self._remove(key)
+        self._write_index()
@@ -0,0 +1,230 @@
+import numpy as np
+
+from typing import Literal
+
+from .PayOff import PayOffEuropean
+from .PricingModels import AnalyticFormula, TRADING_HOURS_PER_YEAR
+from .quant_math import gbm_simulation, merton_jump_diff, _jump_draws
+from .utils import validate_option_type
+
+
+class HedgingSimulator():
+    """Backtests the discrete delta hedging of a European option over simulated paths.
+
+    Paths of the underlying are simulated on their own grid with quant_math.gbm_simulation, or
+    merton_jump_diff when lambda_j > 0, under the real world drift mu. The option position is
+    bought or sold at its Black-Scholes price at hedge_volatility and delta hedged with the
+    underlying on rebalance dates taken independently of the simulation grid, each date using
+    the last simulated price at or before it. The deltas, and gammas when asked for, are
+    evaluated with AnalyticFormula on whole blocks of the (rebalance date x path) grid, then a
+    single pass over the dates accumulates the cash, the hedge, the transaction costs and the
+    financing of every path. Paths are processed in chunks under memory_cap and only the final
+    P&L of every path is kept.
+
+        simulator = HedgingSimulator(100, 100, 0.05, 0.2, 1.0, transaction_cost=5e-4)
+        simulator.run(num_sims=10_000, rebalance_per_year=52)['std']
+
+    Parameters
+    ----------
+    S0 : (float) underlying price
+
+    K : (float) strike price
+
+    r : (float) risk-free rate, 0.05 means 5%
+
+    sigma : (float) volatility the paths are simulated with
+
+    T : (float) time till maturity in years
+
+    option_type : (str) one of ['call' or 'put']
+
+    quantity : (float) options held, negative when they are sold
+
+    hedge_volatility : (float) volatility of the premium and of the hedge ratios, sigma by default
+
+    mu : (float) real world drift of the paths, r by default
+
+    lambda_j : (float) jump intensity, 0 simulates a geometric Brownian motion
+
+    mu_j : (float) average jump size
+
+    sigma_j : (float) jump size volatility
+
+    steps_per_year : (float) steps of the simulation grid per year
+
+    transaction_cost : (float) cost of a trade as a fraction of its notional, 0.0005 means 5bp
+
+    financing_rate : (float) rate the cash account earns or pays, r by default
+
+    memory_cap : (int) bytes the paths and a block of hedge ratios may use"""
+
+    # float64 temporaries alive at once while AnalyticFormula evaluates a block
+    _BLOCK_TEMPORARIES = 16
+
+    def __init__(self, S0: float, K: float, r: float, sigma: float, T: float,
+                 option_type: Literal["call", "put"] = 'call', quantity: float = -1.0,
+                 hedge_volatility: float = None, mu: float = None, lambda_j: float = 0.0,
+                 mu_j: float = -0.2, sigma_j: float = 0.3,
+                 steps_per_year: float = TRADING_HOURS_PER_YEAR, transaction_cost: float = 0.0,
+                 financing_rate: float = None, memory_cap: int = 256 * 2 ** 20) -> None:
+        validate_option_type(option_type)
+        self.S0 = S0
+        self.K = K
+        self.r = r
+        self.sigma = sigma
+        self.T = T
+        self.option_type = option_type
+        self.quantity = quantity
+        self.hedge_volatility = sigma if hedge_volatility is None else hedge_volatility
+        self.mu = r if mu is None else mu
+        self.lambda_j = lambda_j
+        self.mu_j = mu_j
+        self.sigma_j = sigma_j
+        self.n_steps = max(1, int(T * steps_per_year))
+        self.transaction_cost = transaction_cost
+        self.financing_rate = r if financing_rate is None else financing_rate
+        self.memory_cap = memory_cap
+
+        self._analytic_formula = AnalyticFormula()
+        self.premium = float(self._analytic_formula.black_scholes_price(
+            S0, K, r, self.hedge_volatility, T, option_type))
+
+    def _rebalance_steps(self, rebalance_per_year: float) -> np.array:
+        """Simulation steps of the rebalance dates, from inception to before maturity"""
+
+        n_rebalances = max(1, int(round(self.T * rebalance_per_year)))
+        times = np.arange(n_rebalances) * self.T / n_rebalances
+        return np.unique(np.floor(times / self.T * self.n_steps + 1e-9).astype(int))
+
+    def _paths(self, rng: np.random.Generator, num_sims: int) -> np.array:
+        draws = rng.standard_normal((self.n_steps, num_sims))
+        if self.lambda_j > 0:
+            jumps = _jump_draws((self.n_steps, num_sims), self.lambda_j * self.T / self.n_steps,
+                                self.mu_j, self.sigma_j, rng=rng)
+            return merton_jump_diff(S0=self.S0, mu=self.mu, sigma=self.sigma, T=self.T,
+                                    n_steps=self.n_steps, num_sims=num_sims,
+                                    lambda_j=self.lambda_j, mu_j=self.mu_j, sigma_j=self.sigma_j,
+                                    random_draws=draws, random_jump_draws=jumps)
+        return gbm_simulation(S0=self.S0, mu=self.mu, n_steps=self.n_steps, T=self.T,
+                              sigma=self.sigma, num_sims=num_sims, random_draws=draws)
+
+    def _hedge_chunk(self, paths: np.array, steps: np.array, gamma: bool) -> tuple:
+        """Streams the rebalance dates of a chunk of paths
+
+        Returns
+        -------
+            pnl, costs, financing, gamma_pnl : (np.array) per path totals at maturity"""
+
+        num_sims = paths.shape[1]
+        dt = self.T / self.n_steps
+        times = np.append(steps, self.n_steps) * dt
+        growth = np.exp(self.financing_rate * np.diff(times))
+        block_size = max(1, int(self.memory_cap // (num_sims * 8 * self._BLOCK_TEMPORARIES)))
+
+        cash = np.full(num_sims, - self.quantity * self.premium)
+        shares = np.zeros(num_sims)
+        costs = np.zeros(num_sims)
+        financing = np.zeros(num_sims)
+        gamma_pnl = np.zeros(num_sims) if gamma else None
+
+        for start in range(0, len(steps), block_size):
+            block = slice(start, start + block_size)
+            S = paths[steps[block]]
+            tau = (self.T - times[:-1][block])[:, np.newaxis]
+            deltas = self._analytic_formula.delta(S, self.K, self.r, self.hedge_volatility, tau,
+                                                  self.option_type)
+            gammas = self._analytic_formula.gamma(S, self.K, self.r, self.hedge_volatility, tau) \
+                if gamma else None
+
+            for row, date in enumerate(range(start, start + len(S))):
+                spot = S[row]
+                target = - self.quantity * deltas[row]
+                trade = target - shares
+                cost = self.transaction_cost * np.abs(trade) * spot
+                cash -= trade * spot + cost
+                costs += cost
+                shares = target
+
+                interest = cash * (growth[date] - 1)
+                cash += interest
+                financing += interest
+
+                if gamma:
+                    # P&L of the option's convexity against the volatility it is hedged at
+                    next_spot = paths[steps[date + 1]] if date + 1 < len(steps) else paths[-1]
+                    realised = (next_spot / spot - 1) ** 2
+                    gamma_pnl += self.quantity * gammas[row] * spot ** 2 / 2 * \
+                        (realised - self.hedge_volatility ** 2 * (times[date + 1] - times[date]))
+
+        S_T = paths[-1]
+        pay_off = PayOffEuropean(self.K, self.option_type).pay_off(S_T[np.newaxis])
+        unwind = self.transaction_cost * np.abs(shares) * S_T
+        costs += unwind
+        pnl = cash + shares * S_T - unwind + self.quantity * pay_off
+        return pnl, costs, financing, gamma_pnl
+
+    def run(self, num_sims: int = 10_000, rebalance_per_year: float = 252, gamma: bool = False,
+            confidence: float = 0.99, seed: int = 0) -> dict:
+        """Simulates the hedged position to maturity and measures its P&L distribution
+
+        Parameters
+        ----------
+            num_sims : (int) number of simulated paths
+
+            rebalance_per_year : (float) hedge rebalances per year, e.g. 252 daily or 52 weekly
+
+            gamma : (bool) also accumulate the gamma P&L of every path, the option's convexity
+                    earned on the realised against the hedge volatility
+
+            confidence : (float) confidence level of the VaR and ES of the P&L
+
+            seed : (int) seed of the path generator
+
+        Returns
+        -------
+            {
+                mean : (float) mean P&L at maturity
+                std : (float) standard deviation of the P&L
+                quantiles : (dict) P&L at the 1%, 5%, 50%, 95% and 99% quantiles
+                var : (float) Value-at-Risk of the P&L as a positive loss
+                es : (float) Expected Shortfall of the P&L as a positive loss
+                transaction_costs : (float) mean transaction costs paid
+                financing : (float) mean interest earned on the cash account
+                gamma_pnl : (float) mean gamma P&L, when gamma is set
+                rebalances : (int) number of rebalance dates
+                pnl : (np.array) P&L at maturity of every path
+            }"""
+
+        steps = self._rebalance_steps(rebalance_per_year)
+        chunk_size = max(1, int(self.memory_cap // (8 * 2 * (self.n_steps + 1))))
+
+        pnl = np.empty(num_sims)
+        totals = {'transaction_costs': 0.0, 'financing': 0.0, 'gamma_pnl': 0.0}
+        for chunk, start in enumerate(range(0, num_sims, chunk_size)):
+            size = min(chunk_size, num_sims - start)
+            paths = self._paths(np.random.default_rng([seed, chunk]), size)
+            chunk_pnl, costs, financing, gamma_pnl = self._hedge_chunk(paths, steps, gamma)
+            pnl[start:start + size] = chunk_pnl
+            totals['transaction_costs'] += costs.sum()
+            totals['financing'] += financing.sum()
+            if gamma:
+                totals['gamma_pnl'] += gamma_pnl.sum()
+
+        losses = -pnl
+        n_tail = max(1, int(np.ceil((1 - confidence) * num_sims)))
+        tail = -np.partition(-losses, n_tail - 1)[:n_tail]
+        levels = (0.01, 0.05, 0.5, 0.95, 0.99)
+        results = {
+            'mean': float(pnl.mean()),
+            'std': float(pnl.std()),
+            'quantiles': dict(zip(levels, np.quantile(pnl, levels).tolist())),
+            'var': float(tail.min()),
+            'es': float(tail.mean()),
+            'transaction_costs': float(totals['transaction_costs'] / num_sims),
+            'financing': float(totals['financing'] / num_sims),
+            'rebalances': len(steps),
+            'pnl': pnl,
+        }
+        if gamma:
+            results['gamma_pnl'] = float(totals['gamma_pnl'] / num_sims)
+        return results
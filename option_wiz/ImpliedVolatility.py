@@ -0,0 +1,163 @@
+import numpy as np
+
+from typing import Hashable, Literal, Sequence
+
+from .PricingModels import AnalyticFormula
+
+
+class ImpliedVolatilityTracker():
+    """Keeps the last implied volatility of every contract of a chain and warm-starts
+    the next tick's Newton-Raphson solve from it.
+
+    Each update first prices the whole chain at the previous solution. Quotes whose residual
+    is within tolerance * vega, i.e. whose implied volatility moved by less than tolerance,
+    keep their previous solution without a Newton step. Contracts seen for the first time
+    start from the Brenner and Subrahmanyam (1988) guess used by
+    AnalyticFormula.implied_volatility, raised to the inflection point of the price for
+    strikes away from the money. Steps leaving the bracket of the current iterate are
+    replaced by bisection.
+
+    Parameters
+    ----------
+    tolerance : (float) accepted error of the implied volatility, 0.0001 means 1 basis point
+
+    max_iterations : (int) Newton-Raphson steps before a quote is reported as NaN
+
+    min_volatility : (float) lower bound of the Newton-Raphson iterates
+
+    max_volatility : (float) upper bound of the Newton-Raphson iterates"""
+
+    def __init__(self, tolerance: float = 1e-6, max_iterations: int = 50,
+                 min_volatility: float = 1e-4, max_volatility: float = 5.0) -> None:
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self.min_volatility = min_volatility
+        self.max_volatility = max_volatility
+
+        self._analytic_formula = AnalyticFormula()
+        self._slots = {}
+        self._volatility = np.empty(0)
+        # slots released by forget, reused before the storage grows
+        self._free_slots = []
+        self._next_slot = 0
+
+        # Newton-Raphson steps each quote of the last update needed, 0 means it was skipped
+        self.iterations = np.empty(0, dtype=int)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slots
+
+    def __getitem__(self, key: Hashable) -> float:
+        return self._volatility[self._slots[key]]
+
+    def _get_slots(self, keys: Sequence[Hashable]) -> np.array:
+        """Returns the storage slot of every key, allocating slots for new keys"""
+
+        slots = np.empty(len(keys), dtype=int)
+        for i, key in enumerate(keys):
+            slot = self._slots.get(key)
+            if slot is None:
+                if self._free_slots:
+                    slot = self._free_slots.pop()
+                else:
+                    slot = self._next_slot
+                    self._next_slot += 1
+                self._slots[key] = slot
+            slots[i] = slot
+        if self._next_slot > self._volatility.size:
+            grown = np.full(max(self._next_slot, 2 * self._volatility.size), np.nan)
+            grown[:self._volatility.size] = self._volatility
+            self._volatility = grown
+        return slots
+
+    def forget(self, keys: Sequence[Hashable]) -> None:
+        """Drops the stored solution of keys so their next solve starts cold"""
+
+        for key in keys:
+            slot = self._slots.pop(key, None)
+            if slot is not None:
+                self._volatility[slot] = np.nan
+                self._free_slots.append(slot)
+
+    def update(self, keys: Sequence[Hashable], S, K, r, T, option_price,
+               option_type: Literal["call", "put"] = 'call') -> np.array:
+        """Solves the implied volatility of a chain of quotes, warm-started from the last tick
+
+        Parameters
+        ----------
+            keys : (Sequence) hashable identifier of each contract, e.g. its ticker
+
+            S : (np.array) underlying price
+
+            K : (np.array) strike price
+
+            r : (np.array) risk-free rate, 0.05 means 5%
+
+            T : (np.array) time till maturity in years
+
+            option_price : (np.array) observed price of each option
+
+            option_type : (np.array) 'call' or 'put' per contract, a single str applies to every contract
+
+        Returns
+        -------
+            implied_volatility : (np.array) where 0.05 means 5%, NaN where no solution was found"""
+
+        S, K, r, T, option_price, option_type = (x.ravel().copy() for x in np.broadcast_arrays(
+            *(np.asarray(x, dtype=float) for x in (S, K, r, T, option_price)),
+            np.asarray(option_type)))
+        if len(keys) != option_price.size:
+            raise ValueError("keys must contain one identifier per quote.")
+
+        slots = self._get_slots(keys)
+
+        volatility = self._volatility[slots]
+        cold = np.isnan(volatility)
+        # the Brenner and Subrahmanyam guess sits where vega vanishes for far away strikes,
+        # starting no lower than the inflection point of the price keeps Newton-Raphson monotone
+        inflection = np.sqrt(2 * np.abs(np.log(S[cold] / K[cold]) + r[cold] * T[cold]) / T[cold])
+        volatility[cold] = np.maximum(
+            np.sqrt(2 * np.pi / T[cold]) * (option_price[cold] / S[cold]), inflection)
+        volatility = np.clip(volatility, self.min_volatility, self.max_volatility)
+
+        # the price increases with volatility, so every residual sign narrows a bracket
+        lower = np.full(volatility.size, self.min_volatility)
+        upper = np.full(volatility.size, self.max_volatility)
+
+        iterations = np.zeros(volatility.size, dtype=int)
+        active = np.arange(volatility.size)
+
+        for iteration in range(self.max_iterations + 1):
+            a_S, a_K, a_r, a_T = S[active], K[active], r[active], T[active]
+            a_volatility = volatility[active]
+
+            residual = self._analytic_formula.black_scholes_price(
+                a_S, a_K, a_r, a_volatility, a_T, option_type[active]) - option_price[active]
+            vega = self._analytic_formula.vega(a_S, a_K, a_r, a_volatility, a_T)
+
+            converged = np.abs(residual) <= self.tolerance * vega
+            iterations[active] = iteration
+
+            active, residual, vega = active[~converged], residual[~converged], vega[~converged]
+            if active.size == 0 or iteration == self.max_iterations:
+                break
+
+            a_volatility = volatility[active]
+            upper[active] = np.where(residual > 0, a_volatility, upper[active])
+            lower[active] = np.where(residual < 0, a_volatility, lower[active])
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                step = a_volatility - residual / vega
+            outside = ~((step > lower[active]) & (step < upper[active]))
+            volatility[active] = np.where(
+                outside, (lower[active] + upper[active]) / 2, step)
+
+        volatility[active] = np.nan
+        self.iterations = iterations
+
+        solved = ~np.isnan(volatility)
+        self._volatility[slots[solved]] = volatility[solved]
+        return volatility
@@ -0,0 +1,113 @@
+import time
+
+
+class _Stage():
+    """Times one run of a stage and collects the arrays it produced"""
+
+    __slots__ = ('_stats', 'name', 'nbytes', 'shapes', '_start')
+
+    def __init__(self, stats, name: str) -> None:
+        self._stats = stats
+        self.name = name
+        self.nbytes = 0
+        self.shapes = []
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self._stats._close(self, time.perf_counter() - self._start)
+        return False
+
+    def add(self, *arrays) -> None:
+        """Records the size and shape of arrays allocated by the stage"""
+        for array in arrays:
+            self.nbytes += array.nbytes
+            self.shapes.append(array.shape)
+
+
+class _DisabledStage():
+    """Stage of disabled stats, every method is a no-op"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+    def add(self, *arrays) -> None:
+        pass
+
+
+_DISABLED_STAGE = _DisabledStage()
+
+
+class SimulationStats():
+    """Wall time, bytes allocated and array shapes per stage of a simulation.
+
+    Stages accumulate over calls until reset, the shapes being those of the last call.
+
+        stats = SimulationStats()
+        with stats.stage('draws') as stage:
+            draws = np.random.normal(size=(n_steps, num_sims))
+            stage.add(draws)
+        stats.to_dict()"""
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.stages = {}
+
+    def stage(self, name: str) -> _Stage:
+        """Returns a context manager timing the stage name"""
+        return _Stage(self, name)
+
+    def _close(self, stage: _Stage, seconds: float) -> None:
+        entry = self.stages.setdefault(stage.name, {'calls': 0, 'seconds': 0.0, 'bytes': 0,
+                                                    'shapes': []})
+        entry['calls'] += 1
+        entry['seconds'] += seconds
+        entry['bytes'] += stage.nbytes
+        entry['shapes'] = list(stage.shapes)
+
+    def reset(self) -> None:
+        self.stages = {}
+
+    def total_seconds(self) -> float:
+        return sum(entry['seconds'] for entry in self.stages.values())
+
+    def to_dict(self) -> dict:
+        """Returns the stats as plain python types, ready to be serialised"""
+        return {
+            'total_seconds': self.total_seconds(),
+            'stages': {name: {'calls': entry['calls'],
+                              'seconds': entry['seconds'],
+                              'bytes': entry['bytes'],
+                              'shapes': [list(shape) for shape in entry['shapes']]}
+                       for name, entry in self.stages.items()},
+        }
+
+    def __repr__(self) -> str:
+        lines = [f"{'stage':<12}{'calls':>7}{'seconds':>12}{'MB':>10}  shapes"]
+        for name, entry in self.stages.items():
+            lines.append(f"{name:<12}{entry['calls']:>7}{entry['seconds']:>12.6f}"
+                         f"{entry['bytes'] / 2 ** 20:>10.2f}  {entry['shapes']}")
+        return '\n'.join(lines)
+
+
+class _DisabledStats(SimulationStats):
+    """Stats that record nothing, used when instrumentation is off"""
+
+    enabled = False
+
+    def stage(self, name: str) -> _DisabledStage:
+        return _DISABLED_STAGE
+
+    def __repr__(self) -> str:
+        return 'SimulationStats(disabled)'
+
+
+DISABLED_STATS = _DisabledStats()
@@ -0,0 +1,283 @@
+import numpy as np
+
+from typing import Literal
+
+from .utils import option_type_sign
+from .quant_math import norm_cdf, norm_pdf
+
+GREEK_FIELDS = ('price', 'delta', 'gamma', 'vega', 'theta', 'rho')
+
+
+class LiveBook():
+    """Book of European contracts that is repriced incrementally as spot and volatility tick.
+
+    Every quantity of the Black-Scholes formula that does not depend on spot (log strike,
+    discounted strike, sigma * sqrt(T) and the d_1 drift term) is computed once per contract,
+    so a spot update only recomputes d_1, d_2 and the normal terms of the contracts written
+    on the underlying that moved. Contracts are stored grouped by underlying so those contracts
+    are a contiguous block. Quantity weighted Greeks per underlying are kept as running totals
+    and moved by the change of the revalued contracts only.
+
+    Parameters
+    ----------
+    S : (np.array) underlying price per contract
+
+    K : (np.array) strike price per contract
+
+    r : (np.array) risk-free rate per contract, 0.05 means 5%
+
+    sigma : (np.array) volatility per contract, 0.05 means 5%
+
+    T : (np.array) time till maturity in years per contract
+
+    option_type : (np.array) 'call' or 'put' per contract, a single str applies to every contract
+
+    quantity : (np.array) position size per contract used for the book aggregates
+
+    underlying : (np.array) identifier of the underlying of each contract, defaults to a single underlying
+
+    tolerance : (float) largest spot move, in units of S * sigma * sqrt(T), or relative volatility
+                move that the taylor mode estimates before forcing a full revaluation"""
+
+    def __init__(self, S, K, r, sigma, T, option_type: Literal["call", "put"] = 'call',
+                 quantity=1.0, underlying=None, tolerance: float = 0.05) -> None:
+
+        S, K, r, sigma, T = (x.ravel() for x in np.broadcast_arrays(
+            *(np.asarray(x, dtype=float) for x in (S, K, r, sigma, T))))
+        n_contracts = S.size
+
+        if underlying is None:
+            underlying = np.zeros(n_contracts, dtype=int)
+        self.underlyings, underlying_index = np.unique(
+            np.broadcast_to(np.asarray(underlying), (n_contracts,)), return_inverse=True)
+        self._underlying_lookup = {u: i for i, u in enumerate(self.underlyings.tolist())}
+
+        # contracts are kept sorted by underlying, _position maps a contract to its row
+        order = np.argsort(underlying_index, kind='stable')
+        self._position = np.empty(n_contracts, dtype=int)
+        self._position[order] = np.arange(n_contracts)
+        self._underlying_index = underlying_index[order]
+        bounds = np.searchsorted(self._underlying_index,
+                                 np.arange(len(self.underlyings) + 1))
+        self._members = [slice(bounds[i], bounds[i + 1])
+                         for i in range(len(self.underlyings))]
+
+        self.S = S[order]
+        self.K = K[order]
+        self.r = r[order]
+        self.sigma = sigma[order]
+        self.T = T[order]
+        self.quantity = np.broadcast_to(
+            np.asarray(quantity, dtype=float), (n_contracts,))[order]
+        self._sign = np.broadcast_to(
+            option_type_sign(option_type), (n_contracts,))[order].astype(float)
+        self.tolerance = tolerance
+
+        # spot independent terms
+        self._log_K = np.log(self.K)
+        self._sqrt_T = np.sqrt(self.T)
+        self._discount_K = self.K * np.exp(- self.r * self.T)
+        self._sigma_sqrt_T = np.empty(n_contracts)
+        self._d_1_drift = np.empty(n_contracts)
+        self._update_sigma_terms(slice(None))
+
+        # state of the last full revaluation, used by the taylor mode
+        self._anchor_S = np.empty(n_contracts)
+        self._anchor_sigma = np.empty(n_contracts)
+        self._anchor_values = np.empty((len(GREEK_FIELDS), n_contracts))
+        self._spot_band = np.empty(n_contracts)
+
+        self.revalue()
+
+    @classmethod
+    def from_options(cls, options, quantity=1.0, underlying=None, tolerance: float = 0.05):
+        """Builds a book from a sequence of EuropeanOption objects"""
+
+        return cls(S=[o.get_underlying_price() for o in options],
+                   K=[o.get_strike_price() for o in options],
+                   r=[o.get_risk_free_rate() for o in options],
+                   sigma=[o.get_volatility() for o in options],
+                   T=[o.get_maturity_time() for o in options],
+                   option_type=[o.get_option_type() for o in options],
+                   quantity=quantity, underlying=underlying, tolerance=tolerance)
+
+    def __len__(self) -> int:
+        return self.S.size
+
+    def _update_sigma_terms(self, idx) -> None:
+        """Recomputes the volatility dependent, spot independent terms of rows idx"""
+
+        self._sigma_sqrt_T[idx] = self.sigma[idx] * self._sqrt_T[idx]
+        self._d_1_drift[idx] = (self.r[idx] + self.sigma[idx] ** 2 / 2) * self.T[idx] \
+            - self._log_K[idx]
+
+    def _full_values(self, idx) -> np.array:
+        """Black-Scholes price and greeks of rows idx from the cached terms"""
+
+        S = self.S[idx]
+        sign = self._sign[idx]
+        sigma_sqrt_T = self._sigma_sqrt_T[idx]
+        discount_K = self._discount_K[idx]
+
+        d_1 = (np.log(S) + self._d_1_drift[idx]) / sigma_sqrt_T
+        d_2 = d_1 - sigma_sqrt_T
+
+        cdf_d_1 = norm_cdf(sign * d_1)
+        cdf_d_2 = norm_cdf(sign * d_2)
+        pdf_d_1 = norm_pdf(d_1)
+
+        values = np.empty((len(GREEK_FIELDS), cdf_d_1.size))
+        values[0] = sign * (S * cdf_d_1 - discount_K * cdf_d_2)
+        values[1] = sign * cdf_d_1
+        values[2] = pdf_d_1 / (S * sigma_sqrt_T)
+        values[3] = S * pdf_d_1 * self._sqrt_T[idx]
+        values[4] = - S * pdf_d_1 * self.sigma[idx] / (2 * self._sqrt_T[idx]) \
+            - sign * self.r[idx] * discount_K * cdf_d_2
+        values[5] = sign * self.T[idx] * discount_K * cdf_d_2
+        return values
+
+    def _anchor(self, idx, values) -> None:
+        """Records rows idx as fully revalued at the current spot and volatility"""
+
+        self._anchor_S[idx] = self.S[idx]
+        self._anchor_sigma[idx] = self.sigma[idx]
+        self._anchor_values[:, idx] = values
+        self._spot_band[idx] = self.tolerance * self.S[idx] * self._sigma_sqrt_T[idx]
+
+    def _store(self, idx, values, fields: slice = slice(None), column: int = None) -> None:
+        """Writes values of rows idx and moves the per underlying totals by their change
+
+        Parameters
+        ----------
+            idx : (slice or np.array) rows being written
+
+            values : (np.array) new values of shape (n_fields, n_rows)
+
+            fields : (slice) rows of GREEK_FIELDS contained in values
+
+            column : (int) underlying of every row in idx when known"""
+
+        change = (values - self._values[fields, idx]) * self.quantity[idx]
+        self._values[fields, idx] = values
+
+        if column is not None:
+            self._totals[fields, column] += change.sum(axis=1)
+            return
+
+        groups = self._underlying_index[idx]
+        for row, field in zip(range(len(change)), range(len(GREEK_FIELDS))[fields]):
+            self._totals[field] += np.bincount(groups, weights=change[row],
+                                               minlength=len(self.underlyings))
+
+    def _revalue(self, idx, mode: Literal["full", "taylor"], column: int = None) -> None:
+        """Reprices rows idx either fully or through the delta/gamma/vega expansion"""
+
+        if mode not in ("full", "taylor"):
+            raise ValueError("Invalid mode. Allowed values are 'full' or 'taylor'.")
+
+        if mode == 'full':
+            values = self._full_values(idx)
+            self._anchor(idx, values)
+            self._store(idx, values, column=column)
+            return
+
+        # only price and delta move under the expansion, the other greeks stay at the anchor
+        anchor = self._anchor_values[:4, idx]
+        d_S = self.S[idx] - self._anchor_S[idx]
+        d_sigma = self.sigma[idx] - self._anchor_sigma[idx]
+
+        estimate = np.empty((2, d_S.size))
+        estimate[0] = anchor[0] + anchor[1] * d_S + anchor[2] * d_S ** 2 / 2 + anchor[3] * d_sigma
+        estimate[1] = anchor[1] + anchor[2] * d_S
+        self._store(idx, estimate, fields=slice(0, 2), column=column)
+
+        stale = (np.abs(d_S) > self._spot_band[idx]) | \
+            (np.abs(d_sigma) > self.tolerance * self._anchor_sigma[idx])
+        if stale.any():
+            rows = np.arange(len(self))[idx][stale]
+            values = self._full_values(rows)
+            self._anchor(rows, values)
+            self._store(rows, values, column=column)
+
+    def update_spot(self, underlying, spot: float,
+                    mode: Literal["full", "taylor"] = 'full') -> None:
+        """Moves the spot of an underlying and reprices only the contracts written on it
+
+        Parameters
+        ----------
+            underlying : identifier of the underlying that ticked
+
+            spot : (float) new underlying price
+
+            mode : (str) 'full' for Black-Scholes revaluation or 'taylor' for a delta/gamma/vega
+                   estimate that falls back to a full revaluation outside of the tolerance"""
+
+        column = self._underlying_lookup[underlying]
+        idx = self._members[column]
+        self.S[idx] = spot
+        self._revalue(idx, mode, column)
+
+    def update_volatility(self, sigma, indices=None,
+                          mode: Literal["full", "taylor"] = 'full') -> None:
+        """Sets the volatility of some contracts and reprices them
+
+        Parameters
+        ----------
+            sigma : (np.array) new volatility, 0.05 means 5%
+
+            indices : (np.array) positions of the contracts in the order they were given,
+                      every contract if None, a contract given twice takes its last volatility
+
+            mode : (str) 'full' for Black-Scholes revaluation or 'taylor' for a delta/gamma/vega
+                   estimate that falls back to a full revaluation outside of the tolerance"""
+
+        # rows are sorted by underlying, _position puts sigma given in input order on them
+        if indices is None:
+            idx = self._position
+            sigma = np.broadcast_to(sigma, idx.shape)
+        else:
+            positions = np.arange(len(self))[np.atleast_1d(indices)]
+            sigma = np.broadcast_to(sigma, positions.shape)
+            # the running totals must see every contract once, the last occurrence wins
+            _, last = np.unique(positions[::-1], return_index=True)
+            keep = positions.size - 1 - last
+            idx, sigma = self._position[positions[keep]], sigma[keep]
+        self.sigma[idx] = sigma
+        self._update_sigma_terms(idx)
+        self._revalue(idx, mode)
+
+    def revalue(self) -> None:
+        """Fully revalues every contract and rebuilds the book totals from scratch"""
+
+        self._values = self._full_values(slice(None))
+        self._anchor(slice(None), self._values)
+        self._totals = np.stack([np.bincount(self._underlying_index,
+                                             weights=self._values[field] * self.quantity,
+                                             minlength=len(self.underlyings))
+                                 for field in range(len(GREEK_FIELDS))])
+
+    def prices(self) -> np.array:
+        """Returns the current price of every contract, in the order they were given"""
+        return self._values[0, self._position]
+
+    def greeks(self) -> dict:
+        """Returns the current price and greeks of every contract, in the order they were given"""
+        return {field: self._values[i, self._position] for i, field in enumerate(GREEK_FIELDS)}
+
+    def book_greeks(self, underlying=None) -> dict:
+        """Returns the quantity weighted price and greeks aggregated per underlying
+
+        Parameters
+        ----------
+            underlying : identifier of a single underlying, if None every underlying is returned
+
+        Returns
+        -------
+            {field : (float) total for the underlying} or {underlying : {field : total}}"""
+
+        if underlying is not None:
+            column = self._underlying_lookup[underlying]
+            return {field: self._totals[i, column] for i, field in enumerate(GREEK_FIELDS)}
+
+        return {u: {field: self._totals[i, column] for i, field in enumerate(GREEK_FIELDS)}
+                for column, u in enumerate(self.underlyings.tolist())}
@@ -0,0 +1,207 @@
+import numpy as np
+
+from .PayOff import PayOffBarrier
+from .PricingModels import Simulator, MonteCarlo, StochasticVolatility
+from .backends import get_backend
+from .Curves import discount_factor
+from .quant_math import _normal_draws, _jump_draws, _correlated_normal_draws, _drift_growth
+
+
+class MultilevelMonteCarlo():
+    """Multilevel Monte Carlo driver (Giles, 2008) for the path dependent pay offs of a
+    MonteCarlo or StochasticVolatility engine.
+
+    Level l simulates paths on coarsest_steps * refinement ** l time steps. Level 0 estimates
+    the price on the coarsest grid and every further level the difference between its grid and
+    the previous one, the coarse path of a pair being driven by the summed Brownian increments,
+    and jumps, of its fine path so the difference has a small variance. Paths are allocated to
+    the levels from their estimated variances and costs, and finer levels are added until the
+    estimated discretisation bias fits in the target, so a root mean square error eps costs
+    about O(eps^-2) steps where a single fine grid costs O(eps^-3).
+
+        engine = StochasticVolatility(100, 100, 0.05, 1.0, 0.04, -0.7, 0.3, 2.0, 0.04, pay_off)
+        MultilevelMonteCarlo(engine).option_price(rmse=0.01)
+
+    Parameters
+    ----------
+    simulator : (MonteCarlo or StochasticVolatility) engine whose model, contract and pay off are priced
+
+    coarsest_steps : (int) time steps of the level 0 grid
+
+    refinement : (int) factor between the time steps of consecutive levels
+
+    max_level : (int) finest level that may be added
+
+    initial_sims : (int) paths simulated on a new level to estimate its variance
+
+    max_chunk : (int) bound on the time steps times paths simulated at once"""
+
+    def __init__(self, simulator: Simulator, coarsest_steps: int = 4, refinement: int = 2,
+                 max_level: int = 10, initial_sims: int = 2_000, max_chunk: int = 2 ** 22) -> None:
+        if not isinstance(simulator, (MonteCarlo, StochasticVolatility)):
+            raise TypeError("Multilevel Monte Carlo needs a MonteCarlo or StochasticVolatility engine.")
+        self.simulator = simulator
+        self.coarsest_steps = coarsest_steps
+        self.refinement = refinement
+        self.max_level = max_level
+        self.initial_sims = initial_sims
+        self.max_chunk = max_chunk
+
+    def _steps(self, level: int) -> int:
+        return self.coarsest_steps * self.refinement ** level
+
+    def _coarsen(self, increments: np.array, axis: int) -> np.array:
+        """Sums groups of refinement consecutive increments along axis"""
+
+        shape = increments.shape
+        grouped = shape[:axis] + (shape[axis] // self.refinement, self.refinement) + shape[axis + 1:]
+        return increments.reshape(grouped).sum(axis=axis + 1)
+
+    def _paths(self, n_steps: int, num_sims: int, coarse: bool) -> tuple:
+        """Returns the (n_steps + 1, num_sims) fine paths, and the paths on n_steps / refinement
+        steps driven by the same draws when coarse is set"""
+
+        simulator = self.simulator
+        dtype = simulator.dtype
+        backend = get_backend()
+        dt = simulator.T / n_steps
+        # a curve carry grows the paths by deterministic factors, the coarse grid taking every
+        # refinement-th of them
+        mu, growth = _drift_growth(simulator.r - simulator.q, simulator.T, n_steps)
+        if growth is not None:
+            growth = growth.astype(dtype)[:, np.newaxis]
+
+        if isinstance(simulator, StochasticVolatility):
+            def path(draws, dt, growth):
+                prices = backend.heston_path(simulator.S0, simulator.sigma, mu, dt,
+                                             simulator.kappa, simulator._theta, simulator.epsilon,
+                                             draws, dtype).T
+                return prices if growth is None else prices * growth
+
+            draws = _correlated_normal_draws(num_sims, n_steps, simulator.corr, dtype)
+            fine = path(draws, dt, growth)
+            if not coarse:
+                return fine, None
+            return fine, path(self._coarsen(draws, 1) / np.sqrt(self.refinement), dt * self.refinement,
+                              None if growth is None else growth[::self.refinement])
+
+        def path(draws, jumps, dt, growth):
+            prices = backend.log_euler_path(simulator.S0, (mu - simulator.sigma ** 2 / 2) * dt,
+                                            simulator.sigma * np.sqrt(dt), draws, jumps, dtype)
+            return prices if growth is None else prices * growth
+
+        draws = _normal_draws((n_steps, num_sims), dtype)
+        jumps = _jump_draws((n_steps, num_sims), simulator.lambda_j * dt, simulator.mu_j,
+                            simulator.sigma_j, dtype) if simulator.lambda_j else None
+        fine = path(draws, jumps, dt, growth)
+        if not coarse:
+            return fine, None
+        return fine, path(self._coarsen(draws, 0) / np.sqrt(self.refinement),
+                          None if jumps is None else self._coarsen(jumps, 0), dt * self.refinement,
+                          None if growth is None else growth[::self.refinement])
+
+    def _pay_off(self, paths: np.array, dt: float) -> np.array:
+        pay_off = self.simulator.pay_off
+        correction = getattr(self.simulator, 'barrier_correction', None)
+        if isinstance(pay_off, PayOffBarrier) and correction is not None:
+            sigma_sqrt_dt = self.simulator.sigma * np.sqrt(dt)
+            if correction == 'bridge':
+                return pay_off.pay_off_bridge(paths, sigma_sqrt_dt)
+            pay_off = pay_off.shifted(sigma_sqrt_dt)
+        return pay_off.pay_off(paths)
+
+    def _sample(self, level: int, num_sims: int) -> tuple:
+        """Returns the sum and the sum of squares of num_sims discounted level differences"""
+
+        n_steps = self._steps(level)
+        discount = discount_factor(self.simulator.r, self.simulator.T)
+        chunk = max(1, self.max_chunk // n_steps)
+        total, total_squares = 0.0, 0.0
+        for start in range(0, num_sims, chunk):
+            fine, coarse = self._paths(n_steps, min(chunk, num_sims - start), coarse=level > 0)
+            values = np.ravel(self._pay_off(fine, self.simulator.T / n_steps)).astype(np.float64)
+            if coarse is not None:
+                values -= np.ravel(self._pay_off(coarse, self.simulator.T * self.refinement / n_steps))
+            values *= discount
+            total += values.sum()
+            total_squares += np.dot(values, values)
+        return total, total_squares
+
+    def estimate(self, rmse: float) -> dict:
+        """Prices the pay off to a target root mean square error
+
+        Parameters
+        ----------
+            rmse : (float) target root mean square error of the price
+
+        Returns
+        -------
+            estimate : (dict) price, estimated rmse, number of levels, sims and variances per
+                       level, cost in simulated time steps and whether the bias test passed"""
+
+        refinement = self.refinement
+        sums, squares, sims = [], [], []
+        # paths still to simulate on every level, a new level starts with initial_sims
+        extra = [self.initial_sims] * 3
+        converged = False
+
+        while True:
+            for level, num_sims in enumerate(extra):
+                if level == len(sims):
+                    sums.append(0.0)
+                    squares.append(0.0)
+                    sims.append(0)
+                if num_sims > 0:
+                    total, total_squares = self._sample(level, num_sims)
+                    sums[level] += total
+                    squares[level] += total_squares
+                    sims[level] += num_sims
+
+            counts = np.array(sims, dtype=np.float64)
+            means = np.array(sums) / counts
+            variances = np.maximum(np.array(squares) / counts - means ** 2, 0.0)
+            # a path of level l steps its fine grid and, above level 0, its coarse grid
+            costs = np.array([self._steps(level) * (1 + (level > 0) / refinement)
+                              for level in range(len(sims))])
+
+            # paths minimising the cost for a sampling variance of rmse^2 / 2
+            optimal = np.ceil(2 / rmse ** 2 * np.sqrt(variances / costs)
+                              * np.sum(np.sqrt(variances * costs)))
+            extra = [int(max(0, needed - done)) for needed, done in zip(optimal, sims)]
+            if any(num_sims > 0.01 * done for num_sims, done in zip(extra, sims)):
+                continue
+
+            # weak order from the decay of the level corrections, at least 1/2
+            corrections = np.abs(means[1:])
+            alpha = 0.5
+            if len(corrections) > 1 and np.all(corrections > 0):
+                alpha = max(0.5, -np.polyfit(np.arange(1, len(means)),
+                                             np.log(corrections) / np.log(refinement), 1)[0])
+            bias = max(abs(means[-1]), abs(means[-2]) / refinement ** alpha) / (refinement ** alpha - 1)
+            converged = bias <= rmse / np.sqrt(2)
+            if converged or len(sims) > self.max_level:
+                break
+            extra = [0] * len(sims) + [self.initial_sims]
+
+        return {
+            'price': float(np.sum(means)),
+            'rmse': float(np.sqrt(np.sum(variances / counts) + bias ** 2)),
+            'levels': len(sims),
+            'sims': list(sims),
+            'variances': variances.tolist(),
+            'cost': float(np.dot(counts, costs)),
+            'converged': bool(converged),
+        }
+
+    def option_price(self, rmse: float) -> float:
+        """Returns the price of the option to a target root mean square error
+
+        Parameters
+        ----------
+            rmse : (float) target root mean square error of the price
+
+        Returns
+        -------
+            option_price : (float) calculated option price"""
+
+        return self.estimate(rmse)['price']
@@ -1,12 +1,25 @@
 from typing import Literal
+import numpy as np
 from abc import ABC, abstractmethod
-from PayOff import PayOff
+from functools import lru_cache
+from .PayOff import PayOff
 
-from PricingModels import AnalyticFormula, MonteCarlo
-from PayOff import *
-from utils import validate_option_type
+from .PricingModels import AnalyticFormula, MonteCarlo
+from .PayOff import *
+from .utils import validate_option_type
 
-ANALYTIC_FORMULA = AnalyticFormula()
+
+@lru_cache(maxsize=None)
+def _analytic_formula() -> AnalyticFormula:
+    """Shared AnalyticFormula, built on first use rather than at import"""
+    return AnalyticFormula()
+
+
+def __getattr__(name: str):
+    # ANALYTIC_FORMULA used to be built at import, it is still reachable as a module attribute
+    if name == 'ANALYTIC_FORMULA':
+        return _analytic_formula()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class Option(ABC):
@@ -16,7 +29,7 @@ class Option(ABC):
     ----------
     strike_price : (float) representing the strike price of the option (K)
 
-    risk_free_rate : (float) representing the risk-free rate, enter 5% as 0.05 (r)
+    risk_free_rate : (float or YieldCurve) representing the risk-free rate, enter 5% as 0.05 (r)
 
     maturity_time : (float) representing the time to expiry in years (T)
 
@@ -186,7 +199,7 @@ class EuropeanOption(Option):
     ----------
     strike_price : (float) representing the strike price of the option (K)
 
-    risk_free_rate : (float) representing the risk-free rate, enter 5% as 0.05 (r)
+    risk_free_rate : (float or YieldCurve) representing the risk-free rate, enter 5% as 0.05 (r)
 
     maturity_time : (float) representing the time to expiry in years (T)
 
@@ -214,7 +227,7 @@ class EuropeanOption(Option):
         -------
             option_price : (float) calculated option price"""
 
-        return ANALYTIC_FORMULA.black_scholes_price(
+        return _analytic_formula().black_scholes_price(
             S=self.S,
             K=self.K,
             r=self.r,
@@ -230,7 +243,7 @@ class EuropeanOption(Option):
         -------
             delta : (float) representing the option price's sensitivity to underlying price"""
 
-        return ANALYTIC_FORMULA.delta(self.S, self.K, self.r, self.sigma, self.T, self.option_type)
+        return _analytic_formula().delta(self.S, self.K, self.r, self.sigma, self.T, self.option_type)
 
     def gamma(self) -> float:
         """Returns the Gamma value of an option through analytic formula
@@ -239,7 +252,7 @@ class EuropeanOption(Option):
         -------
             gamma : (float) representing the option delta's sensitivity to underlying price"""
 
-        return ANALYTIC_FORMULA.gamma(self.S, self.K, self.r, self.sigma, self.T)
+        return _analytic_formula().gamma(self.S, self.K, self.r, self.sigma, self.T)
 
     def vega(self) -> float:
         """Returns the Vega value of an option through analytic formula
@@ -248,7 +261,7 @@ class EuropeanOption(Option):
         -------
             vega : (float) representing the option price's sensitivity to volatility"""
 
-        return ANALYTIC_FORMULA.vega(self.S, self.K, self.r, self.sigma, self.T)
+        return _analytic_formula().vega(self.S, self.K, self.r, self.sigma, self.T)
 
     def theta(self) -> float:
         """Returns the Theta value of an option through analytic formula
@@ -257,7 +270,7 @@ class EuropeanOption(Option):
         -------
             theta : (float) representing the option price's sensitivity to time passed, AKA time value"""
 
-        return ANALYTIC_FORMULA.theta(self.S, self.K, self.r, self.sigma, self.T, self.option_type)
+        return _analytic_formula().theta(self.S, self.K, self.r, self.sigma, self.T, self.option_type)
 
     def rho(self) -> float:
         """Returns the Rho value of an option through analytic formula
@@ -266,7 +279,7 @@ class EuropeanOption(Option):
         -------
             rho : (float) representing the option price's sensitivity to interest rate changes"""
 
-        return ANALYTIC_FORMULA.rho(self.S, self.K, self.r, self.sigma, self.T, self.option_type)
+        return _analytic_formula().rho(self.S, self.K, self.r, self.sigma, self.T, self.option_type)
 
     def option_greeks(self) -> dict:
         """Returns the Delta, Gamma, Vega, Theta, and Rho values of an option through analytic formula
@@ -302,7 +315,7 @@ class AsianOption(Option):
     ----------
     strike_price : (float) representing the strike price of the option (K)
 
-    risk_free_rate : (float) representing the risk-free rate, enter 5% as 0.05 (r)
+    risk_free_rate : (float or YieldCurve) representing the risk-free rate, enter 5% as 0.05 (r)
 
     maturity_time : (float) representing the time to expiry in years (T)
 
@@ -357,10 +370,60 @@ class DoubleDigitalOption(Option):
 
         pay_off = self._create_payoff()
 
-        self.MONTE_CARLO = MonteCarlo(self, pay_off)
+        # the band's geometric middle stands for the strike, e.g. to read a volatility surface
+        self.MONTE_CARLO = MonteCarlo(self.S, np.sqrt(self.U * self.D),
+                                      self.r, self.sigma, self.T, pay_off)
 
     def get_strike_price(self, upper: bool = True) -> float:
         return self.U if upper else self.D
 
     def _create_payoff(self) -> PayOff:
-        return PayOffDoubleDigital(self.U, self.D, self.C)
+        return PayOffDoubleDigital(self.U, self.D, self.C, self.option_type)
+
+
+class BarrierOption(Option):
+
+    """ Class for knock-in and knock-out barrier option contracts, continuously monitored.
+
+    Monte Carlo prices simulate one step per trading day and weight each path by its Brownian
+    bridge probability of crossing the barrier between two days.
+
+    Parameters
+    ----------
+    strike_price : (float) representing the strike price of the option (K)
+
+    risk_free_rate : (float or YieldCurve) representing the risk-free rate, enter 5% as 0.05 (r)
+
+    maturity_time : (float) representing the time to expiry in years (T)
+
+    underlying_price : (float) representing the price of the underlying asset (S)
+
+    volatility : (float) the volatility of the underlying, enter 5% as 0.05 (sigma)
+
+    barrier : (float) representing the barrier level (H)
+
+    barrier_type : (str) one of 'up-and-out', 'up-and-in', 'down-and-out' or 'down-and-in'"""
+
+    def __init__(self, strike_price: float, risk_free_rate: float, maturity_time: float,
+                 underlying_price: float, volatility: float, barrier: float,
+                 barrier_type: Literal['up-and-out', 'up-and-in', 'down-and-out', 'down-and-in'],
+                 option_type: Literal["call", "put"] = 'call') -> None:
+        self.barrier = barrier
+        self.barrier_type = barrier_type
+        super().__init__(strike_price, risk_free_rate, maturity_time,
+                         underlying_price, volatility, option_type)
+        self.MONTE_CARLO.barrier_correction = 'bridge'
+        self.MONTE_CARLO.steps_per_year = 252
+
+    def _create_payoff(self) -> PayOff:
+        return PayOffBarrier(self.K, self.option_type, self.barrier, self.barrier_type)
+
+    def black_scholes_price(self) -> float:
+        """Returns the closed form price of the option under Black-Scholes
+
+        Returns
+        -------
+            option_price : (float) calculated option price"""
+
+        return _analytic_formula().barrier_price(self.S, self.K, self.r, self.sigma, self.T,
+                                                 self.barrier, self.barrier_type, self.option_type)
@@ -1,14 +1,20 @@
 from abc import ABC, abstractmethod
 import numpy as np
-from typing import Sequence
+from typing import Literal, Sequence
 import numbers
-from scipy.stats import gmean
 
-from utils import validate_option_type
+from .utils import validate_option_type
 
 
 class PayOff(ABC):
 
+    # per path statistics (see backends.STATISTICS) the pay off can be computed from, None when
+    # it needs the whole path
+    path_statistics = None
+    # whether the pay off is twice differentiable in the path, pathwise second order Greeks
+    # are only unbiased for smooth pay offs
+    smooth = False
+
     @abstractmethod
     def __init__(self, strike_price: float, option_type: str) -> None:
         validate_option_type(option_type)
@@ -20,10 +26,22 @@ class PayOff(ABC):
         """Returns the pay off price at expiry for call option"""
         pass
 
+    def pay_off_statistics(self, statistics: dict) -> np.array:
+        """Returns the pay off of every path from its path_statistics, by default the pay off
+        of a path reduced to its terminal price"""
+        return self.pay_off(statistics['terminal'][np.newaxis])
+
+    def sampling_target(self) -> float:
+        """Returns the terminal price importance sampling centres the paths on, the strike by
+        default, None when no single price is worth centring on"""
+        return self.K
+
 
 class PayOffEuropean(PayOff):
     """Pay off for European call options"""
 
+    path_statistics = ('terminal',)
+
     def __init__(self, strike_price, option_type: str):
         super().__init__(strike_price, option_type)
 
@@ -37,6 +55,8 @@ class PayOffEuropean(PayOff):
 class PayOffDigital(PayOff):
     """Pay off for Digital """
 
+    path_statistics = ('terminal',)
+
     def __init__(self, strike_price: float, option_type: str, coupon: float):
         super().__init__(strike_price, option_type)
         self.C = coupon
@@ -50,21 +70,30 @@ class PayOffDigital(PayOff):
 
 
 class PayOffDoubleDigital(PayOff):
-    """Pay off for a Double Digital Option"""
+    """Pay off for a Double Digital Option, a call pays the coupon when the spot expires
+    between the strikes and a put when it expires outside of them"""
 
-    def __init__(self, upper_strike_price, lower_strike_price, coupon):
+    path_statistics = ('terminal',)
+
+    def __init__(self, upper_strike_price, lower_strike_price, coupon,
+                 option_type: Literal['call', 'put'] = 'call'):
+        super().__init__(None, option_type)
         self.U = upper_strike_price
         self.D = lower_strike_price
         self.C = coupon
 
     def pay_off(self, spot_prices: np.array) -> float:
         if self.option_type == 'call':
-            return np.where(spot_prices[-1] > self.D and spot_prices[-1] < self.U,
+            return np.where((spot_prices[-1] > self.D) & (spot_prices[-1] < self.U),
                             self.C, 0)
         elif self.option_type == 'put':
-            return np.where(spot_prices[-1] < self.D or spot_prices[-1] > self.U,
+            return np.where((spot_prices[-1] < self.D) | (spot_prices[-1] > self.U),
                             self.C, 0)
 
+    def sampling_target(self) -> float:
+        # the middle of the band, a put pays on both sides of it
+        return np.sqrt(self.U * self.D) if self.option_type == 'call' else None
+
 
 class PayOffAsianOption(PayOff):
 
@@ -84,17 +113,175 @@ class PayOffAsianOption(PayOff):
 
 class PayOffAsianOptionArithmetic(PayOffAsianOption):
 
+    path_statistics = ('terminal', 'mean')
+
     def __init__(self, strike_price: float, option_type: str,) -> None:
         super().__init__(strike_price, option_type)
 
+    def pay_off_statistics(self, statistics: dict) -> np.array:
+        return PayOffEuropean(statistics['mean'], self.option_type).pay_off(
+            statistics['terminal'][np.newaxis])
+
     def _get_mean(self, path):
-        return np.mean(path)
+        return np.mean(path, axis=0)
 
 
 class PayOffAsianOptionGeometric(PayOffAsianOption):
 
+    path_statistics = ('terminal', 'log_mean')
+
     def __init__(self, strike_price: float, option_type: str) -> None:
         super().__init__(strike_price, option_type)
 
+    def pay_off_statistics(self, statistics: dict) -> np.array:
+        mean = np.exp(statistics['log_mean'])
+        return PayOffEuropean(mean, self.option_type).pay_off(statistics['terminal'][np.newaxis])
+
     def _get_mean(self, path) -> float:
-        return gmean(path)
+        # same as scipy.stats.gmean along axis 0, without importing scipy.stats
+        return np.exp(np.mean(np.log(path), axis=0))
+
+
+class PayOffMultiAsset(PayOff):
+    """Pay off of an option struck on a function of several underlyings
+
+    spot_prices are (n_steps + 1, n_assets, num_sims) paths, the last row holding the terminal
+    price of every asset, and the option pays as a European option on the price returned by
+    _underlying."""
+
+    path_statistics = ('terminal',)
+
+    @abstractmethod
+    def __init__(self, strike_price: float, option_type: str) -> None:
+        super().__init__(strike_price, option_type)
+
+    @abstractmethod
+    def _underlying(self, spot_prices: np.array) -> np.array:
+        """Reduces (n_assets, num_sims) prices to the price the option is struck on"""
+        pass
+
+    def pay_off(self, spot_prices: np.array) -> np.array:
+        return PayOffEuropean(self.K, self.option_type).pay_off(
+            self._underlying(spot_prices[-1])[np.newaxis])
+
+
+class PayOffBasket(PayOffMultiAsset):
+    """Pay off on a weighted basket, sum(weights * S_T) against the strike"""
+
+    def __init__(self, strike_price: float, option_type: str, weights: Sequence[float]) -> None:
+        super().__init__(strike_price, option_type)
+        self.weights = np.asarray(weights, dtype=float)
+
+    def _underlying(self, spot_prices: np.array) -> np.array:
+        return self.weights @ spot_prices
+
+
+class PayOffSpread(PayOffMultiAsset):
+    """Pay off on the spread of the first two underlyings, S1_T - S2_T against the strike"""
+
+    def __init__(self, strike_price: float, option_type: str) -> None:
+        super().__init__(strike_price, option_type)
+
+    def _underlying(self, spot_prices: np.array) -> np.array:
+        return spot_prices[0] - spot_prices[1]
+
+
+class PayOffBestOf(PayOffMultiAsset):
+    """Pay off on the best performing underlying, max(S_T) against the strike"""
+
+    def __init__(self, strike_price: float, option_type: str) -> None:
+        super().__init__(strike_price, option_type)
+
+    def _underlying(self, spot_prices: np.array) -> np.array:
+        return np.max(spot_prices, axis=0)
+
+
+# Broadie, Glasserman and Kou (1997) shift, -zeta(1/2) / sqrt(2 pi)
+BGK_BETA = 0.5825971579390106
+
+BARRIER_TYPES = ('up-and-out', 'up-and-in', 'down-and-out', 'down-and-in')
+
+
+class PayOffBarrier(PayOff):
+    """Pay off of a knock-in or knock-out barrier option
+
+    The barrier is monitored at every point of the path, the initial price included. A
+    knock-out option pays as a European option when the path never reached the barrier and
+    nothing otherwise, a knock-in option the other way around.
+
+    Parameters
+    ----------
+    strike_price : (float) strike price of the option
+
+    option_type : (str) one of ['call' or 'put']
+
+    barrier : (float) barrier level
+
+    barrier_type : (str) one of 'up-and-out', 'up-and-in', 'down-and-out' or 'down-and-in'"""
+
+    def __init__(self, strike_price: float, option_type: str, barrier: float,
+                 barrier_type: Literal['up-and-out', 'up-and-in', 'down-and-out', 'down-and-in']) -> None:
+        super().__init__(strike_price, option_type)
+        if barrier_type not in BARRIER_TYPES:
+            raise ValueError(f"Invalid barrier_type. Allowed values are {BARRIER_TYPES}.")
+        self.barrier = barrier
+        self.barrier_type = barrier_type
+        self.up = barrier_type.startswith('up')
+        self.knock_in = barrier_type.endswith('in')
+        self.path_statistics = ('terminal', 'max' if self.up else 'min')
+
+    def _from_hits(self, terminal: np.array, hit: np.array) -> np.array:
+        vanilla = PayOffEuropean(self.K, self.option_type).pay_off(terminal[np.newaxis])
+        return np.where(hit == self.knock_in, vanilla, 0.0)
+
+    def pay_off(self, spot_prices: np.array) -> np.array:
+        hit = (np.max(spot_prices, axis=0) >= self.barrier) if self.up else \
+            (np.min(spot_prices, axis=0) <= self.barrier)
+        return self._from_hits(spot_prices[-1], hit)
+
+    def pay_off_statistics(self, statistics: dict) -> np.array:
+        hit = statistics['max'] >= self.barrier if self.up else statistics['min'] <= self.barrier
+        return self._from_hits(statistics['terminal'], hit)
+
+    def pay_off_bridge(self, spot_prices: np.array, sigma_sqrt_dt: float) -> np.array:
+        """Pay off under continuous monitoring of paths simulated on a coarse grid
+
+        Between two monitoring dates on the same side of the barrier, a Brownian bridge of
+        log-volatility sigma crosses it with probability
+        exp(-2 * log(B / S_i) * log(B / S_i+1) / (sigma^2 dt)). Each path pays its European
+        pay off weighted by the probability of having survived every step, or of having been
+        knocked in, which is also a lower variance estimator than sampling the crossings.
+
+        Parameters
+        ----------
+            spot_prices : (np.array) (n_steps + 1, num_sims) paths
+
+            sigma_sqrt_dt : (float) volatility of the log price over one step
+
+        Returns
+        -------
+            pay_off : (np.array) expected pay off of every path"""
+
+        # log distance to the barrier, 0 once the path is on the other side of it
+        distance = np.log(spot_prices / self.barrier)
+        if self.up:
+            distance = np.negative(distance, out=distance)
+        np.maximum(distance, 0, out=distance)
+
+        survival = np.ones(spot_prices.shape[1:])
+        for step in range(spot_prices.shape[0] - 1):
+            survival *= 1 - np.exp(-2 * distance[step] * distance[step + 1] / sigma_sqrt_dt ** 2)
+
+        vanilla = PayOffEuropean(self.K, self.option_type).pay_off(spot_prices[-1:])
+        return vanilla * (1 - survival if self.knock_in else survival)
+
+    def shifted(self, sigma_sqrt_dt: float) -> 'PayOffBarrier':
+        """Returns the pay off with the barrier moved towards the spot by
+        exp(BGK_BETA * sigma * sqrt(dt)). A discretely monitored barrier is worth the continuously
+        monitored one moved away by this factor (Broadie, Glasserman and Kou), so monitoring the
+        moved barrier on the grid approximates continuous monitoring of the original one"""
+
+        shift = np.exp(BGK_BETA * sigma_sqrt_dt)
+        return PayOffBarrier(self.K, self.option_type,
+                             self.barrier / shift if self.up else self.barrier * shift,
+                             self.barrier_type)
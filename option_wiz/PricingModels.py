@@ -1,17 +1,27 @@
 import numpy as np
-from scipy.stats import norm
-from scipy.optimize import newton
 
 from typing import Literal
 
-from utils import validate_option_type, validate_d_i
-from quant_math import gbm_simulation, merton_jump_diff, heston_path
-from PayOff import PayOff
+from .utils import validate_d_i, option_type_sign
+from .quant_math import gbm_simulation, merton_jump_diff, heston_path, norm_cdf, norm_pdf, \
+    gbm_path_statistics, heston_path_statistics, correlation_factor, correlated_gbm_terminal, \
+    correlated_gbm_simulation, gbm_stream_statistics, heston_stream_statistics, _normal_draws, \
+    _jump_draws, _correlated_normal_draws, _stream_key, _stream_draws, _stream_correlated_draws
+from .PayOff import PayOff, PayOffBarrier, BARRIER_TYPES
+from .Instrumentation import SimulationStats, DISABLED_STATS
+from .DrawStore import DrawStore
+from .Curves import RateCurve, zero_rate, forward_rate, log_growth, discount_factor
+from . import autodiff
 
 from abc import ABC, abstractmethod
 
 ### MONTE CARLO THETA NOT WORKING ###
 
+# default simulation grid, one step per trading hour
+TRADING_HOURS_PER_YEAR = 252 * 6.5
+
+BARRIER_CORRECTIONS = (None, 'bridge', 'bgk')
+
 
 class PricingModel(ABC):
 
@@ -50,19 +60,120 @@ class PricingModel(ABC):
 
 class Simulator(PricingModel):
 
+    # attributes changing how a price is computed, not its value, left out of description
+    _UNDESCRIBED = ('stats', 'draw_store')
+
     def __init__(self, S0: float, K: float, r: float, sigma: float, T: float,
-                 pay_off: PayOff):
+                 pay_off: PayOff, dtype=np.float64):
 
         self.S0 = S0
         self.K = K
         self.r = r
-        self.sigma = sigma
+        # continuous dividend yield, a number or a DividendCurve, set by engines that model it
+        self.q = 0.0
+        # a volatility surface is read once at the contract's strike and maturity
+        self.sigma = sigma(K, T) if callable(sigma) else sigma
         self.T = T
         self.pay_off = pay_off
+        # float type of the random draws and paths, payoffs are always averaged in float64
+        self.dtype = np.dtype(dtype)
+        self.stats = DISABLED_STATS
+        self.draw_store = None
+        self.seed = None
+        # monitoring dates per year, e.g. 252 for a daily or 52 for a weekly grid
+        self.steps_per_year = TRADING_HOURS_PER_YEAR
+
+    def use_draw_store(self, store: DrawStore = None, seed: int = None) -> None:
+        """Serves the random draws of every following simulation from an on-disk store
+
+        Draws are sampled once per seed, number of simulations, time grid, dtype and model
+        parameters they depend on, later runs read them back through memory maps. A stored
+        run prices as np.random.seed(seed) followed by the same run without a store would.
+
+        Parameters
+        ----------
+            store : (DrawStore) store to read and write the draws, None samples every run again
+
+            seed : (int) seed the draws are sampled under"""
+
+        if store is not None and seed is None:
+            raise ValueError("A seed is needed to key the stored draws.")
+        self.draw_store = store
+        self.seed = seed
+
+    def _fetch_draws(self, num_sims: int, scheme: tuple, sample) -> dict:
+        """Returns sample(), read from the draw store when one is in use"""
+
+        if self.draw_store is None:
+            return sample()
+        with self.stats.stage('draw_store') as stage:
+            draws = self.draw_store.fetch(self.seed, (self._time_steps(), num_sims), self.dtype,
+                                          scheme, sample)
+            stage.add(*draws.values())
+        return draws
+
+    def _stream_key(self) -> int:
+        """Returns the key of the stream draws of one simulation, see MonteCarlo"""
 
-    def _time_steps(self) -> int:
-        """Amount of hours in self.T years"""
-        return int(self.T * 252 * 6.5)
+        if self.draw_store is not None:
+            raise ValueError("Stream draws cannot be served from a draw store.")
+        return _stream_key()
+
+    def instrument(self, enabled: bool = True) -> SimulationStats:
+        """Turns the per stage instrumentation of the simulations on or off
+
+        Parameters
+        ----------
+            enabled : (bool) whether to record stages, a disabled engine records nothing
+
+        Returns
+        -------
+            stats : (SimulationStats) collecting the draw, path, payoff and discount stages of every
+                    following simulation, also available as self.stats"""
+
+        self.stats = SimulationStats() if enabled else DISABLED_STATS
+        return self.stats
+
+    def _time_steps(self, T: float = None) -> int:
+        """Amount of steps of self.steps_per_year in T years, self.T by default"""
+        return max(1, int((self.T if T is None else T) * self.steps_per_year))
+
+    def description(self) -> dict:
+        """Returns a JSON serialisable description of the engine, its class, model and contract
+        parameters, pay off and settings, everything its prices depend on but the draws.
+        Attributes of a type it does not know how to describe raise a TypeError rather than
+        being left out, two engines differing in them would otherwise share a description"""
+
+        def describe(value):
+            if isinstance(value, (bool, int, float, str)) or value is None:
+                return value
+            if isinstance(value, (np.generic, np.ndarray)):
+                return value.tolist()
+            if isinstance(value, np.dtype):
+                return value.str
+            if isinstance(value, (tuple, list)):
+                return [describe(item) for item in value]
+            if isinstance(value, PayOff):
+                return {'class': type(value).__name__,
+                        **{name: describe(item) for name, item in sorted(vars(value).items())}}
+            if isinstance(value, RateCurve):
+                return {'class': type(value).__name__, 'knots': value.knots.tolist(),
+                        'rates': value.rates.tolist()}
+            raise TypeError(f"{type(self).__name__} cannot describe a {type(value).__name__}.")
+
+        return {'class': type(self).__name__,
+                **{name: describe(value) for name, value in sorted(vars(self).items())
+                   if name not in self._UNDESCRIBED}}
+
+    @abstractmethod
+    def _simulate_pay_offs(self, **params) -> np.array:
+        """Returns the undiscounted pay off of every path simulated from the pricing params"""
+        pass
+
+    def _discounted_pay_offs(self, params: dict) -> np.array:
+        """Returns the discounted pay off of every path, the per path estimates of the price"""
+        return discount_factor(params['r'], params['T']) * \
+            np.asarray(self._simulate_pay_offs(**params), dtype=np.float64)
 
     @abstractmethod
     def _get_pricing_params(self, num_sims: int) -> dict:
@@ -83,7 +194,7 @@ class Simulator(PricingModel):
         -------
             option_price : (float) representing the option price"""
 
-        return self._model_pricing(self._get_pricing_params(num_sims))
+        return self._model_pricing(**self._get_pricing_params(num_sims))
 
     def delta(self, num_sims: int) -> float:
         """Returns the Delta value of an option through finite differencing
@@ -102,7 +213,7 @@ class Simulator(PricingModel):
 
         params_delta = params.copy()
 
-        params_delta['S'] += delta_S
+        params_delta['S0'] = params['S0'] + delta_S
 
         return (self._model_pricing(**params_delta)
                 - self._model_pricing(**params)) / delta_S
@@ -123,10 +234,10 @@ class Simulator(PricingModel):
         params = self._get_pricing_params(num_sims)
 
         params_delta_up = params.copy()
-        params_delta_up['S'] += delta_S
+        params_delta_up['S0'] = params['S0'] + delta_S
 
         params_delta_down = params.copy()
-        params_delta_down['S'] -= delta_S
+        params_delta_down['S0'] = params['S0'] - delta_S
 
         return (self._model_pricing(**params_delta_up) -
                 2 * self._model_pricing(**params) +
@@ -149,7 +260,7 @@ class Simulator(PricingModel):
 
         params_delta = params.copy()
 
-        params_delta['sigma'] += delta_sigma
+        params_delta['sigma'] = params['sigma'] + delta_sigma
 
         return (self._model_pricing(**params_delta)
                 - self._model_pricing(**params)) / delta_sigma
@@ -187,7 +298,7 @@ class Simulator(PricingModel):
 
         params_delta = params.copy()
 
-        params_delta['T'] += delta_T
+        params_delta['T'] = params['T'] + delta_T
 
         return (self._model_pricing(**params_delta)
                 - self._model_pricing(**params)) / (- delta_T)
@@ -209,7 +320,7 @@ class Simulator(PricingModel):
 
         params_delta = params.copy()
 
-        params_delta['rho'] += delta_rho
+        params_delta['r'] = params['r'] + delta_rho
 
         return (self._model_pricing(**params_delta)
                 - self._model_pricing(**params)) / delta_rho
@@ -225,14 +336,31 @@ class Simulator(PricingModel):
         }
 
 
+def _curve_zero_rate(curve: RateCurve, T: autodiff.Dual) -> autodiff.Dual:
+    """Returns the zero rate of the curve to the Dual maturity T. The integral of the rate is
+    linear in T around T.value, the forward being flat between knots, so dividing it by T
+    gives the zero rate's first and second derivatives in T exactly"""
+
+    maturity = T.value
+    return (log_growth(curve, maturity) + forward_rate(curve, maturity) * (T - maturity)) / T
+
+
 class AnalyticFormula():
     """Class for analytically deriving option characteristic"""
 
     def __init__(self):
         pass
 
+    def _get_sigma(self, sigma, K: float, T: float) -> float:
+        """Looks the volatility up at (K, T) when sigma is a volatility surface rather than a number"""
+        return sigma(K, T) if callable(sigma) else sigma
+
+    def _dividend_discount(self, x, q: float, T: float):
+        """Returns x e^(-qT), e.g. the dividend discounted price, x itself without dividends"""
+        return x if np.ndim(q) == 0 and q == 0 else x * np.exp(- q * T)
+
     def _get_d_i(self, S: float, K: float, r: float,
-                 sigma: float, T: float, i: Literal[1, 2]) -> float:
+                 sigma: float, T: float, i: Literal[1, 2], q: float = 0.0) -> float:
         """Returns the d_i components of the balck scholes formula where i is 1 or 2
 
         Parameters
@@ -249,6 +377,8 @@ class AnalyticFormula():
 
             i : (int) either 1 or 2 representing d_1 or d_2 of black scholes formula
 
+            q : (float) continuous dividend yield, 0.02 means 2%
+
         Returns
         -------
             d_i : (float) representing respective component of black scholes formula"""
@@ -256,10 +386,11 @@ class AnalyticFormula():
         validate_d_i(i)
 
         sigma_sqrt_t = sigma * np.sqrt(T)
-        return (np.log(S / K) + (r + np.power(-1, i - 1) * (sigma ** 2) / 2) * T) / sigma_sqrt_t
+        return (np.log(S / K) + (r - q + np.power(-1, i - 1) * (sigma ** 2) / 2) * T) / sigma_sqrt_t
 
     def black_scholes_price(self, S: float, K: float,
-                            r: float, sigma: float, T: float, option_type: Literal["call", "put"] = 'call') -> float:
+                            r: float, sigma: float, T: float, option_type: Literal["call", "put"] = 'call',
+                            q: float = 0.0) -> float:
         """Calculates the call price of the option using Black-Scholes Formula
 
         Parameters
@@ -268,31 +399,111 @@ class AnalyticFormula():
 
             K : (float) strike price 
 
-            r : (float) risk-free rate, 0.05 means 5% 
+            r : (float or YieldCurve) risk-free rate, 0.05 means 5% 
 
-            sigma : (float) volatility, 0.05 means 5% 
+            sigma : (float or VolatilitySurface) volatility, 0.05 means 5% 
 
             T : (float) time till maturity in years 
 
             option_type : (str) one of ['call' or 'put'] for desired option type
 
+            q : (float or DividendCurve) continuous dividend yield, 0.02 means 2%
+
         Returns
         -------
             option_price : (float) calculated option price"""
 
-        validate_option_type(option_type)
+        option_change = option_type_sign(option_type)
 
-        d_1 = self._get_d_i(S, K, r, sigma, T, 1)
+        sigma = self._get_sigma(sigma, K, T)
+        r, q = zero_rate(r, T), zero_rate(q, T)
 
-        d_2 = self._get_d_i(S, K, r, sigma, T, 2)
+        d_1 = self._get_d_i(S, K, r, sigma, T, 1, q)
 
-        if option_type == 'call':
-            return S * norm.cdf(d_1) - K * np.exp(- r * T) * norm.cdf(d_2)
-        else:
-            return norm.cdf(-d_2) * K * np.exp(- r * T) - norm.cdf(- d_1) * S
+        d_2 = self._get_d_i(S, K, r, sigma, T, 2, q)
+
+        return option_change * (self._dividend_discount(S, q, T) * norm_cdf(option_change * d_1)
+                                - K * np.exp(- r * T) * norm_cdf(option_change * d_2))
+
+    def barrier_price(self, S: float, K: float, r: float, sigma: float, T: float, barrier: float,
+                      barrier_type: Literal['up-and-out', 'up-and-in', 'down-and-out', 'down-and-in'],
+                      option_type: Literal["call", "put"] = 'call') -> float:
+        """Calculates the price of a continuously monitored barrier option without rebate,
+        Reiner and Rubinstein's formulas as given by Haug
+
+        Parameters
+        ----------
+            S : (float) underlying price 
+
+            K : (float) strike price 
+
+            r : (float or YieldCurve) risk-free rate, 0.05 means 5% 
+
+            sigma : (float or VolatilitySurface) volatility, 0.05 means 5% 
+
+            T : (float) time till maturity in years 
+
+            barrier : (float) barrier level
+
+            barrier_type : (str) one of 'up-and-out', 'up-and-in', 'down-and-out' or 'down-and-in'
+
+            option_type : (str) one of ['call' or 'put'] for desired option type
+
+        Returns
+        -------
+            option_price : (float) calculated option price"""
+
+        if barrier_type not in BARRIER_TYPES:
+            raise ValueError(f"Invalid barrier_type. Allowed values are {BARRIER_TYPES}.")
+        phi = option_type_sign(option_type)
+        up = barrier_type.startswith('up')
+        knock_in = barrier_type.endswith('in')
+        eta = -1 if up else 1
+
+        sigma = self._get_sigma(sigma, K, T)
+        r = zero_rate(r, T)
+        S, K, H, T = (np.asarray(x, dtype=np.float64) for x in (S, K, barrier, T))
+        sigma_sqrt_t = sigma * np.sqrt(T)
+        mu = (r - sigma ** 2 / 2) / sigma ** 2
+        discounted_K = K * np.exp(- r * T)
+        shift = (1 + mu) * sigma_sqrt_t
+
+        def vanilla_term(x):
+            return phi * S * norm_cdf(phi * x) - phi * discounted_K * norm_cdf(phi * (x - sigma_sqrt_t))
+
+        def reflected_term(y):
+            return phi * S * (H / S) ** (2 * (mu + 1)) * norm_cdf(eta * y) \
+                - phi * discounted_K * (H / S) ** (2 * mu) * norm_cdf(eta * (y - sigma_sqrt_t))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            A = vanilla_term(np.log(S / K) / sigma_sqrt_t + shift)
+            B = vanilla_term(np.log(S / H) / sigma_sqrt_t + shift)
+            C = reflected_term(np.log(H ** 2 / (S * K)) / sigma_sqrt_t + shift)
+            D = reflected_term(np.log(H / S) / sigma_sqrt_t + shift)
+
+        # (strike above the barrier, strike below it) of Haug's table
+        cases = {
+            ('down-and-in', 'call'): (C, A - B + D),
+            ('up-and-in', 'call'): (A, B - C + D),
+            ('down-and-in', 'put'): (B - C + D, A),
+            ('up-and-in', 'put'): (A - B + D, C),
+            ('down-and-out', 'call'): (A - C, B - D),
+            ('up-and-out', 'call'): (0.0 * A, A - B + C - D),
+            ('down-and-out', 'put'): (A - B + C - D, 0.0 * A),
+            ('up-and-out', 'put'): (B - D, A - C),
+        }
+        above, below = cases[(barrier_type, option_type)]
+        price = np.where(K > H, above, below)
+
+        # a barrier already reached at inception has knocked the option in or out
+        breached = S >= H if up else S <= H
+        vanilla = self.black_scholes_price(S, K, r, sigma, T, option_type)
+        price = np.where(breached, vanilla if knock_in else 0.0, price)
+        return price if price.ndim else float(price)
 
     def delta(self, S: float, K: float,
-              r: float, sigma: float, T: float, option_type: Literal["call", "put"] = 'call') -> float:
+              r: float, sigma: float, T: float, option_type: Literal["call", "put"] = 'call',
+              q: float = 0.0) -> float:
         """Returns the Delta value of an option through analytic formula
 
         Parameters
@@ -301,27 +512,30 @@ class AnalyticFormula():
 
             K : (float) strike price 
 
-            r : (float) risk-free rate, 0.05 means 5% 
+            r : (float or YieldCurve) risk-free rate, 0.05 means 5% 
 
-            sigma : (float) volatility, 0.05 means 5% 
+            sigma : (float or VolatilitySurface) volatility, 0.05 means 5% 
 
             T : (float) time till maturity in years 
 
             option_type : (str) one of ['call' or 'put'] for desired option type
 
+            q : (float or DividendCurve) continuous dividend yield, 0.02 means 2%
+
         Returns
         -------
             delta : (float) representing the option price's sensitivity to underlying price"""
-        validate_option_type(option_type)
+        option_change = option_type_sign(option_type)
 
-        option_change = 0 if option_type == 'call' else 1
+        sigma = self._get_sigma(sigma, K, T)
+        r, q = zero_rate(r, T), zero_rate(q, T)
 
-        d_1 = self._get_d_i(S, K, r, sigma, T, 1)
+        d_1 = self._get_d_i(S, K, r, sigma, T, 1, q)
 
-        return norm.cdf(d_1) - option_change
+        return option_change * self._dividend_discount(norm_cdf(option_change * d_1), q, T)
 
     def gamma(self, S: float, K: float,
-              r: float, sigma: float, T: float,) -> float:
+              r: float, sigma: float, T: float, q: float = 0.0) -> float:
         """Returns the Gamma value of an option through analytic formula
 
         Parameters
@@ -330,22 +544,27 @@ class AnalyticFormula():
 
             K : (float) strike price 
 
-            r : (float) risk-free rate, 0.05 means 5% 
+            r : (float or YieldCurve) risk-free rate, 0.05 means 5% 
 
-            sigma : (float) volatility, 0.05 means 5% 
+            sigma : (float or VolatilitySurface) volatility, 0.05 means 5% 
 
             T : (float) time till maturity in years 
 
+            q : (float or DividendCurve) continuous dividend yield, 0.02 means 2%
+
         Returns
         -------
             gamma : (float) representing the option delta's sensitivity to underlying price"""
 
-        d_1 = self._get_d_i(S, K, r, sigma, T, 1)
+        sigma = self._get_sigma(sigma, K, T)
+        r, q = zero_rate(r, T), zero_rate(q, T)
+
+        d_1 = self._get_d_i(S, K, r, sigma, T, 1, q)
 
-        return norm.pdf(d_1) / (S * sigma * np.sqrt(T))
+        return self._dividend_discount(norm_pdf(d_1), q, T) / (S * sigma * np.sqrt(T))
 
     def vega(self, S: float, K: float,
-             r: float, sigma: float, T: float,) -> float:
+             r: float, sigma: float, T: float, q: float = 0.0) -> float:
         """Returns the Vega value of an option through analytic formula
 
         Parameters
@@ -354,22 +573,28 @@ class AnalyticFormula():
 
             K : (float) strike price 
 
-            r : (float) risk-free rate, 0.05 means 5% 
+            r : (float or YieldCurve) risk-free rate, 0.05 means 5% 
 
-            sigma : (float) volatility, 0.05 means 5% 
+            sigma : (float or VolatilitySurface) volatility, 0.05 means 5% 
 
             T : (float) time till maturity in years 
 
+            q : (float or DividendCurve) continuous dividend yield, 0.02 means 2%
+
         Returns
         -------
             vega : (float) representing the option price's sensitivity to volatility"""
 
-        d_1 = self._get_d_i(S, K, r, sigma, T, 1)
+        sigma = self._get_sigma(sigma, K, T)
+        r, q = zero_rate(r, T), zero_rate(q, T)
 
-        return S * norm.pdf(d_1) * np.sqrt(T)
+        d_1 = self._get_d_i(S, K, r, sigma, T, 1, q)
+
+        return self._dividend_discount(S, q, T) * norm_pdf(d_1) * np.sqrt(T)
 
     def theta(self, S: float, K: float,
-              r: float, sigma: float, T: float, option_type: Literal["call", "put"] = 'call') -> float:
+              r: float, sigma: float, T: float, option_type: Literal["call", "put"] = 'call',
+              q: float = 0.0) -> float:
         """Returns the Theta value of an option through analytic formula
 
         Parameters
@@ -378,30 +603,41 @@ class AnalyticFormula():
 
             K : (float) strike price 
 
-            r : (float) risk-free rate, 0.05 means 5% 
+            r : (float or YieldCurve) risk-free rate, 0.05 means 5% 
 
-            sigma : (float) volatility, 0.05 means 5% 
+            sigma : (float or VolatilitySurface) volatility, 0.05 means 5% 
 
             T : (float) time till maturity in years 
 
             option_type : (str) one of ['call' or 'put'] for desired option type
 
+            q : (float or DividendCurve) continuous dividend yield, 0.02 means 2%
+
         Returns
         -------
             theta : (float) representing the option price's sensitivity to time passed, AKA time value"""
-        validate_option_type(option_type)
 
-        d_1 = self._get_d_i(S, K, r, sigma, T, 1)
-        d_2 = self._get_d_i(S, K, r, sigma, T, 2)
+        sigma = self._get_sigma(sigma, K, T)
+        # the carry of a curve at maturity is its forward rate there
+        r_forward, q_forward = forward_rate(r, T), forward_rate(q, T)
+        r, q = zero_rate(r, T), zero_rate(q, T)
+
+        d_1 = self._get_d_i(S, K, r, sigma, T, 1, q)
+        d_2 = self._get_d_i(S, K, r, sigma, T, 2, q)
 
-        option_change = 1 if option_type == 'call' else -1
+        option_change = option_type_sign(option_type)
+        S_q = self._dividend_discount(S, q, T)
 
-        return ((- S * norm.pdf(d_1) * sigma) / (2 * np.sqrt(T))) - \
-            option_change * r * K * \
-            np.exp(- r * T) * norm.cdf(option_change * d_2)
+        theta = ((- S_q * norm_pdf(d_1) * sigma) / (2 * np.sqrt(T))) - \
+            option_change * r_forward * K * \
+            np.exp(- r * T) * norm_cdf(option_change * d_2)
+        if np.ndim(q_forward) or q_forward != 0:
+            theta = theta + option_change * q_forward * S_q * norm_cdf(option_change * d_1)
+        return theta
 
     def rho(self, S: float, K: float,
-            r: float, sigma: float, T: float, option_type: Literal["call", "put"] = 'call') -> float:
+            r: float, sigma: float, T: float, option_type: Literal["call", "put"] = 'call',
+            q: float = 0.0) -> float:
         """Returns the Rho value of an option through analytic formula
 
         Parameters
@@ -410,28 +646,81 @@ class AnalyticFormula():
 
             K : (float) strike price 
 
-            r : (float) risk-free rate, 0.05 means 5% 
+            r : (float or YieldCurve) risk-free rate, 0.05 means 5% 
 
-            sigma : (float) volatility, 0.05 means 5% 
+            sigma : (float or VolatilitySurface) volatility, 0.05 means 5% 
 
             T : (float) time till maturity in years 
 
             option_type : (str) one of ['call' or 'put'] for desired option type
 
+            q : (float or DividendCurve) continuous dividend yield, 0.02 means 2%
+
         Returns
         -------
-            rho : (float) representing the option price's sensitivity to interest rate changes"""
+            rho : (float) representing the option price's sensitivity to interest rate changes,
+                  a parallel shift of a curve"""
+
+        sigma = self._get_sigma(sigma, K, T)
+        r, q = zero_rate(r, T), zero_rate(q, T)
+
+        d_2 = self._get_d_i(S, K, r, sigma, T, 2, q)
+
+        option_change = option_type_sign(option_type)
+
+        return option_change * K * T * np.exp(- r * T) * norm_cdf(option_change * d_2)
+
+    def sensitivities(self, S: float, K: float, r: float, sigma: float, T: float,
+                      option_type: Literal["call", "put"] = 'call', q: float = 0.0) -> dict:
+        """Returns the price with its first and second order sensitivities to S, sigma, r and T,
+        from one forward mode automatic differentiation sweep of black_scholes_price (see
+        autodiff.Dual). The third order speed, zomma and color are the derivatives of gamma's
+        formula evaluated on the same Duals. A volatility surface is read once at (K, T) and
+        held fixed. The zero rates of rate and dividend curves move with T along the curves, so
+        theta and charm match theta's forward rate carry, while rho is the derivative in a
+        parallel shift of r.
+
+        Parameters
+        ----------
+            S : (float or np.array) underlying price 
+
+            K : (float or np.array) strike price 
 
-        validate_option_type(option_type)
+            r : (float or np.array) risk-free rate, 0.05 means 5% 
 
-        d_2 = self._get_d_i(S, K, r, sigma, T, 2)
+            sigma : (float, np.array or VolatilitySurface) volatility, 0.05 means 5% 
 
-        option_change = 1 if option_type == 'call' else -1
+            T : (float or np.array) time till maturity in years 
 
-        return option_change * K * T * np.exp(- r * T) * norm.cdf(option_change * d_2)
+            option_type : (str) one of ['call' or 'put'] for desired option type
+
+            q : (float or DividendCurve) continuous dividend yield, 0.02 means 2%
+
+        Returns
+        -------
+            sensitivities : (dict) price, delta, gamma, vega, volga, vanna, rho, theta, charm
+                            (see autodiff.sensitivities), speed the derivative of gamma in S,
+                            zomma in sigma and color in the time passed"""
+
+        rate, dividend, maturity = r, q, T
+        S, sigma, r, T = autodiff.variables(S=S, sigma=self._get_sigma(sigma, K, T),
+                                            r=zero_rate(rate, maturity), T=T)
+        if isinstance(rate, RateCurve):
+            r = r + _curve_zero_rate(rate, T) - zero_rate(rate, maturity)
+        q = _curve_zero_rate(dividend, T) if isinstance(dividend, RateCurve) else dividend
+        greeks = autodiff.sensitivities(self.black_scholes_price(S, K, r, sigma, T, option_type, q))
+
+        gamma = self.gamma(S, K, r, sigma, T, q).gradient
+        index = {name: autodiff.VARIABLES.index(name) for name in ('S', 'sigma', 'T')}
+        for name, value in (('speed', gamma[..., index['S']]),
+                            ('zomma', gamma[..., index['sigma']]),
+                            ('color', - gamma[..., index['T']])):
+            greeks[name] = float(value) if np.ndim(value) == 0 else np.array(value)
+        return greeks
 
     def implied_volatility(self, S: float, K: float,
-                           r: float, T: float, option_price: float, option_type: Literal["call", "put"] = 'call'):
+                           r: float, T: float, option_price: float, option_type: Literal["call", "put"] = 'call',
+                           q: float = 0.0):
         """Utilizes the newton-raphson algorithm to compute the implied volatility of an option. Assumes 
         black-sholes is the pricing function and uses vega as its relevant derivative.
 
@@ -444,7 +733,7 @@ class AnalyticFormula():
 
             K : (float) strike price 
 
-            r : (float) risk-free rate, 0.05 means 5% 
+            r : (float or YieldCurve) risk-free rate, 0.05 means 5% 
 
             sigma : (float) volatility, 0.05 means 5% 
 
@@ -454,37 +743,78 @@ class AnalyticFormula():
 
             option_type : (str) one of ['call' or 'put'] for desired option type
 
+            q : (float or DividendCurve) continuous dividend yield, 0.02 means 2%
+
         Returns
         -------
             implied_volatility : (float) where 0.05 means 5% """
 
+        from scipy.optimize import newton
+
         intial_vol = np.sqrt(2 * np.pi / T) * (option_price / S)
 
         def f(x): return self.black_scholes_price(
-            S, K, r, x, T, option_type) - option_price
+            S, K, r, x, T, option_type, q) - option_price
 
-        def fprime(x): return self.vega(S, K, r, x, T)
+        def fprime(x): return self.vega(S, K, r, x, T, q)
 
         return newton(func=f, fprime=fprime, x0=intial_vol)
 
 
 class MonteCarlo(Simulator):
-    """Class utilizes Monte Carlo techniques to determine option qualities based on jump diffusion """
+    """Class utilizes Monte Carlo techniques to determine option qualities based on jump diffusion
+
+    Barrier pay offs are monitored at every simulated step. A barrier_correction of 'bridge'
+    weights each path by its Brownian bridge probability of crossing the barrier between steps,
+    'bgk' shifts the barrier by the Broadie-Glasserman-Kou continuity correction, either way a
+    coarse grid, e.g. steps_per_year=252, prices continuously monitored barriers.
+
+    With importance_sampling the paths are simulated under a measure centring them on the
+    pay off's sampling_target, an exponential tilt shifting the drift of the normal draws
+    (Girsanov) and the intensity and mean of the jumps. Every pay off is weighted by the
+    likelihood ratio of its path, so deep out of the money digitals or crash dependent
+    contracts are priced from paths that actually pay.
+
+    r may be a YieldCurve and q a dividend yield or DividendCurve, the paths then drift at
+    the forward rates of r - q step by step and pay offs are discounted on the curve.
+
+    With stream_draws every path generates its draws while it is stepped from a counter based
+    stream keyed by np.random, see quant_math.gbm_stream_statistics, instead of reading them
+    from pre-sampled (n_steps, num_sims) matrices. Pay offs on path statistics then take
+    O(num_sims) memory whatever the number of steps, other pay offs get the stream's draws as
+    matrices. The stream is not np.random's sequence, a seed gives a different, equally
+    distributed price than without stream_draws, and it cannot be importance sampled or
+    served from a draw store."""
 
     def __init__(self, S0: float, K: float, r: float, sigma: float, T: float,
                  pay_off: PayOff, lambda_j: float = 0.1,
-                 mu_j: float = -0.2, sigma_j: float = 0.3):
-        super().__init__(S0, K, r, sigma, T, pay_off)
+                 mu_j: float = -0.2, sigma_j: float = 0.3, dtype=np.float64,
+                 barrier_correction: Literal[None, 'bridge', 'bgk'] = None,
+                 steps_per_year: float = TRADING_HOURS_PER_YEAR, importance_sampling: bool = False,
+                 q: float = 0.0, stream_draws: bool = False):
+        super().__init__(S0, K, r, sigma, T, pay_off, dtype)
+        if stream_draws and importance_sampling:
+            raise ValueError("Stream draws cannot be importance sampled.")
+        self.q = q
         self.lambda_j = lambda_j
         self.mu_j = mu_j
         self.sigma_j = sigma_j
+        if barrier_correction not in BARRIER_CORRECTIONS:
+            raise ValueError(f"Invalid barrier_correction. Allowed values are {BARRIER_CORRECTIONS}.")
+        self.barrier_correction = barrier_correction
+        self.steps_per_year = steps_per_year
+        self.importance_sampling = importance_sampling
+        self.stream_draws = stream_draws
 
     def _random_draws(self, num_sims):
         """Returns a standard random sample"""
 
         time_steps = self._time_steps()
 
-        return np.random.normal(0, 1, size=(time_steps, num_sims))
+        with self.stats.stage('draws') as stage:
+            draws = _normal_draws((time_steps, num_sims), self.dtype)
+            stage.add(draws)
+        return draws
 
     def _random_jump_draws(self, num_sims: int, lambda_j: float = 0.1,
                            mu_j: float = -0.2,  sigma_j: float = 0.3):
@@ -508,9 +838,92 @@ class MonteCarlo(Simulator):
 
         n_steps = self._time_steps()
         dt = self.T / n_steps
-        return np.random.normal(mu_j, sigma_j, size=(n_steps, num_sims)) * np.random.poisson(lambda_j * dt, size=(n_steps, num_sims))
+        with self.stats.stage('jump_draws') as stage:
+            jump_draws = _jump_draws((n_steps, num_sims), lambda_j * dt, mu_j, sigma_j, self.dtype)
+            stage.add(jump_draws)
+        return jump_draws
+
+    def importance_parameters(self) -> dict:
+        """Returns the sampling measure of importance sampling, the Esscher transform of the
+        terminal log return centring it on the pay off's sampling target
+
+        Tilting by h shifts the Brownian motion by h * sigma per unit of time, multiplies the
+        jump intensity by E[exp(h * Y)] and moves the jump mean by h * sigma_j^2, h being solved
+        so the expected terminal log price sits on the target.
+
+        Returns
+        -------
+            parameters : (dict) drift_shift of every normal draw, tilted lambda_j and mu_j"""
+
+        target = self.pay_off.sampling_target()
+        if target is None:
+            return {'drift_shift': 0.0, 'lambda_j': self.lambda_j, 'mu_j': self.mu_j}
+        from scipy.optimize import brentq
+
+        lambda_j, mu_j, sigma_j, T = self.lambda_j, self.mu_j, self.sigma_j, self.T
+        distance = np.log(target / self.S0) - log_growth(self.r - self.q, T) + self.sigma ** 2 / 2 * T
+
+        def tilted_mean(h):
+            # derivative of the cumulant generating function of the log return at h
+            return h * self.sigma ** 2 * T + lambda_j * T * \
+                np.exp(h * mu_j + h ** 2 * sigma_j ** 2 / 2) * (mu_j + h * sigma_j ** 2) - distance
+
+        bound = 1.0
+        with np.errstate(over='ignore'):
+            while tilted_mean(-bound) > 0 or tilted_mean(bound) < 0:
+                bound *= 2
+            h = brentq(tilted_mean, -bound, bound)
+
+        n_steps = self._time_steps()
+        return {'drift_shift': float(h * self.sigma * np.sqrt(T / n_steps)),
+                'lambda_j': float(lambda_j * np.exp(h * mu_j + h ** 2 * sigma_j ** 2 / 2)),
+                'mu_j': float(mu_j + h * sigma_j ** 2)}
+
+    def _importance_draws(self, num_sims: int, drift_shift: float, lambda_j: float,
+                          mu_j: float) -> dict:
+        """Returns draws of the measure of importance_parameters and the likelihood ratio of
+        the model to that measure for every path"""
+
+        n_steps = self._time_steps()
+        dt = self.T / n_steps
+        with self.stats.stage('draws') as stage:
+            draws = _normal_draws((n_steps, num_sims), self.dtype, loc=drift_shift)
+            stage.add(draws)
+        with self.stats.stage('jump_draws') as stage:
+            jump_draws, jump_counts = _jump_draws((n_steps, num_sims), lambda_j * dt, mu_j,
+                                                  self.sigma_j, self.dtype, return_counts=True)
+            stage.add(jump_draws)
+
+        with self.stats.stage('likelihood_ratio') as stage:
+            log_ratio = -drift_shift * np.sum(draws, axis=0, dtype=np.float64) \
+                + n_steps * drift_shift ** 2 / 2
+            if lambda_j != self.lambda_j:
+                log_ratio += (lambda_j - self.lambda_j) * self.T \
+                    + jump_counts * np.log(self.lambda_j / lambda_j)
+            if mu_j != self.mu_j:
+                log_ratio += ((self.mu_j - mu_j) * np.sum(jump_draws, axis=0, dtype=np.float64)
+                              + jump_counts * (mu_j ** 2 - self.mu_j ** 2) / 2) / self.sigma_j ** 2
+            likelihood_ratio = np.exp(log_ratio)
+            stage.add(likelihood_ratio)
+
+        return {'random_draws': draws, 'random_jump_draws': jump_draws,
+                'likelihood_ratio': likelihood_ratio}
 
     def _get_pricing_params(self, num_sims):
+        scheme = ('merton-sparse', self.T, self.lambda_j, self.mu_j, self.sigma_j)
+        if self.stream_draws:
+            draws = {'random_draws': None, 'random_jump_draws': None,
+                     'stream': self._stream_key()}
+        elif self.importance_sampling:
+            tilt = self.importance_parameters()
+            draws = self._fetch_draws(num_sims, scheme + tuple(tilt.values()),
+                                      lambda: self._importance_draws(num_sims, **tilt))
+        else:
+            draws = self._fetch_draws(
+                num_sims, scheme,
+                lambda: {'random_draws': self._random_draws(num_sims),
+                         'random_jump_draws': self._random_jump_draws(num_sims, self.lambda_j,
+                                                                      self.mu_j, self.sigma_j)})
         return {
             'S0': self.S0,
             'K': self.K,
@@ -518,21 +931,40 @@ class MonteCarlo(Simulator):
             'sigma': self.sigma,
             'T': self.T,
             'pay_off': self.pay_off,
+            'q': self.q,
             'lambda_j': self.lambda_j,
             'mu_j': self.mu_j,
             'sigma_j': self.sigma_j,
             'num_sims': num_sims,
-            'random_draws': self._random_draws(num_sims),
-            'random_jump_draws': self._random_jump_draws(num_sims, self.lambda_j, self.mu_j, self.sigma_j)
-
+            'random_draws': draws['random_draws'],
+            'random_jump_draws': draws['random_jump_draws'],
+            'likelihood_ratio': draws.get('likelihood_ratio'),
+            'stream': draws.get('stream')
         }
 
     def _model_pricing(self, S0: float, K: float, r: float, sigma: float,
                        T: float, pay_off: PayOff, lambda_j: float = 0.1,
                        mu_j: float = -0.2, sigma_j: float = 0.3,
-                       jump_diff: bool = True, num_sims: int = 10_000, random_draws: np.array = None, random_jump_draws: np.array = None):
+                       jump_diff: bool = True, num_sims: int = 10_000, random_draws: np.array = None, random_jump_draws: np.array = None,
+                       likelihood_ratio: np.array = None, q: float = 0.0, stream: int = None):
         """Returns the price of a Euopean option using a Monte Carlo Simulation. Note 
-        that the price gets more accurate as the simulations increase 
+        that the price gets more accurate as the simulations increase, see _simulate_pay_offs
+        for the parameters"""
+
+        payoffs = self._simulate_pay_offs(S0, K, r, sigma, T, pay_off, lambda_j, mu_j, sigma_j,
+                                          jump_diff, num_sims, random_draws, random_jump_draws,
+                                          likelihood_ratio, q, stream)
+
+        # calculating option price
+        with self.stats.stage('discount'):
+            return discount_factor(r, T) * np.mean(payoffs, dtype=np.float64)
+
+    def _simulate_pay_offs(self, S0: float, K: float, r: float, sigma: float,
+                           T: float, pay_off: PayOff, lambda_j: float = 0.1,
+                           mu_j: float = -0.2, sigma_j: float = 0.3,
+                           jump_diff: bool = True, num_sims: int = 10_000, random_draws: np.array = None, random_jump_draws: np.array = None,
+                           likelihood_ratio: np.array = None, q: float = 0.0, stream: int = None):
+        """Returns the undiscounted pay off of every simulated path
 
         Parameters
         ----------
@@ -540,7 +972,7 @@ class MonteCarlo(Simulator):
 
             K : (float) strike price 
 
-            r : (float) risk-free rate, 0.05 means 5% 
+            r : (float or YieldCurve) risk-free rate, 0.05 means 5% 
 
             sigma : (float) volatility, 0.05 means 5% 
 
@@ -553,48 +985,205 @@ class MonteCarlo(Simulator):
             random_draws : *OPTIONAL* (np.array) randomly sample paths from standard normal in size (int(T * 252 * 6.5), num_sims)
 
             random_jump_draws : (np.array) pre-sample random draws for the jump component of the model in size (int(T * 252 * 6.5), num_sims)
+
+            likelihood_ratio : (np.array) weight of every path when the draws were importance sampled
+
+            q : (float or DividendCurve) continuous dividend yield, 0.02 means 2%
+
+            stream : (int) key of the stream draws used in place of random_draws and
+                     random_jump_draws, see stream_draws
         Returns
         -------
-            option_price : (float) calculated option price"""
+            payoffs : (np.array) pay off of every path"""
 
         total_trading_hours = self._time_steps()
-
-        if jump_diff:
-            sims = merton_jump_diff(S0=S0, mu=r, sigma=sigma, lambda_j=lambda_j,
-                                    mu_j=mu_j, sigma_j=sigma_j, T=T, n_steps=total_trading_hours,
-                                    random_draws=random_draws, num_sims=num_sims, random_jump_draws=random_jump_draws)
+        carry = r - q
+
+        correction = self.barrier_correction if isinstance(pay_off, PayOffBarrier) else None
+        sigma_sqrt_dt = sigma * np.sqrt(T / total_trading_hours)
+        if correction == 'bgk':
+            pay_off = pay_off.shifted(sigma_sqrt_dt)
+
+        if stream is not None and (pay_off.path_statistics is None or correction == 'bridge'):
+            # pay offs on the whole paths read the stream's draws as matrices
+            with self.stats.stage('draws') as stage:
+                random_draws, random_jump_draws = _stream_draws(
+                    stream, total_trading_hours, num_sims,
+                    lambda_j * T / total_trading_hours if jump_diff else 0.0, mu_j, sigma_j,
+                    self.dtype)
+                stage.add(random_draws, random_jump_draws)
+            stream = None
+
+        if stream is not None:
+            statistics = gbm_stream_statistics(
+                S0=S0, mu=carry, sigma=sigma, T=T, n_steps=total_trading_hours, num_sims=num_sims,
+                key=stream, statistics=pay_off.path_statistics,
+                lambda_j=lambda_j if jump_diff else 0.0, mu_j=mu_j, sigma_j=sigma_j,
+                dtype=self.dtype, stats=self.stats)
+
+            with self.stats.stage('payoff') as stage:
+                payoffs = pay_off.pay_off_statistics(statistics)
+                stage.add(payoffs)
+        elif pay_off.path_statistics is not None and correction != 'bridge':
+            # the pay off only needs per path statistics, the paths themselves are not kept.
+            # draws are taken in the order merton_jump_diff takes them so seeds give the same price
+            if jump_diff and random_draws is None:
+                random_draws = self._random_draws(num_sims)
+            if jump_diff and random_jump_draws is None:
+                random_jump_draws = self._random_jump_draws(num_sims, lambda_j, mu_j, sigma_j)
+            statistics = gbm_path_statistics(
+                S0=S0, mu=carry, sigma=sigma, T=T, n_steps=total_trading_hours, num_sims=num_sims,
+                statistics=pay_off.path_statistics, random_draws=random_draws,
+                random_jump_draws=random_jump_draws if jump_diff else None,
+                dtype=self.dtype, stats=self.stats)
+
+            with self.stats.stage('payoff') as stage:
+                payoffs = pay_off.pay_off_statistics(statistics)
+                stage.add(payoffs)
         else:
-            # simulating various option paths with Geometric Brownian Motion
-            sims = gbm_simulation(S0=S0, mu=r,
-                                  n_steps=total_trading_hours, T=T,
-                                  sigma=sigma, num_sims=num_sims, random_draws=random_draws)
+            if jump_diff:
+                sims = merton_jump_diff(S0=S0, mu=carry, sigma=sigma, lambda_j=lambda_j,
+                                        mu_j=mu_j, sigma_j=sigma_j, T=T, n_steps=total_trading_hours,
+                                        random_draws=random_draws, num_sims=num_sims, random_jump_draws=random_jump_draws,
+                                        dtype=self.dtype, stats=self.stats)
+            else:
+                # simulating various option paths with Geometric Brownian Motion
+                sims = gbm_simulation(S0=S0, mu=carry,
+                                      n_steps=total_trading_hours, T=T,
+                                      sigma=sigma, num_sims=num_sims, random_draws=random_draws,
+                                      dtype=self.dtype, stats=self.stats)
+
+            # determining all payouts from various paths
+            with self.stats.stage('payoff') as stage:
+                payoffs = pay_off.pay_off_bridge(sims, sigma_sqrt_dt) if correction == 'bridge' \
+                    else pay_off.pay_off(sims)
+                stage.add(payoffs)
+
+        if likelihood_ratio is not None:
+            payoffs = payoffs * likelihood_ratio
+        return payoffs
+
+    def control_variate_price(self, num_sims: int, control_price: float) -> float:
+        """Returns the price with the jumps switched off as control variate
+
+        The pay off is simulated with and without the jumps from the same normal draws, the
+        diffusion only pay offs, whose exact price under Black-Scholes is control_price, then
+        correct the jump diffusion estimate by their regression coefficient. With a barrier pay
+        off and the 'bridge' correction, control_price is AnalyticFormula.barrier_price.
 
-        # determining all payouts from various paths
-        payoffs = pay_off.pay_off(sims)
+        Parameters
+        ----------
+            num_sims : (int) number of simulations to run
 
-        # calculating option price
-        return np.exp(- r * T) * np.mean(payoffs)
+            control_price : (float) Black-Scholes price of the pay off
+
+        Returns
+        -------
+            option_price : (float) calculated option price"""
+
+        params = self._get_pricing_params(num_sims)
+        payoffs = np.asarray(self._simulate_pay_offs(**params), dtype=np.float64)
+        controls = np.asarray(self._simulate_pay_offs(**dict(params, jump_diff=False)),
+                              dtype=np.float64)
+
+        variance = np.var(controls)
+        beta = np.cov(payoffs, controls, bias=True)[0, 1] / variance if variance > 0 else 0.0
+        discount = discount_factor(self.r, self.T)
+        return discount * (np.mean(payoffs) - beta * np.mean(controls)) + beta * control_price
+
+
+    def pathwise_greeks(self, num_sims: int, memory_cap: int = 256 * 2 ** 20) -> dict:
+        """Returns the price with its pathwise sensitivities to S0, sigma, r and T
+
+        The draws of one simulation are fed to merton_jump_diff with the parameters as
+        autodiff Duals, so every path and pay off carries its derivatives and a single run
+        gives all first and second order Greeks, from the same draws as the price and without
+        the re-simulations of finite differences. Pay offs only needing the terminal price are
+        differentiated from the summed draws, path dependent ones on their full paths in chunks
+        of paths under memory_cap. Pathwise derivatives are unbiased for pay offs continuous in
+        the path, e.g. European and Asian options, they miss the jump of digital and barrier
+        pay offs. Second order ones also need a smooth pay off, path by path those of a kinked
+        pay off such as max(S - K, 0) miss the kink, its gamma being zero, so they are only
+        returned for pay offs declaring themselves smooth. Rate and dividend curves enter
+        through their zero rates to T.
+        The barrier correction is not applied and the jump times are held fixed when T moves.
+
+        Parameters
+        ----------
+            num_sims : (int) number of simulations to run
+
+            memory_cap : (int) bytes the paths and their derivatives may use at once
+
+        Returns
+        -------
+            sensitivities : (dict) price, delta, vega, rho and theta, with gamma, volga, vanna
+                            and charm when the pay off is smooth, see autodiff.sensitivities"""
+
+        params = self._get_pricing_params(num_sims)
+        draws, jumps = params['random_draws'], params['random_jump_draws']
+        likelihood_ratio = params['likelihood_ratio']
+        n_steps = self._time_steps()
+        if params['stream'] is not None:
+            draws, jumps = _stream_draws(params['stream'], n_steps, num_sims,
+                                         self.lambda_j * self.T / n_steps, self.mu_j, self.sigma_j,
+                                         self.dtype)
+        if self.pay_off.path_statistics == ('terminal',):
+            # S_T only depends on the sum of the draws, one step of their rescaled sum
+            draws = np.sum(draws, axis=0, keepdims=True, dtype=np.float64) / np.sqrt(n_steps)
+            jumps = np.sum(jumps, axis=0, keepdims=True, dtype=np.float64)
+            n_steps = 1
+
+        q = zero_rate(self.q, self.T)
+        S0, sigma, r, T = autodiff.variables(S=self.S0, sigma=self.sigma,
+                                             r=zero_rate(self.r, self.T), T=self.T)
+        n = len(autodiff.VARIABLES)
+        # a path point carries its value, gradient and Hessian, a few of them alive at once
+        chunk = max(1, int(memory_cap // ((n_steps + 1) * (1 + n + n * n) * 8 * 4)))
+        total = 0.0
+        for start in range(0, num_sims, chunk):
+            sims = slice(start, start + chunk)
+            paths = merton_jump_diff(S0=S0, mu=r - q, sigma=sigma, T=T, n_steps=n_steps,
+                                     num_sims=draws[:, sims].shape[1], random_draws=draws[:, sims],
+                                     random_jump_draws=jumps[:, sims])
+            payoffs = self.pay_off.pay_off(paths)
+            if likelihood_ratio is not None:
+                payoffs = payoffs * likelihood_ratio[sims]
+            total = total + np.sum(payoffs)
+
+        greeks = autodiff.sensitivities(np.exp(- r * T) * total / num_sims)
+        if not self.pay_off.smooth:
+            for name in autodiff.SECOND_ORDER:
+                del greeks[name]
+        return greeks
 
 
 class StochasticVolatility(Simulator):
 
     def __init__(self, S0: float, K: float, r: float, T: float,
                  sigma: float, corr: float, epsilon: float,
-                 kappa: float, theta: float, pay_off: PayOff,):
+                 kappa: float, theta: float, pay_off: PayOff, dtype=np.float64, q: float = 0.0,
+                 stream_draws: bool = False):
 
-        super().__init__(S0, K, r, sigma, T, pay_off)
+        # sigma is the initial variance, a volatility surface gives it as a volatility
+        if callable(sigma):
+            sigma = sigma(K, T) ** 2
+        super().__init__(S0, K, r, sigma, T, pay_off, dtype)
+        # r may be a YieldCurve and q a DividendCurve, as in MonteCarlo
+        self.q = q
 
         self.corr = corr
         self.epsilon = epsilon
         self.kappa = kappa
         self._theta = theta
+        # paths generate their draws while stepped, see MonteCarlo
+        self.stream_draws = stream_draws
 
     def _random_draws(self, T, num_sims, corr):
         n_steps = self._time_steps(T)
-        return np.random.multivariate_normal(mu=[0, 0],
-                                             cov=np.array(
-                                                 [[1, corr], [corr, 1]]),
-                                             size=(num_sims, n_steps))
+        with self.stats.stage('draws') as stage:
+            draws = _correlated_normal_draws(num_sims, n_steps, corr, self.dtype)
+            stage.add(draws)
+        return draws
 
     def _get_pricing_params(self, num_sims: int) -> dict:
         return {
@@ -607,22 +1196,40 @@ class StochasticVolatility(Simulator):
             'kappa': self.kappa,
             'theta': self._theta,
             'pay_off': self.pay_off,
+            'q': self.q,
             'num_sims': num_sims,
-            'random_draws': self._random_draws(self.T, num_sims, self.corr)
+            'random_draws': None if self.stream_draws else self._fetch_draws(
+                num_sims, ('heston', self.corr),
+                lambda: {'random_draws': self._random_draws(self.T, num_sims, self.corr)})['random_draws'],
+            'stream': self._stream_key() if self.stream_draws else None
         }
 
     def _model_pricing(self, S0: float, r: float, T: float,
                        sigma: float, corr: float, epsilon: float,
                        kappa: float, theta: float, pay_off: PayOff, num_sims: int,
-                       random_draws: np.array = None) -> float:
+                       random_draws: np.array = None, q: float = 0.0, stream: int = None) -> float:
         """Returns the price of a Euopean option using a Monte Carlo Simulation based on
-        Heston's stochastic volaility model 
+        Heston's stochastic volaility model, see _simulate_pay_offs for the parameters"""
+
+        payoffs = self._simulate_pay_offs(S0, r, T, sigma, corr, epsilon, kappa, theta, pay_off,
+                                          num_sims, random_draws, q, stream)
+
+        # calculating option price
+        with self.stats.stage('discount'):
+            return discount_factor(r, T) * np.mean(payoffs, dtype=np.float64)
+
+    def _simulate_pay_offs(self, S0: float, r: float, T: float,
+                           sigma: float, corr: float, epsilon: float,
+                           kappa: float, theta: float, pay_off: PayOff, num_sims: int,
+                           random_draws: np.array = None, q: float = 0.0,
+                           stream: int = None) -> np.array:
+        """Returns the undiscounted pay off of every path of Heston's stochastic volaility model
 
         Parameters
         ----------
             S0 : (float) underlying price 
 
-            r : (float) risk-free rate, 0.05 means 5% 
+            r : (float or YieldCurve) risk-free rate, 0.05 means 5% 
 
             T : (float) time till maturity in years 
 
@@ -641,22 +1248,188 @@ class StochasticVolatility(Simulator):
             num_sims : *OPTIONAL* (int) number of Monte Carlo Simulations to run
 
             random_draws : (np.array) pre-sample random draws which must be
-                                        np.random.multivariate_normal(mu=[0, 0], 
+                                        np.random.multivariate_normal(mean=[0, 0], 
                                                                     cov=np.array([[1, corr], [corr, 1]]),
                                                                     size=(num_sims, n_steps))
 
+            q : (float or DividendCurve) continuous dividend yield, 0.02 means 2%
+
+            stream : (int) key of the stream draws used in place of random_draws, see
+                     MonteCarlo's stream_draws
+
         Returns
         -------
-            option_price : (float) calculated option price"""
+            payoffs : (np.array) pay off of every path"""
+
+        # bumped maturities keep the grid of the pre-sampled draws, or of the stream
+        if stream is not None:
+            total_trading_hours = self._time_steps()
+        else:
+            total_trading_hours = self._time_steps(T) if random_draws is None else random_draws.shape[1]
+
+        if stream is not None and pay_off.path_statistics is None:
+            # pay offs on the whole paths read the stream's draws as matrices
+            with self.stats.stage('draws') as stage:
+                random_draws = _stream_correlated_draws(stream, num_sims, total_trading_hours,
+                                                        corr, self.dtype)
+                stage.add(random_draws)
+            stream = None
+
+        if stream is not None:
+            statistics = heston_stream_statistics(
+                S0=S0, mu=r - q, n_steps=total_trading_hours, T=T, sigma=sigma, corr=corr,
+                epsilon=epsilon, kappa=kappa, theta=theta, num_sims=num_sims, key=stream,
+                statistics=pay_off.path_statistics, dtype=self.dtype, stats=self.stats)
+
+            with self.stats.stage('payoff') as stage:
+                payoffs = pay_off.pay_off_statistics(statistics)
+                stage.add(payoffs)
+        elif pay_off.path_statistics is not None:
+            # the pay off only needs per path statistics, the paths themselves are not kept
+            statistics = heston_path_statistics(
+                S0=S0, mu=r - q, n_steps=total_trading_hours, T=T, sigma=sigma, corr=corr,
+                epsilon=epsilon, kappa=kappa, theta=theta, num_sims=num_sims,
+                statistics=pay_off.path_statistics, random_draws=random_draws,
+                dtype=self.dtype, stats=self.stats)
+
+            with self.stats.stage('payoff') as stage:
+                payoffs = pay_off.pay_off_statistics(statistics)
+                stage.add(payoffs)
+        else:
+            sims = heston_path(S0=S0, mu=r - q, n_steps=total_trading_hours, T=T, sigma=sigma,
+                               corr=corr, epsilon=epsilon, kappa=kappa, theta=theta,
+                               num_sims=num_sims, random_draws=random_draws, dtype=self.dtype,
+                               stats=self.stats)
+
+            # determining all payouts from various paths, heston_path is (num_sims, n_steps + 1)
+            with self.stats.stage('payoff') as stage:
+                payoffs = pay_off.pay_off(sims.T)
+                stage.add(payoffs)
+
+        return payoffs
+
+
+class MultiAssetMonteCarlo(Simulator):
+    """Monte Carlo pricing of options on several correlated Geometric Brownian motions, e.g.
+    baskets, spreads and best-of options through PayOffMultiAsset pay offs.
+
+    The correlation matrix is factored once. Pay offs on the terminal prices only (a
+    path_statistics of ('terminal',)) are priced from exact one step terminal draws, other pay
+    offs from full paths. Either way the simulations run in chunks sized to memory_cap, each
+    chunk drawing from its own generator seeded from (seed, chunk), so memory is
+    O(n_assets * chunk) in terminal mode and the greeks' bumped runs reuse the same draws.
+
+    Parameters
+    ----------
+    S0 : (np.array) price of every underlying
+
+    K : (float) strike price
 
-        total_trading_hours = self._time_steps(T)
+    r : (float) risk-free rate, 0.05 means 5%
 
-        sims = heston_path(S0=S0, mu=r, n_steps=total_trading_hours, T=T, sigma=sigma,
-                           corr=corr, epsilon=epsilon, kappa=kappa, theta=theta,
-                           num_sims=num_sims, random_draws=random_draws)
+    sigma : (np.array) volatility of every underlying, 0.05 means 5%
 
-        # determining all payouts from various paths
-        payoffs = pay_off.pay_off(sims)
+    T : (float) time till maturity in years
+
+    pay_off : (PayOff) pay off of the (n_steps + 1, n_assets, num_sims) paths
+
+    correlation : (np.array) (n_assets, n_assets) correlation matrix of the underlyings' returns
+
+    factorization : (str) 'cholesky' or 'eigen', see quant_math.correlation_factor
+
+    n_steps : (int) time steps of the path mode, one per trading hour by default
+
+    memory_cap : (int) bytes the prices of one chunk may take"""
+
+    def __init__(self, S0, K: float, r: float, sigma, T: float, pay_off: PayOff, correlation,
+                 factorization: str = 'cholesky', n_steps: int = None,
+                 memory_cap: int = 256 * 2 ** 20, dtype=np.float64):
+        super().__init__(np.asarray(S0, dtype=float), K, r, np.asarray(sigma, dtype=float), T,
+                         pay_off, dtype)
+        self.correlation = np.asarray(correlation, dtype=float)
+        if self.correlation.shape != (len(self.S0), len(self.S0)) or self.sigma.shape != self.S0.shape:
+            raise ValueError("S0, sigma and correlation must describe the same number of assets.")
+        self.factor = correlation_factor(self.correlation, factorization)
+        self.n_steps = n_steps
+        self.memory_cap = memory_cap
+
+    def _time_steps(self, T: float = None) -> int:
+        return self.n_steps if self.n_steps is not None else super()._time_steps(T)
+
+    def _terminal_only(self, pay_off: PayOff) -> bool:
+        return pay_off.path_statistics == ('terminal',)
+
+    def _chunk_size(self, pay_off: PayOff) -> int:
+        # the terminal mode holds the draws and the prices of a chunk, the path mode its path
+        rows = 2 if self._terminal_only(pay_off) else self._time_steps() + 1
+        return max(1, int(self.memory_cap // (rows * len(self.S0) * self.dtype.itemsize)))
+
+    def _get_pricing_params(self, num_sims: int) -> dict:
+        return {
+            'S0': self.S0,
+            'r': self.r,
+            'sigma': self.sigma,
+            'T': self.T,
+            'pay_off': self.pay_off,
+            'num_sims': num_sims,
+            # drawn from the global state so np.random.seed makes runs reproducible
+            'seed': int(np.random.randint(0, 2 ** 32)),
+        }
+
+    def _model_pricing(self, S0, r: float, sigma, T: float, pay_off: PayOff,
+                       num_sims: int, seed: int) -> float:
+        """Returns the price of a multi-asset option using a Monte Carlo Simulation, see
+        _simulate_pay_offs for the parameters"""
+
+        payoffs = self._simulate_pay_offs(S0, r, sigma, T, pay_off, num_sims, seed)
 
         # calculating option price
-        return np.exp(- r * T) * np.mean(payoffs)
+        with self.stats.stage('discount'):
+            return discount_factor(r, T) * np.sum(payoffs, dtype=np.float64) / num_sims
+
+    def _simulate_pay_offs(self, S0, r: float, sigma, T: float, pay_off: PayOff,
+                           num_sims: int, seed: int) -> np.array:
+        """Returns the undiscounted pay off of every simulated path
+
+        Parameters
+        ----------
+            S0 : (np.array) price of every underlying
+
+            r : (float) risk-free rate, 0.05 means 5%
+
+            sigma : (np.array) volatility of every underlying, 0.05 means 5%
+
+            T : (float) time till maturity in years
+
+            pay_off : (PayOff) class for determining option intrinsic value at expiration
+
+            num_sims : (int) number of Monte Carlo Simulations to run
+
+            seed : (int) seed of the chunks' generators, equal seeds give equal draws
+
+        Returns
+        -------
+            payoffs : (np.array) pay off of every path"""
+
+        terminal_only = self._terminal_only(pay_off)
+        chunk_size = self._chunk_size(pay_off)
+        payoffs = np.empty(num_sims)
+
+        for chunk, start in enumerate(range(0, num_sims, chunk_size)):
+            size = min(chunk_size, num_sims - start)
+            rng = np.random.default_rng([seed, chunk])
+            if terminal_only:
+                terminal = correlated_gbm_terminal(S0, r, sigma, T, self.factor, size,
+                                                   dtype=self.dtype, rng=rng, stats=self.stats)
+                with self.stats.stage('payoff') as stage:
+                    chunk_payoffs = pay_off.pay_off_statistics({'terminal': terminal})
+                    stage.add(chunk_payoffs)
+            else:
+                sims = correlated_gbm_simulation(S0, r, sigma, T, self.factor, self._time_steps(),
+                                                 size, dtype=self.dtype, rng=rng, stats=self.stats)
+                with self.stats.stage('payoff') as stage:
+                    chunk_payoffs = pay_off.pay_off(sims)
+                    stage.add(chunk_payoffs)
+            payoffs[start:start + size] = chunk_payoffs
+
+        return payoffs
@@ -0,0 +1,286 @@
+import asyncio
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+from .PricingModels import AnalyticFormula
+from .ImpliedVolatility import ImpliedVolatilityTracker
+from .utils import validate_option_type
+
+GREEK_NAMES = ('delta', 'gamma', 'vega', 'theta', 'rho')
+
+# parameters of every request kind, option_type is optional and defaults to 'call'
+REQUEST_PARAMS = {
+    'price': ('S', 'K', 'r', 'sigma', 'T'),
+    'greeks': ('S', 'K', 'r', 'sigma', 'T'),
+    'implied_volatility': ('S', 'K', 'r', 'T', 'option_price'),
+}
+
+
+class PricingService():
+    """Asyncio front end batching concurrent single contract requests into vectorized calls.
+
+    A request waits at most max_delay seconds, or until max_batch_size requests are queued,
+    before the whole queue is priced with one AnalyticFormula or ImpliedVolatilityTracker call
+    per request kind and every caller's future is resolved. At most max_pending requests are
+    outstanding, further callers wait for a slot, and over the socket the connection stops
+    being read, so load is pushed back to the clients instead of queueing without bound.
+
+        async with PricingService() as service:
+            price = await service.price(100, 105, 0.05, 0.2, 1.0, 'call')
+
+    The service can also be served on a local socket speaking newline delimited JSON, each
+    line being {"id": .., "kind": "price", "S": .., ..} and answered with
+    {"id": .., "result": ..} or {"id": .., "error": ..}, possibly out of order.
+
+    Parameters
+    ----------
+    max_batch_size : (int) requests priced by one vectorized call
+
+    max_delay : (float) seconds the first request of a batch waits for others to join
+
+    max_pending : (int) outstanding requests before callers have to wait
+
+    latency_window : (int) number of recent request latencies kept for the metrics"""
+
+    def __init__(self, max_batch_size: int = 1024, max_delay: float = 2e-4,
+                 max_pending: int = 16_384, latency_window: int = 10_000) -> None:
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+
+        self._analytic_formula = AnalyticFormula()
+        self._queue = []
+        self._batcher = None
+
+        self._latencies = deque(maxlen=latency_window)
+        self._batch_sizes = deque(maxlen=latency_window)
+        self._requests = 0
+        self._errors = 0
+        self._started = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+        """Starts the batching task on the running event loop"""
+
+        if self._batcher is not None:
+            return
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._wakeup = asyncio.Event()
+        self._started = time.perf_counter()
+        self._batcher = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Prices the requests still queued then stops the batching task"""
+
+        if self._batcher is None:
+            return
+        while self._queue:
+            self._dispatch(self._take_batch())
+        self._batcher.cancel()
+        try:
+            await self._batcher
+        except asyncio.CancelledError:
+            pass
+        self._batcher = None
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            if len(self._queue) < self.max_batch_size:
+                await asyncio.sleep(self.max_delay)
+            self._dispatch(self._take_batch())
+
+    def _take_batch(self) -> list:
+        batch = self._queue[:self.max_batch_size]
+        del self._queue[:self.max_batch_size]
+        if not self._queue:
+            self._wakeup.clear()
+        return batch
+
+    async def submit(self, kind: str, **params) -> asyncio.Future:
+        """Queues one request and returns the future of its result, waiting for a free slot
+        when max_pending requests are already outstanding"""
+
+        if kind not in REQUEST_PARAMS:
+            raise ValueError(f"Unknown request kind {kind!r}, expected one of {list(REQUEST_PARAMS)}.")
+        missing = [name for name in REQUEST_PARAMS[kind] if name not in params]
+        if missing:
+            raise ValueError(f"A {kind} request needs the parameters {missing}.")
+        option_type = params.get('option_type', 'call')
+        validate_option_type(option_type)
+        values = [float(params[name]) for name in REQUEST_PARAMS[kind]]
+        if self._batcher is None:
+            await self.start()
+
+        await self._slots.acquire()
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda _: self._slots.release())
+        self._queue.append((kind, values, option_type, future, time.perf_counter()))
+        self._wakeup.set()
+        return future
+
+    async def request(self, kind: str, **params):
+        """Prices one request and returns its result"""
+        return await (await self.submit(kind, **params))
+
+    async def price(self, S: float, K: float, r: float, sigma: float, T: float,
+                    option_type: str = 'call') -> float:
+        """Returns the Black-Scholes price of one contract, batched with concurrent requests"""
+        return await self.request('price', S=S, K=K, r=r, sigma=sigma, T=T, option_type=option_type)
+
+    async def greeks(self, S: float, K: float, r: float, sigma: float, T: float,
+                     option_type: str = 'call') -> dict:
+        """Returns the delta, gamma, vega, theta and rho of one contract"""
+        return await self.request('greeks', S=S, K=K, r=r, sigma=sigma, T=T, option_type=option_type)
+
+    async def implied_volatility(self, S: float, K: float, r: float, T: float, option_price: float,
+                                 option_type: str = 'call') -> float:
+        """Returns the implied volatility of one quote, NaN when no solution was found"""
+        return await self.request('implied_volatility', S=S, K=K, r=r, T=T,
+                                  option_price=option_price, option_type=option_type)
+
+    def _evaluate(self, kind: str, params: np.array, option_type: np.array) -> list:
+        """Vectorized evaluation of a (len(REQUEST_PARAMS[kind]), n) block of requests"""
+
+        if kind == 'implied_volatility':
+            S, K, r, T, option_price = params
+            return ImpliedVolatilityTracker().update(
+                range(len(S)), S, K, r, T, option_price, option_type).tolist()
+
+        S, K, r, sigma, T = params
+        if kind == 'price':
+            return self._analytic_formula.black_scholes_price(S, K, r, sigma, T, option_type).tolist()
+
+        greeks = {
+            'delta': self._analytic_formula.delta(S, K, r, sigma, T, option_type),
+            'gamma': self._analytic_formula.gamma(S, K, r, sigma, T),
+            'vega': self._analytic_formula.vega(S, K, r, sigma, T),
+            'theta': self._analytic_formula.theta(S, K, r, sigma, T, option_type),
+            'rho': self._analytic_formula.rho(S, K, r, sigma, T, option_type),
+        }
+        return [dict(zip(GREEK_NAMES, values))
+                for values in zip(*(greeks[name].tolist() for name in GREEK_NAMES))]
+
+    def _dispatch(self, batch: list) -> None:
+        """Evaluates a batch with one call per request kind and resolves its futures"""
+
+        if not batch:
+            return
+        self._batch_sizes.append(len(batch))
+        for kind in REQUEST_PARAMS:
+            requests = [request for request in batch if request[0] == kind]
+            if not requests:
+                continue
+            # callers that gave up on their request no longer need it priced
+            requests = [request for request in requests if not request[3].done()]
+            if not requests:
+                continue
+
+            try:
+                with np.errstate(all='ignore'):
+                    results = self._evaluate(
+                        kind, np.array([request[1] for request in requests]).T,
+                        np.array([request[2] for request in requests]))
+            except Exception as error:
+                self._errors += len(requests)
+                for request in requests:
+                    request[3].set_exception(error)
+                continue
+
+            now = time.perf_counter()
+            for (_, _, _, future, submitted), result in zip(requests, results):
+                future.set_result(result)
+                self._latencies.append(now - submitted)
+            self._requests += len(requests)
+
+    def metrics(self) -> dict:
+        """Returns the throughput, latency and batching statistics of the service
+
+        Returns
+        -------
+            metrics : (dict) requests and errors served, pending requests, requests_per_second
+            since start, mean_batch_size and the p50, p99 and max latency in seconds of the
+            recent requests"""
+
+        latencies = np.array(self._latencies)
+        elapsed = time.perf_counter() - self._started if self._started is not None else 0.0
+        return {
+            'requests': self._requests,
+            'errors': self._errors,
+            'pending': len(self._queue),
+            'requests_per_second': self._requests / elapsed if elapsed > 0 else 0.0,
+            'mean_batch_size': float(np.mean(self._batch_sizes)) if self._batch_sizes else 0.0,
+            'latency_p50': float(np.percentile(latencies, 50)) if latencies.size else float('nan'),
+            'latency_p99': float(np.percentile(latencies, 99)) if latencies.size else float('nan'),
+            'latency_max': float(latencies.max()) if latencies.size else float('nan'),
+        }
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter) -> None:
+        """Serves newline delimited JSON requests of one socket connection"""
+
+        outstanding = set()
+
+        def respond(request_id, future: asyncio.Future) -> None:
+            outstanding.discard(future)
+            if future.cancelled() or writer.is_closing():
+                return
+            error = future.exception()
+            response = {'id': request_id, 'error': str(error)} if error is not None else \
+                {'id': request_id, 'result': future.result()}
+            writer.write(json.dumps(response).encode() + b'\n')
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request_id = None
+                try:
+                    message = json.loads(line)
+                    request_id = message.pop('id', None)
+                    # submit waits for a slot, so a saturated service stops reading the socket
+                    future = await self.submit(message.pop('kind', 'price'), **message)
+                except (ValueError, TypeError) as error:
+                    writer.write(json.dumps({'id': request_id, 'error': str(error)}).encode() + b'\n')
+                    continue
+                outstanding.add(future)
+                future.add_done_callback(lambda future, request_id=request_id: respond(request_id, future))
+                await writer.drain()
+            # the client closed its side, answer what it already sent before closing ours
+            if outstanding:
+                await asyncio.wait(set(outstanding))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 0, path: str = None):
+        """Serves the service on a local TCP port, or on a unix socket when path is given
+
+        Parameters
+        ----------
+            host : (str) interface to listen on
+
+            port : (int) TCP port, 0 lets the system pick one
+
+            path : (str) optional unix socket path used instead of host and port
+
+        Returns
+        -------
+            server : (asyncio.Server) running server, close it to stop listening"""
+
+        await self.start()
+        if path is not None:
+            return await asyncio.start_unix_server(self._handle_connection, path=path)
+        return await asyncio.start_server(self._handle_connection, host=host, port=port)
@@ -0,0 +1,495 @@
+import copy
+import json
+import math
+import numbers
+import os
+import time
+
+import numpy as np
+
+from typing import Sequence
+
+from .Curves import zero_rate
+from .PayOff import PayOffEuropean, PayOffBarrier
+from .PricingModels import AnalyticFormula, Simulator, MonteCarlo, StochasticVolatility, \
+    TRADING_HOURS_PER_YEAR
+from .Sharding import _batch_moments, _combine
+
+# engine attributes that change how a contract is simulated but not the contract or the model
+SETTINGS = ('steps_per_year', 'dtype', 'barrier_correction', 'importance_sampling')
+
+
+def analytic_price(simulator: Simulator) -> float:
+    """Returns the closed form price of the engine's model and contract, None when there is none
+
+    European pay offs are priced with the Poisson series of Merton's model for MonteCarlo, which
+    is Black-Scholes without jumps, and with Lewis' formula for StochasticVolatility, see
+    MertonCalibrator and HestonCalibrator. Barrier pay offs of a MonteCarlo engine without jumps
+    or dividends are priced under continuous monitoring with AnalyticFormula.barrier_price."""
+
+    from .Calibration import HestonCalibrator, MertonCalibrator
+
+    pay_off, T = simulator.pay_off, simulator.T
+    r, q = zero_rate(simulator.r, T), zero_rate(simulator.q, T)
+    if type(pay_off) is PayOffEuropean:
+        # the dividends are carried by the forward, the calibrators pricing without them
+        S = simulator.S0 * np.exp(- q * T)
+        if isinstance(simulator, MonteCarlo):
+            model = MertonCalibrator(S, [pay_off.K], r, T, [0.0], pay_off.option_type)
+            params = [simulator.sigma, simulator.lambda_j, simulator.mu_j, simulator.sigma_j]
+        elif isinstance(simulator, StochasticVolatility):
+            model = HestonCalibrator(S, [pay_off.K], r, T, [0.0], pay_off.option_type)
+            params = [simulator.sigma, simulator.kappa, simulator._theta, simulator.epsilon,
+                      simulator.corr]
+        else:
+            return None
+        return float(model.prices(params)[0])
+
+    if isinstance(pay_off, PayOffBarrier) and isinstance(simulator, MonteCarlo) and \
+            simulator.lambda_j == 0 and isinstance(simulator.q, numbers.Real) and simulator.q == 0:
+        return float(AnalyticFormula().barrier_price(simulator.S0, pay_off.K, r, simulator.sigma, T,
+                                                     pay_off.barrier, pay_off.barrier_type,
+                                                     pay_off.option_type))
+    return None
+
+
+def candidate_engines(simulator: Simulator, steps_per_year: Sequence[float] = (0, 52, 252, TRADING_HOURS_PER_YEAR),
+                      dtypes: Sequence = (np.float64,)) -> dict:
+    """Returns copies of an engine on every time grid and float type, keyed by a label
+
+    A steps_per_year of 0 simulates a single step to maturity, the terminal-only engine, exact
+    for pay offs on the terminal price of a Geometric Brownian motion.
+
+    Parameters
+    ----------
+        simulator : (Simulator) engine whose model, contract and other settings are kept
+
+        steps_per_year : (list) time grids to try
+
+        dtypes : (list) float types of the draws and paths to try
+
+    Returns
+    -------
+        candidates : (dict) engine by label"""
+
+    candidates = {}
+    for steps in steps_per_year:
+        for dtype in dtypes:
+            engine = copy.copy(simulator)
+            engine.steps_per_year = steps
+            engine.dtype = np.dtype(dtype)
+            candidates[_label(engine)] = engine
+    return candidates
+
+
+def _settings(simulator: Simulator) -> dict:
+    settings = {name: getattr(simulator, name) for name in SETTINGS if hasattr(simulator, name)}
+    settings['dtype'] = np.dtype(settings['dtype']).name
+    return settings
+
+
+def _label(simulator: Simulator) -> str:
+    settings = _settings(simulator)
+    steps = simulator._time_steps()
+    parts = ['terminal' if steps == 1 else f"steps={steps}", settings['dtype']]
+    parts += [name for name in ('importance_sampling',) if settings.get(name)]
+    if settings.get('barrier_correction'):
+        parts.append(settings['barrier_correction'])
+    return f"{type(simulator).__name__}({', '.join(parts)})"
+
+
+class EngineProfile():
+    """Fitted cost and error of Monte Carlo engines on one contract, see EngineProfiler.
+
+    The run time of num_sims paths is fitted as overhead + seconds_per_path * num_sims and the
+    root mean square error of a price as sqrt(path_std^2 / num_sims + bias^2), so the error
+    expected from t seconds of CPU is sqrt(path_std^2 * seconds_per_path / (t - overhead) +
+    bias^2): path_std^2 * seconds_per_path is the error squared per second once the overhead is
+    paid, and the bias, e.g. the discretisation error of a coarse grid, is the floor no budget
+    goes below. A bias is only resolved once it exceeds twice the standard error of the
+    profiled runs, so larger budgets resolve smaller biases. The profile selects the cheapest engine and num_sims reaching a tolerance, or
+    the most accurate one for a time budget, and applies them to a batch of alike contracts.
+
+        profile = EngineProfiler(candidate_engines(engine)).run()
+        print(profile.format(tolerance=0.01))
+        prices = profile.price_batch(book_engines, tolerance=0.01)
+
+    Parameters
+    ----------
+    reference : (float) price the errors were measured against
+
+    candidates : (list) label, engine class, settings, steps, fit and runs of every engine"""
+
+    VERSION = 1
+
+    def __init__(self, reference: float, candidates: list) -> None:
+        self.reference = reference
+        self.candidates = candidates
+
+    def _candidate(self, label: str) -> dict:
+        for candidate in self.candidates:
+            if candidate['label'] == label:
+                return candidate
+        raise KeyError(f"No engine {label} in the profile.")
+
+    def expected_error(self, label: str, seconds: float) -> float:
+        """Returns the root mean square error expected from seconds of CPU on the engine label"""
+
+        fit = self._candidate(label)['fit']
+        if seconds <= fit['overhead']:
+            return float('inf')
+        return math.sqrt(fit['path_std'] ** 2 * fit['seconds_per_path'] / (seconds - fit['overhead'])
+                         + fit['bias'] ** 2)
+
+    def budget(self, label: str, tolerance: float = None, seconds: float = None) -> dict:
+        """Returns the num_sims, expected error and seconds of the engine label for a
+        tolerance on the root mean square error or a time budget, num_sims is None when the
+        engine's bias alone exceeds the tolerance"""
+
+        if (tolerance is None) == (seconds is None):
+            raise ValueError("Give either a tolerance or a time budget in seconds.")
+        fit = self._candidate(label)['fit']
+        if tolerance is not None:
+            room = tolerance ** 2 - fit['bias'] ** 2
+            if room <= 0:
+                return {'num_sims': None, 'error': float('inf'), 'seconds': float('inf')}
+            num_sims = max(1, math.ceil(fit['path_std'] ** 2 / room))
+        else:
+            num_sims = max(1, math.floor((seconds - fit['overhead']) / fit['seconds_per_path']))
+        return {'num_sims': num_sims,
+                'error': math.sqrt(fit['path_std'] ** 2 / num_sims + fit['bias'] ** 2),
+                'seconds': fit['overhead'] + fit['seconds_per_path'] * num_sims}
+
+    def table(self, tolerance: float = None, seconds: float = None) -> list:
+        """Returns the recommendation table, best engine first
+
+        Parameters
+        ----------
+            tolerance : (float) root mean square error to reach, ranks by the time to reach it
+
+            seconds : (float) time budget, ranks by the error expected from it. Without either
+                      engines are ranked by their expected error per second of CPU
+
+        Returns
+        -------
+            rows : (list) of dicts with the engine's label, class, settings, steps, fitted
+                   seconds_per_path, overhead, path_std and bias, its error_per_second, the
+                   error expected after one second, and with a tolerance or time budget the
+                   num_sims, expected error and seconds it takes"""
+
+        rows = []
+        for candidate in self.candidates:
+            row = {'engine': candidate['label'], 'class': candidate['class'],
+                   'settings': candidate['settings'], 'steps': candidate['steps'],
+                   **candidate['fit'],
+                   'error_per_second': self.expected_error(candidate['label'], 1.0)}
+            if tolerance is not None or seconds is not None:
+                budget = self.budget(candidate['label'], tolerance, seconds)
+                row.update(num_sims=budget['num_sims'], expected_error=budget['error'],
+                           expected_seconds=budget['seconds'])
+            rows.append(row)
+
+        if tolerance is not None:
+            key = 'expected_seconds'
+        else:
+            key = 'expected_error' if seconds is not None else 'error_per_second'
+        return sorted(rows, key=lambda row: row[key])
+
+    def format(self, tolerance: float = None, seconds: float = None) -> str:
+        """Returns the recommendation table as text, see table"""
+
+        rows = self.table(tolerance, seconds)
+        budgeted = tolerance is not None or seconds is not None
+        width = max(len(row['engine']) for row in rows)
+        header = f"{'engine':<{width}}  {'us/path':>9}  {'path_std':>9}  {'bias':>9}  {'error/s':>9}"
+        if budgeted:
+            header += f"  {'num_sims':>10}  {'error':>9}  {'seconds':>9}"
+        lines = [header]
+        for row in rows:
+            line = f"{row['engine']:<{width}}  {row['seconds_per_path'] * 1e6:>9.3f}  " \
+                   f"{row['path_std']:>9.4g}  {row['bias']:>9.3g}  {row['error_per_second']:>9.3g}"
+            if budgeted:
+                num_sims = '-' if row['num_sims'] is None else f"{row['num_sims']:,}"
+                line += f"  {num_sims:>10}  {row['expected_error']:>9.3g}  {row['expected_seconds']:>9.3g}"
+            lines.append(line)
+        return '\n'.join(lines)
+
+    def __str__(self) -> str:
+        return self.format()
+
+    def select(self, tolerance: float = None, seconds: float = None, engine: str = None) -> dict:
+        """Returns the best engine for a tolerance or time budget, see table
+
+        Parameters
+        ----------
+            tolerance : (float) root mean square error to reach
+
+            seconds : (float) time budget
+
+            engine : (str) only consider engines of this class name, e.g. 'MonteCarlo'
+
+        Returns
+        -------
+            {
+                engine : (str) label of the engine
+                class : (str) class name of the engine
+                settings : (dict) simulation settings of the engine, see SETTINGS
+                num_sims : (int) number of simulations to run
+                expected_error : (float) root mean square error expected
+                expected_seconds : (float) run time expected
+            }"""
+
+        if (tolerance is None) == (seconds is None):
+            raise ValueError("Give either a tolerance or a time budget in seconds.")
+        rows = [row for row in self.table(tolerance, seconds)
+                if (engine is None or row['class'] == engine) and row['num_sims'] is not None]
+        if not rows:
+            raise ValueError(f"No profiled engine reaches a root mean square error of {tolerance}.")
+        return {name: rows[0][name] for name in ('engine', 'class', 'settings', 'num_sims',
+                                                  'expected_error', 'expected_seconds')}
+
+    def configure(self, simulator: Simulator, tolerance: float = None,
+                  seconds: float = None) -> tuple:
+        """Returns a copy of an engine with the settings of the best profiled engine of its
+        class and the num_sims to run it with
+
+        The settings and num_sims carry over to contracts alike the profiled one, whose path
+        standard deviation and bias are of the same size."""
+
+        selected = self.select(tolerance, seconds, type(simulator).__name__)
+        engine = copy.copy(simulator)
+        for name, value in selected['settings'].items():
+            setattr(engine, name, np.dtype(value) if name == 'dtype' else value)
+        return engine, selected['num_sims']
+
+    def price_batch(self, simulators: Sequence[Simulator], tolerance: float = None,
+                    seconds: float = None) -> list:
+        """Returns the price of every engine run with the selected settings and num_sims
+
+        Parameters
+        ----------
+            simulators : (list) engines of alike contracts
+
+            tolerance : (float) root mean square error to reach for every price
+
+            seconds : (float) time budget of every price
+
+        Returns
+        -------
+            prices : (list) price of every engine, in the order of simulators"""
+
+        prices = []
+        for simulator in simulators:
+            engine, num_sims = self.configure(simulator, tolerance, seconds)
+            prices.append(float(engine.option_price(num_sims)))
+        return prices
+
+    def to_dict(self) -> dict:
+        return {'version': self.VERSION, 'reference': self.reference, 'candidates': self.candidates}
+
+    @classmethod
+    def from_dict(cls, profile: dict) -> 'EngineProfile':
+        if profile.get('version') != cls.VERSION:
+            raise ValueError(f"Unsupported profile version {profile.get('version')}.")
+        return cls(profile['reference'], profile['candidates'])
+
+    def save(self, path: str) -> None:
+        """Writes the profile to path atomically, to select engines in later sessions"""
+
+        path = os.path.expanduser(path)
+        with open(path + '.tmp', 'w') as file:
+            json.dump(self.to_dict(), file)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path: str) -> 'EngineProfile':
+        with open(os.path.expanduser(path)) as file:
+            return cls.from_dict(json.load(file))
+
+
+class EngineProfiler():
+    """Measures the accuracy per CPU second of Monte Carlo engines of one contract.
+
+    Every candidate engine prices the contract repeats times at every budget of num_sims, each
+    run under its own seed, and the prices are compared to the reference. The reference is the
+    closed form price of the candidate's model when there is one, see analytic_price, a given
+    price, or else a run of reference_sims paths of a reference engine, by default the
+    candidate of the same class on the finest grid. Runs stop growing once one takes more than
+    max_seconds, and budgets whose draws would not fit in memory_cap are skipped. The fitted
+    cost and error curves make an EngineProfile.
+
+        candidates = candidate_engines(MonteCarlo(100, 100, 0.05, 0.2, 1.0, pay_off, lambda_j=0))
+        profile = EngineProfiler(candidates).run()
+        profile.select(tolerance=0.01)
+
+    The per path standard deviation comes from the engines' discounted pay offs. Timings are
+    wall clock times of single threaded runs, the engines' draws included.
+
+    Parameters
+    ----------
+    candidates : (dict or list) engines by label, or engines labelled from their settings
+
+    budgets : (list) increasing num_sims every engine is run with
+
+    repeats : (int) runs per budget
+
+    reference : (float or Simulator) price, or engine whose high budget run is the reference
+
+    reference_sims : (int) paths of a reference run, 16 times the largest budget by default
+
+    seed : (int) seed the runs' seeds derive from
+
+    max_seconds : (float) run time past which an engine is not given larger budgets
+
+    memory_cap : (int) bytes the draws and paths of one run may use"""
+
+    # arrays of (n_steps, num_sims) a run holds at once: normal draws, jump draws and the path
+    _ARRAYS_PER_RUN = 3
+
+    def __init__(self, candidates, budgets: Sequence[int] = (1_000, 4_000, 16_000, 64_000),
+                 repeats: int = 3, reference=None, reference_sims: int = None, seed: int = 0,
+                 max_seconds: float = 10.0, memory_cap: int = 256 * 2 ** 20) -> None:
+        if not isinstance(candidates, dict):
+            candidates = {_label(engine): engine for engine in candidates}
+        for engine in candidates.values():
+            if engine.draw_store is not None:
+                raise ValueError("Profiled runs need fresh draws, the engines must not use a draw store.")
+        if repeats < 2:
+            raise ValueError("At least 2 repeats are needed to measure the spread of the prices.")
+        self.candidates = candidates
+        self.budgets = sorted(budgets)
+        self.repeats = repeats
+        self.reference = reference
+        self.reference_sims = 16 * self.budgets[-1] if reference_sims is None else reference_sims
+        self.seed = seed
+        self.max_seconds = max_seconds
+        self.memory_cap = memory_cap
+
+    def _max_sims(self, engine: Simulator) -> int:
+        """Most paths of one run of the engine under memory_cap"""
+        return int(self.memory_cap // (self._ARRAYS_PER_RUN * engine.dtype.itemsize * engine._time_steps()))
+
+    @staticmethod
+    def _run(engine: Simulator, num_sims: int) -> tuple:
+        """Returns the seconds, price and per path variance of one run"""
+
+        start = time.perf_counter()
+        pay_offs = engine._discounted_pay_offs(engine._get_pricing_params(num_sims))
+        price = float(np.mean(pay_offs))
+        seconds = time.perf_counter() - start
+        return seconds, price, float(np.var(pay_offs, ddof=1))
+
+    def _reference_run(self, engine: Simulator) -> tuple:
+        """Returns the price of a reference_sims run of the engine, in batches under
+        memory_cap, and the variance of that price"""
+
+        batch_size = max(2, min(self.reference_sims, self._max_sims(engine)))
+        moments = [0, 0.0, 0.0]
+        for batch, start in enumerate(range(0, self.reference_sims, batch_size)):
+            size = min(batch_size, self.reference_sims - start)
+            np.random.seed(np.random.SeedSequence([self.seed, 2 ** 31, batch]).generate_state(4))
+            pay_offs = engine._discounted_pay_offs(engine._get_pricing_params(size))
+            moments = _combine(moments, _batch_moments(pay_offs))
+        count, mean, m2 = moments
+        return mean, m2 / (count - 1) / count
+
+    def _references(self) -> dict:
+        """Returns the (reference price, variance) of every candidate"""
+
+        if isinstance(self.reference, numbers.Real):
+            return {label: (float(self.reference), 0.0) for label in self.candidates}
+        if isinstance(self.reference, Simulator):
+            shared = self._reference_run(self.reference)
+            return {label: shared for label in self.candidates}
+
+        references, runs = {}, {}
+        for label, engine in self.candidates.items():
+            price = analytic_price(engine)
+            if price is not None:
+                references[label] = (price, 0.0)
+                continue
+            # the finest grid of the class stands for the continuous model
+            finest = max((other for other in self.candidates.values()
+                          if type(other) is type(engine)), key=lambda other: other._time_steps())
+            if id(finest) not in runs:
+                runs[id(finest)] = self._reference_run(finest)
+            references[label] = runs[id(finest)]
+        return references
+
+    def _fit(self, runs: list, reference: float, reference_variance: float) -> dict:
+        """Fits the cost and error model of EngineProfile to the runs of one engine"""
+
+        num_sims = np.array([run['num_sims'] for run in runs], dtype=np.float64)
+        seconds = np.array([run['seconds'] for run in runs])
+        prices = np.array([run['price'] for run in runs])
+
+        if len(np.unique(num_sims)) > 1:
+            seconds_per_path, overhead = np.polyfit(num_sims, seconds, 1)
+        else:
+            seconds_per_path, overhead = 0.0, 0.0
+        if seconds_per_path <= 0:
+            seconds_per_path, overhead = float(np.mean(seconds / num_sims)), 0.0
+        overhead = max(float(overhead), 0.0)
+
+        path_variance = float(np.mean([run['path_variance'] for run in runs]))
+
+        # the mean error counts as a bias once it exceeds twice its standard error, the noise
+        # of the mean and of the reference, so noise alone seldom rules an engine out
+        mean = np.sum(num_sims * prices) / np.sum(num_sims)
+        noise = path_variance / np.sum(num_sims)
+        if np.isfinite(reference_variance):
+            noise += reference_variance
+        bias_squared = (mean - reference) ** 2 if (mean - reference) ** 2 > 4 * noise else 0.0
+        return {'seconds_per_path': float(seconds_per_path), 'overhead': overhead,
+                'path_std': math.sqrt(path_variance), 'bias': math.sqrt(max(bias_squared, 0.0))}
+
+    def profile(self, label: str, engine: Simulator, reference: tuple) -> dict:
+        """Runs one engine over the budgets and returns its entry of the EngineProfile"""
+
+        runs = []
+        max_sims = self._max_sims(engine)
+        # compiled kernels and first call costs are kept out of the timings
+        self._run(engine, min(100, max(2, max_sims)))
+        for budget in self.budgets:
+            if budget > max_sims:
+                break
+            for repeat in range(self.repeats):
+                np.random.seed(np.random.SeedSequence(
+                    [self.seed, budget, repeat, *map(ord, label)]).generate_state(4))
+                seconds, price, path_variance = self._run(engine, budget)
+                runs.append({'num_sims': budget, 'seconds': seconds, 'price': price,
+                             'path_variance': path_variance})
+            if max(run['seconds'] for run in runs[-self.repeats:]) > self.max_seconds:
+                break
+        if not runs:
+            raise ValueError(f"A run of {self.budgets[0]} paths of {label} does not fit in memory_cap.")
+
+        price, variance = reference
+        errors = {}
+        for run in runs:
+            errors.setdefault(run['num_sims'], []).append((run['price'] - price) ** 2)
+        return {'label': label, 'class': type(engine).__name__, 'settings': _settings(engine),
+                'steps': engine._time_steps(), 'reference': price,
+                'fit': self._fit(runs, price, variance),
+                'runs': [{'num_sims': num_sims,
+                          'seconds': float(np.mean([run['seconds'] for run in runs
+                                                    if run['num_sims'] == num_sims])),
+                          'rmse': float(np.sqrt(np.mean(squared)))}
+                         for num_sims, squared in errors.items()]}
+
+    def run(self) -> EngineProfile:
+        """Profiles every candidate, the caller's global random state being restored afterwards
+
+        Returns
+        -------
+            profile : (EngineProfile) fitted cost and error of every candidate"""
+
+        state = np.random.get_state()
+        try:
+            references = self._references()
+            candidates = [self.profile(label, engine, references[label])
+                          for label, engine in self.candidates.items()]
+        finally:
+            np.random.set_state(state)
+        shared = {candidate['reference'] for candidate in candidates}
+        return EngineProfile(shared.pop() if len(shared) == 1 else None, candidates)
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from typing import Sequence
+
+from .PricingModels import Simulator
+
+# SQLite binds at most 999 parameters per statement in older builds
+_BATCH = 500
+
+
+class ResultCache():
+    """Persistent SQLite cache of simulated prices and greeks for batch reruns.
+
+    A result is keyed by the SHA-1 of the engine's Simulator.description(), which covers the
+    contract terms, the pay off class and its parameters, the model parameters and the engine
+    settings, together with the number of simulations, the seed and the priced method. A cached
+    result is the one of np.random.seed(seed) followed by the same call without a cache, the
+    caller's random state being restored afterwards, so a rerun of a batch only simulates the
+    contracts whose inputs changed. Lookups and inserts go by whole batches in single
+    transactions. Entries older than ttl seconds are misses and are removed, and entries are
+    evicted least recently used first once the stored results grow past max_bytes.
+
+        cache = ResultCache('~/.option_wiz/results.sqlite', ttl=7 * 24 * 3600)
+        prices = cache.price_batch(engines, num_sims=100_000, seed=42)
+        cache.report()['hit_rate']
+
+    Parameters
+    ----------
+    path : (str) SQLite database file, created when missing
+
+    ttl : (float) seconds a result stays valid, None keeps results until evicted
+
+    max_bytes : (int) total size of the stored results above which entries are evicted"""
+
+    def __init__(self, path: str, ttl: float = None, max_bytes: int = 256 * 2 ** 20) -> None:
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(self.path)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "bytes INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+
+        # lookups and evictions since the cache was opened
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> 'ResultCache':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        # a membership test is not a lookup, it leaves the counters and last_used alone
+        oldest = -np.inf if self.ttl is None else time.time() - self.ttl
+        return self._connection.execute("SELECT 1 FROM results WHERE key = ? AND created >= ?",
+                                        (key, oldest)).fetchone() is not None
+
+    @staticmethod
+    def key(simulator: Simulator, num_sims: int, seed: int, method: str = 'option_price') -> str:
+        """Returns the hex digest identifying the result of simulator.method(num_sims) under seed"""
+
+        description = json.dumps([simulator.description(), num_sims, seed, method],
+                                 sort_keys=True, default=repr)
+        return hashlib.sha1(description.encode()).hexdigest()
+
+    def size(self) -> int:
+        """Returns the bytes taken by the stored results"""
+        return self._connection.execute("SELECT COALESCE(SUM(bytes), 0) FROM results").fetchone()[0]
+
+    def get_many(self, keys: Sequence[str]) -> dict:
+        """Returns the cached results of keys, missing and expired keys are left out
+
+        Parameters
+        ----------
+            keys : (list) keys of the results
+
+        Returns
+        -------
+            results : (dict) result of every key found"""
+
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        oldest = -np.inf if self.ttl is None else now - self.ttl
+        results = {}
+        with self._connection:
+            for start in range(0, len(keys), _BATCH):
+                batch = keys[start:start + _BATCH]
+                marks = ','.join('?' * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT key, value FROM results WHERE key IN ({marks}) AND created >= ?",
+                    batch + [oldest]).fetchall()
+                results.update((key, json.loads(value)) for key, value in rows)
+                self._connection.execute(
+                    f"UPDATE results SET last_used = ? WHERE key IN ({marks}) AND created >= ?",
+                    [now] + batch + [oldest])
+        self.hits += len(results)
+        self.misses += len(keys) - len(results)
+        return results
+
+    def put_many(self, results: dict) -> None:
+        """Stores results, replacing older results of the same keys
+
+        Parameters
+        ----------
+            results : (dict) JSON serialisable result by key, e.g. a price or a dict of greeks"""
+
+        now = time.time()
+        rows = []
+        for key, value in results.items():
+            value = json.dumps(value)
+            rows.append((key, value, len(value), now, now))
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO results (key, value, bytes, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+        self.evict()
+
+    def get(self, key: str):
+        """Returns the cached result of key, None when it is missing or expired"""
+        return self.get_many([key]).get(key)
+
+    def put(self, key: str, value) -> None:
+        self.put_many({key: value})
+
+    def evict(self) -> int:
+        """Removes the expired results, then least recently used ones until the cache fits
+        in max_bytes
+
+        Returns
+        -------
+            evicted : (int) number of removed results"""
+
+        evicted = 0
+        with self._connection:
+            if self.ttl is not None:
+                evicted += self._connection.execute(
+                    "DELETE FROM results WHERE created < ?", (time.time() - self.ttl,)).rowcount
+            excess = self.size() - self.max_bytes
+            if excess > 0:
+                # the oldest entries whose running size covers the excess
+                evicted += self._connection.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM (SELECT key, SUM(bytes) "
+                    "OVER (ORDER BY last_used, key) - bytes AS before FROM results) WHERE before < ?)",
+                    (excess,)).rowcount
+        self.evictions += evicted
+        return evicted
+
+    def clear(self) -> None:
+        """Removes every result of the cache"""
+
+        with self._connection:
+            self._connection.execute("DELETE FROM results")
+
+    def price_batch(self, simulators: Sequence[Simulator], num_sims: int, seed: int,
+                    method: str = 'option_price') -> list:
+        """Returns simulator.method(num_sims) of every engine, only simulating the engines
+        whose result is not cached
+
+        Parameters
+        ----------
+            simulators : (list) engines of the batch
+
+            num_sims : (int) number of simulations to run
+
+            seed : (int) seed of the global NumPy random state every engine is run under
+
+            method : (str) 'option_price', 'greeks' or another method of the engines taking
+                     num_sims and returning a JSON serialisable result
+
+        Returns
+        -------
+            results : (list) result of every engine, in the order of simulators"""
+
+        if seed is None:
+            raise ValueError("A seed is needed to cache simulated results.")
+        keys = [self.key(simulator, num_sims, seed, method) for simulator in simulators]
+        results = self.get_many(keys)
+
+        computed = {}
+        state = np.random.get_state()
+        try:
+            for key, simulator in zip(keys, simulators):
+                if key in results or key in computed:
+                    continue
+                np.random.seed(seed)
+                computed[key] = _plain(getattr(simulator, method)(num_sims))
+        finally:
+            np.random.set_state(state)
+
+        if computed:
+            self.put_many(computed)
+        results.update(computed)
+        return [results[key] for key in keys]
+
+    def price(self, simulator: Simulator, num_sims: int, seed: int,
+              method: str = 'option_price'):
+        """Returns simulator.method(num_sims) under seed, from the cache when it holds it"""
+        return self.price_batch([simulator], num_sims, seed, method)[0]
+
+    def report(self) -> dict:
+        """Returns the hits, misses, hit_rate and evictions since the cache was opened and the
+        number of entries and bytes it holds"""
+
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions, 'entries': len(self), 'bytes': self.size()}
+
+
+def _plain(value):
+    """Converts NumPy scalars and arrays, also inside dicts, to JSON serialisable values"""
+
+    if isinstance(value, dict):
+        return {name: _plain(item) for name, item in value.items()}
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    return value
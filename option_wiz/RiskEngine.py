@@ -0,0 +1,410 @@
+import numpy as np
+
+from typing import Sequence
+
+from .PricingModels import AnalyticFormula
+from .quant_math import gbm_simulation
+from .Options import Option, EuropeanOption
+
+MIN_VOLATILITY = 1e-4
+
+
+def _contract_arrays(options: Sequence[Option], analytic_formula: AnalyticFormula) -> tuple:
+    """Returns the S, K, r, sigma, T and option_type arrays of a list of options"""
+
+    sigma = [analytic_formula._get_sigma(o.get_volatility(), o.get_strike_price(),
+                                         o.get_maturity_time()) for o in options]
+    return (np.array([o.get_underlying_price() for o in options], dtype=float),
+            np.array([o.get_strike_price() for o in options], dtype=float),
+            np.array([o.get_risk_free_rate() for o in options], dtype=float),
+            np.array(sigma, dtype=float),
+            np.array([o.get_maturity_time() for o in options], dtype=float),
+            np.array([o.get_option_type() for o in options]))
+
+
+class ScenarioEngine():
+    """Evaluates a book of options over a spot x volatility x rate grid of shocks.
+
+    European contracts are priced with AnalyticFormula in broadcast blocks of
+    (contracts x spot shocks x vol shocks x rate shocks), with the number of contracts per
+    block chosen so the block's temporaries stay under memory_cap. P&L is summed per
+    underlying block by block, so the full (contract x scenario) cube is only kept when
+    asked for. Every other contract is revalued through its Monte Carlo engine, reusing the
+    same random draws in every scenario (common random numbers).
+
+    Parameters
+    ----------
+    options : (Sequence[Option]) contracts of the book
+
+    quantity : (np.array) position size per contract
+
+    underlying : (np.array) identifier of the underlying of each contract, defaults to a single underlying
+
+    memory_cap : (int) bytes the analytic blocks may use
+
+    num_sims : (int) number of simulations for contracts priced with Monte Carlo"""
+
+    # float64 temporaries alive at once while AnalyticFormula prices a block
+    _BLOCK_TEMPORARIES = 16
+
+    def __init__(self, options: Sequence[Option], quantity=1.0, underlying=None,
+                 memory_cap: int = 256 * 2 ** 20, num_sims: int = 1_000) -> None:
+
+        n_contracts = len(options)
+        self.options = list(options)
+        self.quantity = np.broadcast_to(np.asarray(quantity, dtype=float), (n_contracts,))
+        if underlying is None:
+            underlying = np.zeros(n_contracts, dtype=int)
+        self.underlyings, self._underlying_index = np.unique(
+            np.broadcast_to(np.asarray(underlying), (n_contracts,)), return_inverse=True)
+        self.memory_cap = memory_cap
+        self.num_sims = num_sims
+
+        self._analytic_formula = AnalyticFormula()
+
+        analytic = np.array([isinstance(o, EuropeanOption) for o in self.options], dtype=bool)
+        # analytic contracts sorted by underlying so a block sums with reduceat
+        self._analytic_index = np.flatnonzero(analytic)[
+            np.argsort(self._underlying_index[analytic], kind='stable')]
+        self._simulated_index = np.flatnonzero(~analytic)
+
+        self._S, self._K, self._r, self._sigma, self._T, self._option_type = _contract_arrays(
+            [self.options[i] for i in self._analytic_index], self._analytic_formula)
+
+    def _block_size(self, n_scenarios: int) -> int:
+        """Number of contracts per analytic block under the memory cap"""
+        return max(1, int(self.memory_cap // (n_scenarios * 8 * self._BLOCK_TEMPORARIES)))
+
+    def _analytic_prices(self, block: slice, spot_shocks, vol_shocks, rate_shocks) -> np.array:
+        """Prices of contracts block in every scenario, shape (contracts, spot, vol, rate)"""
+
+        expand = (slice(None), None, None, None)
+        S = self._S[block][expand] * (1 + spot_shocks[None, :, None, None])
+        sigma = np.maximum(self._sigma[block][expand] + vol_shocks[None, None, :, None],
+                           MIN_VOLATILITY)
+        r = self._r[block][expand] + rate_shocks[None, None, None, :]
+
+        return self._analytic_formula.black_scholes_price(
+            S, self._K[block][expand], r, sigma, self._T[block][expand],
+            self._option_type[block][expand])
+
+    def _simulated_prices(self, option: Option, spot_shocks, vol_shocks, rate_shocks):
+        """Base price and scenario prices of a Monte Carlo contract with common random numbers"""
+
+        engine = option.MONTE_CARLO
+        params = engine._get_pricing_params(self.num_sims)
+        base = engine._model_pricing(**params)
+
+        prices = np.empty((spot_shocks.size, vol_shocks.size, rate_shocks.size))
+        for i, spot_shock in enumerate(spot_shocks):
+            for j, vol_shock in enumerate(vol_shocks):
+                for k, rate_shock in enumerate(rate_shocks):
+                    shocked = params.copy()
+                    shocked['S0'] = params['S0'] * (1 + spot_shock)
+                    shocked['sigma'] = max(params['sigma'] + vol_shock, MIN_VOLATILITY)
+                    shocked['r'] = params['r'] + rate_shock
+                    prices[i, j, k] = engine._model_pricing(**shocked)
+        return base, prices
+
+    def run(self, spot_shocks=(0.0,), vol_shocks=(0.0,), rate_shocks=(0.0,),
+            full_cube: bool = False) -> dict:
+        """Revalues the book in every scenario of the shock grid
+
+        Parameters
+        ----------
+            spot_shocks : (np.array) relative underlying moves, 0.05 means +5%
+
+            vol_shocks : (np.array) absolute volatility moves, 0.01 means +1 vol point
+
+            rate_shocks : (np.array) absolute risk-free rate moves, 0.0025 means +25bp
+
+            full_cube : (bool) whether to also return the price of every contract in every scenario
+
+        Returns
+        -------
+            {
+                underlyings : (np.array) identifiers indexing the first axis of pnl
+                pnl : (np.array) P&L per underlying and scenario, shape (underlyings, spot, vol, rate)
+                book_pnl : (np.array) P&L of the whole book per scenario, shape (spot, vol, rate)
+                base_value : (np.array) unshocked quantity weighted value per underlying
+                prices : (np.array) if full_cube, price per contract and scenario, shape (contracts, spot, vol, rate)
+            }"""
+
+        spot_shocks, vol_shocks, rate_shocks = (np.atleast_1d(np.asarray(x, dtype=float))
+                                                for x in (spot_shocks, vol_shocks, rate_shocks))
+        grid_shape = (spot_shocks.size, vol_shocks.size, rate_shocks.size)
+        n_underlyings = len(self.underlyings)
+
+        pnl = np.zeros((n_underlyings,) + grid_shape)
+        base_value = np.zeros(n_underlyings)
+        prices = np.empty((len(self.options),) + grid_shape) if full_cube else None
+
+        zero = np.zeros(1)
+        block_size = self._block_size(int(np.prod(grid_shape)))
+        for start in range(0, self._analytic_index.size, block_size):
+            block = slice(start, start + block_size)
+            contracts = self._analytic_index[block]
+            quantity = self.quantity[contracts]
+
+            block_prices = self._analytic_prices(block, spot_shocks, vol_shocks, rate_shocks)
+            base = self._analytic_prices(block, zero, zero, zero)[:, 0, 0, 0]
+            block_pnl = (block_prices - base[:, None, None, None]) * quantity[:, None, None, None]
+
+            groups = self._underlying_index[contracts]
+            starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+            pnl[groups[starts]] += np.add.reduceat(block_pnl, starts, axis=0)
+            base_value[groups[starts]] += np.add.reduceat(base * quantity, starts)
+
+            if full_cube:
+                prices[contracts] = block_prices
+
+        for contract in self._simulated_index:
+            base, contract_prices = self._simulated_prices(
+                self.options[contract], spot_shocks, vol_shocks, rate_shocks)
+            group = self._underlying_index[contract]
+            pnl[group] += (contract_prices - base) * self.quantity[contract]
+            base_value[group] += base * self.quantity[contract]
+
+            if full_cube:
+                prices[contract] = contract_prices
+
+        result = {
+            'underlyings': self.underlyings,
+            'pnl': pnl,
+            'book_pnl': pnl.sum(axis=0),
+            'base_value': base_value,
+        }
+        if full_cube:
+            result['prices'] = prices
+        return result
+
+
+class ValueAtRisk():
+    """Monte Carlo Value-at-Risk and Expected Shortfall of a book of European options.
+
+    Each underlying contributes two factors, its spot and the level of its implied
+    volatilities, which move together as correlated geometric Brownian motions over the
+    horizon (simulated with quant_math.gbm_simulation). Positions are revalued either fully
+    with AnalyticFormula at the shocked spot, volatility and remaining maturity, or with a
+    delta/gamma/vega/theta approximation. Scenarios are streamed in chunks and positions in
+    blocks under memory_cap, so only the book P&L of each scenario is kept. A second pass over
+    the tail scenarios attributes the Expected Shortfall to positions.
+
+    Parameters
+    ----------
+    options : (Sequence[EuropeanOption]) positions of the book
+
+    quantity : (np.array) position size per contract
+
+    underlying : (np.array) identifier of the underlying of each contract, defaults to a single underlying
+
+    spot_volatility : (np.array) annual volatility of each underlying, defaults to the mean
+                      implied volatility of its contracts
+
+    vol_of_vol : (np.array) annual volatility of the implied volatility level of each underlying
+
+    correlation : (np.array) correlation of the factors, either (underlyings, underlyings)
+                  between spots or (2 * underlyings, 2 * underlyings) with the spots first
+
+    horizon_days : (int) number of trading days the moves are simulated over
+
+    memory_cap : (int) bytes a block of positions x scenarios may use"""
+
+    # float64 temporaries alive at once while AnalyticFormula revalues a block
+    _BLOCK_TEMPORARIES = 16
+
+    def __init__(self, options: Sequence[EuropeanOption], quantity=1.0, underlying=None,
+                 spot_volatility=None, vol_of_vol=0.8, correlation=None,
+                 horizon_days: int = 1, memory_cap: int = 256 * 2 ** 20) -> None:
+
+        if not all(isinstance(o, EuropeanOption) for o in options):
+            raise ValueError("ValueAtRisk revalues positions analytically, "
+                             "every option must be a EuropeanOption.")
+
+        n_contracts = len(options)
+        self.options = list(options)
+        self.quantity = np.broadcast_to(np.asarray(quantity, dtype=float), (n_contracts,))
+        if underlying is None:
+            underlying = np.zeros(n_contracts, dtype=int)
+        self.underlyings, self._underlying_index = np.unique(
+            np.broadcast_to(np.asarray(underlying), (n_contracts,)), return_inverse=True)
+        n_underlyings = len(self.underlyings)
+
+        self._analytic_formula = AnalyticFormula()
+        self._S, self._K, self._r, self._sigma, self._T, self._option_type = _contract_arrays(
+            self.options, self._analytic_formula)
+
+        if spot_volatility is None:
+            spot_volatility = np.bincount(self._underlying_index, weights=self._sigma) / \
+                np.bincount(self._underlying_index)
+        self.spot_volatility = np.broadcast_to(
+            np.asarray(spot_volatility, dtype=float), (n_underlyings,))
+        self.vol_of_vol = np.broadcast_to(np.asarray(vol_of_vol, dtype=float), (n_underlyings,))
+
+        if correlation is None:
+            correlation = np.eye(n_underlyings)
+        correlation = np.asarray(correlation, dtype=float)
+        if correlation.shape == (n_underlyings, n_underlyings):
+            correlation = np.block([[correlation, np.zeros_like(correlation)],
+                                    [np.zeros_like(correlation), np.eye(n_underlyings)]])
+        if correlation.shape != (2 * n_underlyings, 2 * n_underlyings):
+            raise ValueError("correlation must be (underlyings, underlyings) "
+                             "or (2 * underlyings, 2 * underlyings).")
+        self._cholesky = np.linalg.cholesky(correlation)
+
+        self.horizon_days = horizon_days
+        self.memory_cap = memory_cap
+
+        horizon = horizon_days / 252
+        self._T_horizon = np.maximum(self._T - horizon, 1e-8)
+        self._base = self._analytic_formula.black_scholes_price(
+            self._S, self._K, self._r, self._sigma, self._T, self._option_type)
+
+        # first and second order terms of the approximation, per unit factor return
+        delta = self._analytic_formula.delta(
+            self._S, self._K, self._r, self._sigma, self._T, self._option_type)
+        gamma = self._analytic_formula.gamma(self._S, self._K, self._r, self._sigma, self._T)
+        vega = self._analytic_formula.vega(self._S, self._K, self._r, self._sigma, self._T)
+        theta = self._analytic_formula.theta(
+            self._S, self._K, self._r, self._sigma, self._T, self._option_type)
+        self._spot_term = delta * self._S
+        self._convexity_term = gamma * self._S ** 2 / 2
+        self._vol_term = vega * self._sigma
+        self._time_term = theta * horizon
+
+    def _factor_moves(self, chunk: int, chunk_size: int, seed: int) -> tuple:
+        """Gross spot and implied volatility returns of every underlying for one scenario chunk,
+        each of shape (underlyings, chunk_size). A chunk is always regenerated identically."""
+
+        n_underlyings = len(self.underlyings)
+        rng = np.random.default_rng([seed, chunk])
+        draws = np.einsum('ij,jsn->isn', self._cholesky, rng.standard_normal(
+            (2 * n_underlyings, self.horizon_days, chunk_size)))
+
+        volatilities = np.concatenate([self.spot_volatility, self.vol_of_vol])
+        moves = np.stack([
+            gbm_simulation(S0=1.0, mu=0.0, n_steps=self.horizon_days, T=self.horizon_days / 252,
+                           sigma=volatilities[factor], num_sims=chunk_size,
+                           random_draws=draws[factor])[-1]
+            for factor in range(2 * n_underlyings)])
+        return moves[:n_underlyings], moves[n_underlyings:]
+
+    def _position_pnl(self, block: slice, spot_moves, vol_moves, approximate: bool) -> np.array:
+        """Quantity weighted P&L of positions block in every scenario, shape (positions, scenarios)"""
+
+        groups = self._underlying_index[block]
+        spot_return = spot_moves[groups] - 1
+        vol_return = vol_moves[groups] - 1
+        expand = (slice(None), None)
+
+        if approximate:
+            pnl = self._spot_term[block][expand] * spot_return \
+                + self._convexity_term[block][expand] * spot_return ** 2 \
+                + self._vol_term[block][expand] * vol_return \
+                + self._time_term[block][expand]
+        else:
+            pnl = self._analytic_formula.black_scholes_price(
+                self._S[block][expand] * spot_moves[groups], self._K[block][expand],
+                self._r[block][expand],
+                np.maximum(self._sigma[block][expand] * vol_moves[groups], MIN_VOLATILITY),
+                self._T_horizon[block][expand], self._option_type[block][expand]) \
+                - self._base[block][expand]
+
+        return pnl * self.quantity[block][expand]
+
+    def _blocks(self, chunk_size: int):
+        """Position slices holding at most memory_cap bytes of positions x chunk_size temporaries"""
+        block_size = max(1, int(self.memory_cap // (chunk_size * 8 * self._BLOCK_TEMPORARIES)))
+        return [slice(start, start + block_size) for start in range(0, len(self.options), block_size)]
+
+    @staticmethod
+    def _tail_measures(losses: np.array, confidence: float) -> tuple:
+        """VaR and ES of rows of losses, the ES being the mean of the worst ceil((1 - confidence) * n)"""
+
+        n_tail = max(1, int(np.ceil((1 - confidence) * losses.shape[-1])))
+        tail = -np.partition(-losses, n_tail - 1, axis=-1)[..., :n_tail]
+        return tail.min(axis=-1), tail.mean(axis=-1)
+
+    def run(self, num_scenarios: int = 100_000, confidence: float = 0.99,
+            approximate: bool = False, chunk_size: int = 10_000, num_bootstrap: int = 1_000,
+            interval: float = 0.95, seed: int = 0) -> dict:
+        """Simulates the book's P&L over the horizon and measures its tail
+
+        Parameters
+        ----------
+            num_scenarios : (int) number of simulated scenarios
+
+            confidence : (float) confidence level of VaR and ES, 0.99 means 99%
+
+            approximate : (bool) delta/gamma/vega/theta revaluation instead of Black-Scholes
+
+            chunk_size : (int) scenarios generated and revalued at once
+
+            num_bootstrap : (int) resamples of the scenario P&L for the confidence intervals
+
+            interval : (float) coverage of the bootstrap confidence intervals
+
+            seed : (int) seed of the scenario generator
+
+        Returns
+        -------
+            {
+                var : (float) Value-at-Risk as a positive loss
+                es : (float) Expected Shortfall as a positive loss
+                var_interval : (tuple) bootstrap confidence interval of the VaR
+                es_interval : (tuple) bootstrap confidence interval of the ES
+                contributions : (np.array) share of the ES of each position, summing to es
+                pnl : (np.array) simulated book P&L of every scenario
+            }"""
+
+        chunk_sizes = [min(chunk_size, num_scenarios - start)
+                       for start in range(0, num_scenarios, chunk_size)]
+        blocks = self._blocks(chunk_size)
+
+        pnl = np.empty(num_scenarios)
+        offset = 0
+        for chunk, size in enumerate(chunk_sizes):
+            spot_moves, vol_moves = self._factor_moves(chunk, size, seed)
+            pnl[offset:offset + size] = sum(
+                self._position_pnl(block, spot_moves, vol_moves, approximate).sum(axis=0)
+                for block in blocks)
+            offset += size
+
+        losses = -pnl
+        var, es = self._tail_measures(losses, confidence)
+
+        # ES contributions: mean loss of every position over the tail scenarios
+        n_tail = max(1, int(np.ceil((1 - confidence) * num_scenarios)))
+        tail_scenarios = np.sort(np.argpartition(-losses, n_tail - 1)[:n_tail])
+        contributions = np.zeros(len(self.options))
+        offset = 0
+        for chunk, size in enumerate(chunk_sizes):
+            in_chunk = tail_scenarios[(tail_scenarios >= offset) &
+                                      (tail_scenarios < offset + size)] - offset
+            if in_chunk.size:
+                spot_moves, vol_moves = self._factor_moves(chunk, size, seed)
+                for block in blocks:
+                    contributions[block] -= self._position_pnl(
+                        block, spot_moves[:, in_chunk], vol_moves[:, in_chunk],
+                        approximate).sum(axis=1)
+            offset += size
+        contributions /= n_tail
+
+        rng = np.random.default_rng([seed, len(chunk_sizes)])
+        var_samples, es_samples = np.empty(num_bootstrap), np.empty(num_bootstrap)
+        resamples_per_batch = max(1, int(self.memory_cap // (num_scenarios * 16)))
+        for start in range(0, num_bootstrap, resamples_per_batch):
+            batch = slice(start, min(start + resamples_per_batch, num_bootstrap))
+            resampled = losses[rng.integers(0, num_scenarios,
+                                            size=(batch.stop - batch.start, num_scenarios))]
+            var_samples[batch], es_samples[batch] = self._tail_measures(resampled, confidence)
+
+        bounds = [(1 - interval) / 2 * 100, (1 + interval) / 2 * 100]
+        return {
+            'var': var,
+            'es': es,
+            'var_interval': tuple(np.percentile(var_samples, bounds)),
+            'es_interval': tuple(np.percentile(es_samples, bounds)),
+            'contributions': contributions,
+            'pnl': pnl,
+        }
@@ -0,0 +1,296 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .PricingModels import Simulator
+
+# estimators of a run, the price and the finite difference greeks of Simulator
+ESTIMATORS = ('price',)
+GREEKS = ('delta', 'gamma', 'vega', 'theta', 'rho')
+
+
+def _batch_moments(values: np.array) -> list:
+    """Returns [count, mean, M2] of a batch of per path estimates"""
+
+    mean = np.mean(values)
+    return [len(values), float(mean), float(np.sum((values - mean) ** 2))]
+
+
+def _combine(a: list, b: list) -> list:
+    """Chan et al.'s update of [count, mean, M2] accumulators, the parallel form of Welford's"""
+
+    count = a[0] + b[0]
+    if a[0] == 0:
+        return list(b)
+    delta = b[1] - a[1]
+    return [count, a[1] + delta * b[0] / count, a[2] + b[2] + delta ** 2 * a[0] * b[0] / count]
+
+
+class RunState():
+    """Serialisable state of a sharded Monte Carlo run, see ShardedRun.
+
+    The paths of a run are split into batches of batch_size paths, batch b drawing from the
+    global NumPy random state seeded from (seed, b), so a batch's draws depend on the seed and
+    its index only and the next batch to simulate is the stream position of a shard. A state
+    holds the batches assigned to its shard and the [count, mean, M2] accumulators of every
+    estimator for each batch it completed. Estimates fold the batches in index order with Chan's
+    update of Welford's accumulators, so merged shards give the bit for bit same estimates as
+    one state running every batch, whatever the partition.
+
+    Parameters
+    ----------
+    engine : (str) digest of the engine's description, states of different engines never merge
+
+    seed : (int) seed of the run
+
+    num_sims : (int) paths of the whole run, over every shard
+
+    batch_size : (int) paths of a batch
+
+    batches : (list) indices of the batches of this shard
+
+    estimators : (tuple) names of the estimated quantities
+
+    completed : (dict) accumulators of every estimator by completed batch index"""
+
+    VERSION = 1
+
+    def __init__(self, engine: str, seed: int, num_sims: int, batch_size: int, batches,
+                 estimators: tuple, completed: dict = None) -> None:
+        self.engine = engine
+        self.seed = seed
+        self.num_sims = num_sims
+        self.batch_size = batch_size
+        self.batches = sorted(int(batch) for batch in batches)
+        self.estimators = tuple(estimators)
+        self.completed = {} if completed is None else dict(completed)
+
+    @property
+    def remaining(self) -> list:
+        """Batches of the shard still to simulate"""
+        return [batch for batch in self.batches if batch not in self.completed]
+
+    @property
+    def done(self) -> bool:
+        return not self.remaining
+
+    def batch_sims(self, batch: int) -> int:
+        """Paths of a batch, the last one of the run taking the remainder"""
+        return min(self.batch_size, self.num_sims - batch * self.batch_size)
+
+    def to_dict(self) -> dict:
+        return {
+            'version': self.VERSION,
+            'engine': self.engine,
+            'seed': self.seed,
+            'num_sims': self.num_sims,
+            'batch_size': self.batch_size,
+            'batches': self.batches,
+            'estimators': list(self.estimators),
+            # JSON keys are strings, floats round trip exactly through their repr
+            'completed': {str(batch): self.completed[batch] for batch in sorted(self.completed)},
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> 'RunState':
+        if state.get('version') != cls.VERSION:
+            raise ValueError(f"Unsupported run state version {state.get('version')}.")
+        completed = {int(batch): {name: list(moments) for name, moments in accumulators.items()}
+                     for batch, accumulators in state['completed'].items()}
+        return cls(state['engine'], state['seed'], state['num_sims'], state['batch_size'],
+                   state['batches'], state['estimators'], completed)
+
+    def save(self, path: str) -> None:
+        """Writes the state to path atomically, an interrupted write leaves the previous one"""
+
+        path = os.path.expanduser(path)
+        with open(path + '.tmp', 'w') as file:
+            json.dump(self.to_dict(), file)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path: str) -> 'RunState':
+        with open(os.path.expanduser(path)) as file:
+            return cls.from_dict(json.load(file))
+
+    @classmethod
+    def merge(cls, states) -> 'RunState':
+        """Returns the state of the union of shards of one run
+
+        Parameters
+        ----------
+            states : (list) RunState or paths of saved states of disjoint shards
+
+        Returns
+        -------
+            state : (RunState) holding the batches and accumulators of every shard"""
+
+        states = [cls.load(state) if isinstance(state, (str, os.PathLike)) else state
+                  for state in states]
+        first = states[0]
+        run = (first.engine, first.seed, first.num_sims, first.batch_size, first.estimators)
+        batches, completed = [], {}
+        for state in states:
+            if (state.engine, state.seed, state.num_sims, state.batch_size, state.estimators) != run:
+                raise ValueError("Only shards of the same engine, seed, paths and batches merge.")
+            if set(state.batches) & set(batches):
+                raise ValueError("Shards to merge must not share batches.")
+            batches.extend(state.batches)
+            completed.update(state.completed)
+        return cls(*run[:4], batches, run[4], completed)
+
+    def estimates(self) -> dict:
+        """Returns the estimate of every estimator over the completed batches
+
+        Returns
+        -------
+            {
+                name : {
+                    mean : (float) estimate
+                    std_error : (float) standard error of the estimate
+                    std : (float) standard deviation of the per path estimates
+                    count : (int) paths behind the estimate
+                }
+            }"""
+
+        results = {}
+        for name in self.estimators:
+            moments = [0, 0.0, 0.0]
+            for batch in sorted(self.completed):
+                moments = _combine(moments, self.completed[batch][name])
+            count, mean, m2 = moments
+            std = float(np.sqrt(m2 / (count - 1))) if count > 1 else float('nan')
+            results[name] = {'mean': mean if count else float('nan'),
+                             'std_error': float(std / np.sqrt(count)) if count else float('nan'),
+                             'std': std, 'count': count}
+        return results
+
+
+class ShardedRun():
+    """Monte Carlo run of a Simulator engine that can be split across processes or machines,
+    checkpointed, resumed and merged exactly.
+
+    The num_sims paths are cut into batches seeded from (seed, batch index) and a shard runs a
+    contiguous block of them. Every batch prices its paths with the engine's
+    _discounted_pay_offs, and with greeks also the per path finite differences of the bumps of
+    Simulator.delta, gamma, vega, theta and rho on the same draws, and keeps the count, mean and
+    M2 of every estimate. A checkpoint is written after every checkpoint_every batches and a run
+    pointed at an existing checkpoint resumes from the batches it had not completed.
+
+        run = ShardedRun(engine, seed=7, num_sims=10_000_000, greeks=True)
+        run.run(shard=2, shards=8, checkpoint='shard-2.json')  # on every host
+        RunState.merge([f'shard-{i}.json' for i in range(8)]).estimates()['price']
+
+    Draws come from the global NumPy random state, seeded per batch and restored after it, so
+    engines reading a DrawStore, which seeds its draws itself, cannot be sharded.
+
+    Parameters
+    ----------
+    simulator : (Simulator) engine whose model, contract and pay off are priced
+
+    seed : (int) seed of the run, shards of one run must share it
+
+    num_sims : (int) paths of the whole run
+
+    batch_size : (int) paths of a batch, the unit of seeding, checkpointing and merging
+
+    greeks : (bool) also estimate delta, gamma, vega, theta and rho"""
+
+    def __init__(self, simulator: Simulator, seed: int, num_sims: int, batch_size: int = 10_000,
+                 greeks: bool = False) -> None:
+        if simulator.draw_store is not None:
+            raise ValueError("Sharded runs seed every batch, the engine must not use a draw store.")
+        self.simulator = simulator
+        self.seed = seed
+        self.num_sims = num_sims
+        self.batch_size = batch_size
+        self.greeks = greeks
+        self.estimators = ESTIMATORS + (GREEKS if greeks else ())
+        description = json.dumps(simulator.description(), sort_keys=True)
+        self.engine = hashlib.sha1(description.encode()).hexdigest()
+
+    @property
+    def n_batches(self) -> int:
+        return -(-self.num_sims // self.batch_size)
+
+    def state(self, shard: int = 0, shards: int = 1) -> RunState:
+        """Returns the empty state of one of shards contiguous blocks of batches"""
+
+        if not 0 <= shard < shards:
+            raise ValueError("shard must be in [0, shards).")
+        batches = np.array_split(np.arange(self.n_batches), shards)[shard]
+        return RunState(self.engine, self.seed, self.num_sims, self.batch_size, batches.tolist(),
+                        self.estimators)
+
+    def _batch_seed(self, batch: int) -> np.array:
+        return np.random.SeedSequence([self.seed, batch]).generate_state(4)
+
+    def _estimates(self, num_sims: int) -> dict:
+        """Returns the per path estimates of every estimator for one batch of paths"""
+
+        simulator = self.simulator
+        params = simulator._get_pricing_params(num_sims)
+        base = simulator._discounted_pay_offs(params)
+        estimates = {'price': base}
+        if not self.greeks:
+            return estimates
+
+        # the bumps of Simulator's finite difference greeks, on the same draws
+        step = simulator.T / simulator._time_steps()
+
+        def bumped(name: str, bump: float) -> np.array:
+            return simulator._discounted_pay_offs(dict(params, **{name: params[name] + bump}))
+
+        up = bumped('S0', step)
+        estimates['delta'] = (up - base) / step
+        estimates['gamma'] = (up - 2 * base + bumped('S0', - step)) / step ** 2
+        estimates['vega'] = (bumped('sigma', step) - base) / step
+        estimates['theta'] = (bumped('T', step) - base) / (- step)
+        estimates['rho'] = (bumped('r', step) - base) / step
+        return estimates
+
+    def run_batch(self, state: RunState, batch: int) -> None:
+        """Simulates one batch and records its accumulators in state"""
+
+        random_state = np.random.get_state()
+        np.random.seed(self._batch_seed(batch))
+        try:
+            estimates = self._estimates(state.batch_sims(batch))
+        finally:
+            np.random.set_state(random_state)
+        state.completed[batch] = {name: _batch_moments(estimates[name]) for name in state.estimators}
+
+    def run(self, shard: int = 0, shards: int = 1, checkpoint: str = None,
+            checkpoint_every: int = 1) -> RunState:
+        """Runs the batches of a shard, resuming from its checkpoint when one exists
+
+        Parameters
+        ----------
+            shard : (int) index of the shard to run
+
+            shards : (int) number of shards the run is split into
+
+            checkpoint : (str) path the state is saved to and resumed from
+
+            checkpoint_every : (int) batches between two checkpoints
+
+        Returns
+        -------
+            state : (RunState) state of the shard with every batch completed"""
+
+        state = self.state(shard, shards)
+        if checkpoint is not None and os.path.exists(os.path.expanduser(checkpoint)):
+            saved = RunState.load(checkpoint)
+            if (saved.engine, saved.seed, saved.num_sims, saved.batch_size, saved.batches,
+                    saved.estimators) != (state.engine, state.seed, state.num_sims,
+                                          state.batch_size, state.batches, state.estimators):
+                raise ValueError(f"The checkpoint {checkpoint} belongs to another run or shard.")
+            state = saved
+
+        for count, batch in enumerate(state.remaining, start=1):
+            self.run_batch(state, batch)
+            if checkpoint is not None and (count % checkpoint_every == 0 or state.done):
+                state.save(checkpoint)
+        return state
@@ -0,0 +1,252 @@
+import numpy as np
+
+from typing import Literal
+
+from .ImpliedVolatility import ImpliedVolatilityTracker
+
+
+class SVISlice():
+    """Raw SVI parameterisation of the total implied variance of a single expiry
+
+        w(k) = a + b * (rho * (k - m) + sqrt((k - m) ** 2 + s ** 2))
+
+    where k = log(K / F) is the log-moneyness against the forward F.
+
+    Parameters
+    ----------
+    a : (float) level of the total variance
+
+    b : (float) slope of the wings
+
+    rho : (float) skew, between -1 and 1
+
+    m : (float) log-moneyness of the smile's vertex
+
+    s : (float) curvature around the vertex
+
+    T : (float) time till maturity in years of the slice"""
+
+    def __init__(self, a: float, b: float, rho: float, m: float, s: float, T: float) -> None:
+        self.a = a
+        self.b = b
+        self.rho = rho
+        self.m = m
+        self.s = s
+        self.T = T
+
+    def params(self) -> np.array:
+        return np.array([self.a, self.b, self.rho, self.m, self.s])
+
+    def total_variance(self, k) -> np.array:
+        """Returns the total implied variance sigma^2 * T at log-moneyness k"""
+        return _svi_total_variance(self.params(), k)
+
+    def implied_volatility(self, k) -> np.array:
+        """Returns the implied volatility at log-moneyness k"""
+        return np.sqrt(self.total_variance(k) / self.T)
+
+    @classmethod
+    def fit(cls, k, implied_volatility, T: float, weights=None, grid_size: int = 25,
+            refine: bool = True):
+        """Fits a slice to the implied volatilities of one expiry
+
+        For a fixed vertex m and curvature s the SVI total variance is linear in
+        (a, b * rho, b), so every (m, s) of a grid is solved at once as a batch of 3x3
+        normal equations. The best admissible grid point is then optionally refined by a
+        bounded non-linear least squares over the five parameters.
+
+        Parameters
+        ----------
+            k : (np.array) log-moneyness log(K / F) of the quotes
+
+            implied_volatility : (np.array) implied volatility of the quotes, 0.05 means 5%
+
+            T : (float) time till maturity in years of the expiry
+
+            weights : (np.array) optional weight of each quote, e.g. its vega
+
+            grid_size : (int) number of m and of s values searched
+
+            refine : (bool) whether to polish the grid solution with scipy's least_squares
+
+        Returns
+        -------
+            slice : (SVISlice) fitted slice"""
+
+        k = np.asarray(k, dtype=float)
+        w = np.asarray(implied_volatility, dtype=float) ** 2 * T
+        weights = np.ones_like(k) if weights is None else np.asarray(weights, dtype=float)
+        if k.size < 5:
+            raise ValueError("At least 5 quotes are needed to fit an SVI slice.")
+
+        span = max(k.max() - k.min(), 1e-4)
+        m_grid = np.linspace(k.min(), k.max(), grid_size)
+        s_grid = np.geomspace(1e-3 * span, 2 * span, grid_size)
+        m, s = (x.ravel() for x in np.meshgrid(m_grid, s_grid))
+
+        x = k - m[:, None]
+        design = np.stack([np.ones_like(x), x, np.sqrt(x ** 2 + s[:, None] ** 2)], axis=-1)
+        weighted = design * weights[:, None]
+        normal_matrix = np.einsum('gni,gnj->gij', weighted, design)
+        normal_rhs = np.einsum('gni,n->gi', weighted, w)
+        with np.errstate(invalid='ignore'):
+            coefficients = np.linalg.solve(
+                normal_matrix + 1e-12 * np.eye(3), normal_rhs[..., None])[..., 0]
+
+        a, c, b = coefficients.T
+        admissible = (b >= 0) & (np.abs(c) <= b) & \
+            (a + s * np.sqrt(np.maximum(b ** 2 - c ** 2, 0)) >= 0)
+        errors = np.einsum('gn,n->g', (np.einsum('gni,gi->gn', design, coefficients) - w) ** 2,
+                           weights)
+        errors[~admissible] = np.inf
+        best = np.argmin(errors)
+
+        if np.isfinite(errors[best]):
+            params = np.array([a[best], b[best], c[best] / b[best] if b[best] > 0 else 0.0,
+                               m[best], s[best]])
+        else:
+            params = np.array([w.min(), 0.0, 0.0, 0.0, span])
+
+        if refine:
+            from scipy.optimize import least_squares
+
+            root_weights = np.sqrt(weights)
+            params = least_squares(
+                lambda p: (_svi_total_variance(p, k) - w) * root_weights,
+                x0=np.clip(params, [-np.inf, 0, -0.999, -np.inf, 1e-6],
+                           [np.inf, np.inf, 0.999, np.inf, np.inf]),
+                bounds=([-np.inf, 0, -0.999, -np.inf, 1e-6],
+                        [np.inf, np.inf, 0.999, np.inf, np.inf])).x
+
+        return cls(*params, T=T)
+
+
+def _svi_total_variance(params: np.array, k) -> np.array:
+    """Raw SVI total variance, params is (..., 5) and broadcasts against k"""
+    a, b, rho, m, s = np.moveaxis(np.asarray(params), -1, 0)
+    x = k - m
+    return a + b * (rho * x + np.sqrt(x ** 2 + s ** 2))
+
+
+class VolatilitySurface():
+    """Implied volatility surface built from fitted SVI slices.
+
+    Expiries are kept sorted so a maturity is located with a binary search. Between two
+    expiries the total variance is interpolated linearly in time at constant log-moneyness,
+    before the first expiry it is scaled down proportionally to time and after the last
+    expiry the implied volatility is held flat. Every query is vectorised over (K, T) arrays,
+    and a surface can be passed as the sigma of AnalyticFormula and Simulator pricers,
+    StochasticVolatility squaring it into its initial variance.
+
+    Parameters
+    ----------
+    S : (float) underlying price the surface was built at
+
+    r : (float) risk-free rate, 0.05 means 5%, used for the forward
+
+    slices : (list) SVISlice of every expiry"""
+
+    def __init__(self, S: float, r: float, slices: list) -> None:
+        if not slices:
+            raise ValueError("A volatility surface needs at least one slice.")
+        self.S = S
+        self.r = r
+        self.slices = sorted(slices, key=lambda svi_slice: svi_slice.T)
+        self.expiries = np.array([svi_slice.T for svi_slice in self.slices])
+        self._params = np.stack([svi_slice.params() for svi_slice in self.slices])
+
+    @classmethod
+    def from_implied_volatilities(cls, S: float, K, r: float, T, implied_volatility,
+                                  weights=None, **fit_kwargs):
+        """Fits one SVI slice per distinct maturity of a chain of implied volatilities
+
+        Parameters
+        ----------
+            S : (float) underlying price
+
+            K : (np.array) strike price of each quote
+
+            r : (float) risk-free rate, 0.05 means 5%
+
+            T : (np.array) time till maturity in years of each quote
+
+            implied_volatility : (np.array) implied volatility of each quote, NaN quotes are dropped
+
+            weights : (np.array) optional weight of each quote, e.g. its vega
+
+        Returns
+        -------
+            surface : (VolatilitySurface)"""
+
+        K, T, implied_volatility = (x.ravel() for x in np.broadcast_arrays(
+            *(np.asarray(x, dtype=float) for x in (K, T, implied_volatility))))
+        weights = np.ones_like(K) if weights is None else \
+            np.broadcast_to(np.asarray(weights, dtype=float), K.shape)
+
+        valid = np.isfinite(implied_volatility)
+        K, T, implied_volatility, weights = K[valid], T[valid], implied_volatility[valid], weights[valid]
+        k = np.log(K / (S * np.exp(r * T)))
+
+        slices = []
+        for expiry in np.unique(T):
+            quotes = T == expiry
+            slices.append(SVISlice.fit(k[quotes], implied_volatility[quotes], expiry,
+                                       weights[quotes], **fit_kwargs))
+        return cls(S, r, slices)
+
+    @classmethod
+    def from_quotes(cls, S: float, K, r: float, T, option_price,
+                    option_type: Literal["call", "put"] = 'call', **fit_kwargs):
+        """Solves the implied volatility of a chain of option prices and fits the surface to it"""
+
+        K, T, option_price = np.broadcast_arrays(
+            *(np.asarray(x, dtype=float) for x in (K, T, option_price)))
+        implied_volatility = ImpliedVolatilityTracker().update(
+            range(option_price.size), S, K, r, T, option_price, option_type)
+        return cls.from_implied_volatilities(S, K, r, T, implied_volatility, **fit_kwargs)
+
+    def log_moneyness(self, K, T) -> np.array:
+        """Returns log(K / F) with F the forward of the surface at maturity T"""
+        return np.log(np.asarray(K, dtype=float) / self.S) - self.r * np.asarray(T, dtype=float)
+
+    def total_variance(self, K, T) -> np.array:
+        """Returns the total implied variance sigma^2 * T for arrays of strikes and maturities
+
+        Parameters
+        ----------
+            K : (np.array) strike price
+
+            T : (np.array) time till maturity in years
+
+        Returns
+        -------
+            total_variance : (np.array) broadcast shape of K and T"""
+
+        K, T = np.broadcast_arrays(np.asarray(K, dtype=float), np.asarray(T, dtype=float))
+        k = self.log_moneyness(K, T)
+
+        right = np.clip(np.searchsorted(self.expiries, T), 1, len(self.expiries) - 1) \
+            if len(self.expiries) > 1 else np.zeros(T.shape, dtype=int)
+        left = np.maximum(right - 1, 0)
+        T_left, T_right = self.expiries[left], self.expiries[right]
+
+        w_left = _svi_total_variance(self._params[left], k)
+        w_right = _svi_total_variance(self._params[right], k)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight = np.where(T_right > T_left, (T - T_left) / (T_right - T_left), 0.0)
+        total_variance = w_left + np.clip(weight, 0, 1) * (w_right - w_left)
+
+        # proportional to time before the first expiry, flat volatility after the last one
+        first, last = self.expiries[0], self.expiries[-1]
+        total_variance = np.where(T < first, w_left * T / first, total_variance)
+        total_variance = np.where(T > last, w_right * T / last, total_variance)
+        return np.maximum(total_variance, 0)
+
+    def implied_volatility(self, K, T) -> np.array:
+        """Returns the implied volatility, 0.05 means 5%, for arrays of strikes and maturities"""
+        T = np.asarray(T, dtype=float)
+        return np.sqrt(self.total_variance(K, T) / T)
+
+    def __call__(self, K, T) -> np.array:
+        return self.implied_volatility(K, T)
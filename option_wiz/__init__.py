@@ -0,0 +1,71 @@
+"""Option pricing, Greeks and risk.
+
+Public classes are loaded from their module on first access, so `import option_wiz`
+stays cheap and SciPy is only imported by the routines that need it.
+
+    from option_wiz import EuropeanOption, AnalyticFormula
+
+Classes named after their module, e.g. PayOff, LiveBook or ResultCache, are imported from that
+module, option_wiz.PayOff being the module as for any package:
+
+    from option_wiz.LiveBook import LiveBook"""
+
+from importlib import import_module
+
+_EXPORTS = {
+    'Option': 'Options',
+    'EuropeanOption': 'Options',
+    'AsianOption': 'Options',
+    'DigitalOption': 'Options',
+    'DoubleDigitalOption': 'Options',
+    'BarrierOption': 'Options',
+    'PayOffEuropean': 'PayOff',
+    'PayOffDigital': 'PayOff',
+    'PayOffDoubleDigital': 'PayOff',
+    'PayOffAsianOptionArithmetic': 'PayOff',
+    'PayOffAsianOptionGeometric': 'PayOff',
+    'PayOffBasket': 'PayOff',
+    'PayOffSpread': 'PayOff',
+    'PayOffBestOf': 'PayOff',
+    'PayOffBarrier': 'PayOff',
+    'AnalyticFormula': 'PricingModels',
+    'MonteCarlo': 'PricingModels',
+    'StochasticVolatility': 'PricingModels',
+    'MultiAssetMonteCarlo': 'PricingModels',
+    'MultilevelMonteCarlo': 'Multilevel',
+    'SimulationStats': 'Instrumentation',
+    'ImpliedVolatilityTracker': 'ImpliedVolatility',
+    'SVISlice': 'VolatilitySurface',
+    'ScenarioEngine': 'RiskEngine',
+    'ValueAtRisk': 'RiskEngine',
+    'HedgingSimulator': 'Hedging',
+    'set_backend': 'backends',
+    'get_backend': 'backends',
+    'available_backends': 'backends',
+    'Dual': 'autodiff',
+    'ShardedRun': 'Sharding',
+    'RunState': 'Sharding',
+    'EngineProfiler': 'Profiler',
+    'EngineProfile': 'Profiler',
+    'candidate_engines': 'Profiler',
+    'RateCurve': 'Curves',
+    'YieldCurve': 'Curves',
+    'DividendCurve': 'Curves',
+    'HestonCalibrator': 'Calibration',
+    'MertonCalibrator': 'Calibration',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__))
+
@@ -0,0 +1,354 @@
+import numpy as np
+
+# the variables sensitivities are taken to, in the order of Dual gradients and Hessians
+VARIABLES = ('S', 'sigma', 'r', 'T')
+# Greeks read off the Hessian of the price
+SECOND_ORDER = ('gamma', 'volga', 'vanna', 'charm')
+
+
+class Dual():
+    """Second order forward mode automatic differentiation number
+
+    Carries an array of values together with their gradient and Hessian with respect to the
+    n variables it was seeded from, as arrays of shape value.shape + (n,) and
+    value.shape + (n, n). Arithmetic, comparisons, indexing and the NumPy functions the pricing
+    code uses (exp, log, sqrt, power, maximum, minimum, where, sum, mean, max, min) propagate
+    the derivatives by the chain rule, so AnalyticFormula and the quant_math path functions
+    evaluated on Duals return prices with every first and second order sensitivity in one
+    vectorized sweep. Derivatives of piecewise functions are the ones of the branch taken,
+    e.g. the indicator of the exercise region for max(S - K, 0).
+
+        S, sigma, r, T = variables(S=100, sigma=0.2, r=0.05, T=1.0)
+        price = AnalyticFormula().black_scholes_price(S, 100, r, sigma, T)
+        sensitivities(price)['vanna']
+
+    Parameters
+    ----------
+    value : (np.array) values
+
+    gradient : (np.array) first derivatives, of shape value.shape + (n,)
+
+    hessian : (np.array) second derivatives, of shape value.shape + (n, n)"""
+
+    __slots__ = ('value', 'gradient', 'hessian')
+    # binary operators with arrays and NumPy scalars are dispatched to Dual
+    __array_priority__ = 1000
+
+    def __init__(self, value, gradient: np.array, hessian: np.array) -> None:
+        self.value = np.asarray(value, dtype=np.float64)
+        shape = self.value.shape
+        n = gradient.shape[-1]
+        # derivatives of values broadcast by a constant are broadcast views
+        self.gradient = gradient if gradient.shape[:-1] == shape else \
+            np.broadcast_to(gradient, shape + (n,))
+        self.hessian = hessian if hessian.shape[:-2] == shape else \
+            np.broadcast_to(hessian, shape + (n, n))
+
+    @property
+    def shape(self) -> tuple:
+        return self.value.shape
+
+    @property
+    def ndim(self) -> int:
+        return self.value.ndim
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def __repr__(self) -> str:
+        return f"Dual({self.value!r}, gradient={self.gradient!r})"
+
+    def _chain(self, value, first, second) -> 'Dual':
+        """Returns f(self) from f's value, first and second derivative at self.value"""
+
+        first = np.asarray(first)[..., np.newaxis]
+        second = np.asarray(second)[..., np.newaxis, np.newaxis]
+        g = self.gradient
+        return Dual(value, first * g,
+                    first[..., np.newaxis] * self.hessian + second * _outer(g, g))
+
+    # arithmetic
+
+    def __neg__(self) -> 'Dual':
+        return Dual(-self.value, -self.gradient, -self.hessian)
+
+    def __pos__(self) -> 'Dual':
+        return self
+
+    def __add__(self, other) -> 'Dual':
+        if isinstance(other, Dual):
+            return Dual(self.value + other.value, self.gradient + other.gradient,
+                        self.hessian + other.hessian)
+        return Dual(self.value + other, self.gradient, self.hessian)
+
+    __radd__ = __add__
+
+    def __sub__(self, other) -> 'Dual':
+        return self + (-other)
+
+    def __rsub__(self, other) -> 'Dual':
+        return (-self) + other
+
+    def __mul__(self, other) -> 'Dual':
+        if isinstance(other, Dual):
+            a, b = self.value[..., np.newaxis], other.value[..., np.newaxis]
+            cross = _outer(self.gradient, other.gradient)
+            cross += np.swapaxes(cross, -1, -2)
+            cross += self.hessian * b[..., np.newaxis]
+            cross += other.hessian * a[..., np.newaxis]
+            return Dual(self.value * other.value, self.gradient * b + other.gradient * a, cross)
+        other = np.asarray(other, dtype=np.float64)
+        return Dual(self.value * other, self.gradient * other[..., np.newaxis],
+                    self.hessian * other[..., np.newaxis, np.newaxis])
+
+    __rmul__ = __mul__
+
+    def reciprocal(self) -> 'Dual':
+        inverse = 1 / self.value
+        return self._chain(inverse, -inverse ** 2, 2 * inverse ** 3)
+
+    def __truediv__(self, other) -> 'Dual':
+        if isinstance(other, Dual):
+            return self * other.reciprocal()
+        return self * (1 / np.asarray(other, dtype=np.float64))
+
+    def __rtruediv__(self, other) -> 'Dual':
+        return self.reciprocal() * other
+
+    def __pow__(self, exponent) -> 'Dual':
+        if isinstance(exponent, Dual):
+            return (self.log() * exponent).exp()
+        exponent = np.asarray(exponent, dtype=np.float64)
+        x = self.value
+        return self._chain(x ** exponent, exponent * x ** (exponent - 1),
+                           exponent * (exponent - 1) * x ** (exponent - 2))
+
+    def __rpow__(self, base) -> 'Dual':
+        return (self * np.log(base)).exp()
+
+    # elementary functions
+
+    def exp(self) -> 'Dual':
+        value = np.exp(self.value)
+        return self._chain(value, value, value)
+
+    def log(self) -> 'Dual':
+        inverse = 1 / self.value
+        return self._chain(np.log(self.value), inverse, -inverse ** 2)
+
+    def sqrt(self) -> 'Dual':
+        value = np.sqrt(self.value)
+        return self._chain(value, 0.5 / value, -0.25 / (value * self.value))
+
+    def abs(self) -> 'Dual':
+        sign = np.sign(self.value)
+        return self._chain(np.abs(self.value), sign, 0.0)
+
+    def _select(self, other, mask) -> 'Dual':
+        """Returns self where mask holds and other elsewhere"""
+
+        other = other if isinstance(other, Dual) else _constant(other, self.gradient.shape[-1])
+        return Dual(np.where(mask, self.value, other.value),
+                    np.where(mask[..., np.newaxis], self.gradient, other.gradient),
+                    np.where(mask[..., np.newaxis, np.newaxis], self.hessian, other.hessian))
+
+    def maximum(self, other) -> 'Dual':
+        return self._select(other, self.value >= _value(other))
+
+    def minimum(self, other) -> 'Dual':
+        return self._select(other, self.value <= _value(other))
+
+    # comparisons act on the values
+
+    def __lt__(self, other):
+        return self.value < _value(other)
+
+    def __le__(self, other):
+        return self.value <= _value(other)
+
+    def __gt__(self, other):
+        return self.value > _value(other)
+
+    def __ge__(self, other):
+        return self.value >= _value(other)
+
+    # reductions and indexing
+
+    def _axis(self, axis):
+        """Axis of the values as a non negative axis, which also indexes the derivatives"""
+
+        if axis is None:
+            return tuple(range(self.ndim))
+        axes = axis if isinstance(axis, tuple) else (axis,)
+        return tuple(a % self.ndim for a in axes)
+
+    def sum(self, axis=None, keepdims: bool = False, **kwargs) -> 'Dual':
+        axis = self._axis(axis)
+        return Dual(self.value.sum(axis=axis, keepdims=keepdims),
+                    self.gradient.sum(axis=axis, keepdims=keepdims),
+                    self.hessian.sum(axis=axis, keepdims=keepdims))
+
+    def mean(self, axis=None, keepdims: bool = False, **kwargs) -> 'Dual':
+        axis = self._axis(axis)
+        count = np.prod([self.shape[a] for a in axis])
+        return self.sum(axis=axis, keepdims=keepdims) * (1 / count)
+
+    def _extremum(self, axis, arg) -> 'Dual':
+        """Maximum or minimum along axis, carrying the derivatives of the element reached"""
+
+        axis = axis % self.ndim
+        index = np.expand_dims(arg(self.value, axis=axis), axis)
+        return Dual(np.take_along_axis(self.value, index, axis).squeeze(axis),
+                    np.take_along_axis(self.gradient, index[..., np.newaxis], axis).squeeze(axis),
+                    np.take_along_axis(self.hessian, index[..., np.newaxis, np.newaxis],
+                                       axis).squeeze(axis))
+
+    def max(self, axis: int = 0, **kwargs) -> 'Dual':
+        return self._extremum(axis, np.argmax)
+
+    def min(self, axis: int = 0, **kwargs) -> 'Dual':
+        return self._extremum(axis, np.argmin)
+
+    def __getitem__(self, index) -> 'Dual':
+        # an index of the values applies to the leading axes of the derivatives
+        if not isinstance(index, tuple):
+            index = (index,)
+        if any(i is Ellipsis for i in index):
+            raise IndexError("Duals are indexed without an ellipsis.")
+        return Dual(self.value[index], self.gradient[index], self.hessian[index])
+
+    # NumPy protocols
+
+    _UFUNCS = {
+        np.add: lambda a, b: _binary('add', a, b),
+        np.subtract: lambda a, b: _binary('sub', a, b),
+        np.multiply: lambda a, b: _binary('mul', a, b),
+        np.true_divide: lambda a, b: _binary('truediv', a, b),
+        np.power: lambda a, b: _binary('pow', a, b),
+        np.negative: lambda a: -a,
+        np.positive: lambda a: a,
+        np.exp: lambda a: _lift(a).exp(),
+        np.log: lambda a: _lift(a).log(),
+        np.sqrt: lambda a: _lift(a).sqrt(),
+        np.absolute: lambda a: _lift(a).abs(),
+        np.maximum: lambda a, b: _lift(a).maximum(b) if isinstance(a, Dual) else _lift(b).maximum(a),
+        np.minimum: lambda a, b: _lift(a).minimum(b) if isinstance(a, Dual) else _lift(b).minimum(a),
+        np.less: lambda a, b: _value(a) < _value(b),
+        np.less_equal: lambda a, b: _value(a) <= _value(b),
+        np.greater: lambda a, b: _value(a) > _value(b),
+        np.greater_equal: lambda a, b: _value(a) >= _value(b),
+    }
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != '__call__' or kwargs.get('out') is not None or ufunc not in self._UFUNCS:
+            return NotImplemented
+        return self._UFUNCS[ufunc](*inputs)
+
+    def __array_function__(self, func, types, args, kwargs):
+        if func is np.where:
+            condition, x, y = args
+            condition = _value(condition).astype(bool)
+            n = next(a.gradient.shape[-1] for a in (x, y) if isinstance(a, Dual))
+            x = x if isinstance(x, Dual) else _constant(x, n)
+            return x._select(y, np.broadcast_to(condition, np.broadcast_shapes(
+                condition.shape, x.shape, np.shape(_value(y)))))
+        if func in (np.sum, np.mean, np.max, np.min):
+            array, *rest = args
+            return getattr(array, func.__name__)(*rest, **kwargs)
+        if func is np.ndim:
+            return args[0].ndim
+        if func is np.shape:
+            return args[0].shape
+        return NotImplemented
+
+
+def _outer(a: np.array, b: np.array) -> np.array:
+    return a[..., :, np.newaxis] * b[..., np.newaxis, :]
+
+
+def _binary(operator: str, a, b) -> Dual:
+    """Applies a binary operator through the Dual operand, reflected when it is b"""
+
+    if isinstance(a, Dual):
+        return getattr(a, f'__{operator}__')(b)
+    return getattr(b, f'__r{operator}__')(a)
+
+
+def _value(x):
+    return x.value if isinstance(x, Dual) else np.asarray(x)
+
+
+def _constant(value, n: int) -> Dual:
+    """Dual of a value that depends on none of the n variables"""
+
+    value = np.asarray(value, dtype=np.float64)
+    return Dual(value, np.zeros(value.shape + (n,)), np.zeros(value.shape + (n, n)))
+
+
+def _lift(x) -> Dual:
+    return x if isinstance(x, Dual) else _constant(x, len(VARIABLES))
+
+
+def is_dual(*values) -> bool:
+    """Whether any of the values is a Dual"""
+    return any(isinstance(value, Dual) for value in values)
+
+
+def variables(**values) -> tuple:
+    """Seeds the variables of a sensitivity sweep
+
+    Parameters
+    ----------
+        **values : (float or np.array) value of every variable of VARIABLES, e.g. S=100,
+                   sigma=0.2, r=0.05, T=1.0, an array value seeds a grid of evaluations
+
+    Returns
+    -------
+        duals : (tuple) one Dual per variable, in the order of VARIABLES"""
+
+    if set(values) != set(VARIABLES):
+        raise ValueError(f"Values are needed for exactly the variables {VARIABLES}.")
+    n = len(VARIABLES)
+    duals = []
+    for i, name in enumerate(VARIABLES):
+        value = np.asarray(values[name], dtype=np.float64)
+        # gradients and Hessians of the seeds are broadcast views of a basis vector and zeros
+        gradient = np.broadcast_to(np.eye(n)[i], value.shape + (n,))
+        duals.append(Dual(value, gradient, np.broadcast_to(np.zeros((n, n)), value.shape + (n, n))))
+    return tuple(duals)
+
+
+def sensitivities(price: Dual) -> dict:
+    """Reads the Greeks off a price evaluated on the Duals of variables
+
+    Parameters
+    ----------
+        price : (Dual) price differentiated with respect to VARIABLES
+
+    Returns
+    -------
+        {
+            price : (float or np.array) option price
+            delta, gamma : (float or np.array) first and second derivatives in S
+            vega, volga : (float or np.array) first and second derivatives in sigma
+            vanna : (float or np.array) derivative of delta in sigma
+            rho : (float or np.array) derivative in r
+            theta : (float or np.array) derivative in the time passed, -dV/dT
+            charm : (float or np.array) derivative of delta in the time passed, -d2V/dSdT
+        }"""
+
+    S, sigma, r, T = (VARIABLES.index(name) for name in ('S', 'sigma', 'r', 'T'))
+    g, h = price.gradient, price.hessian
+    greeks = {
+        'price': price.value,
+        'delta': g[..., S],
+        'gamma': h[..., S, S],
+        'vega': g[..., sigma],
+        'volga': h[..., sigma, sigma],
+        'vanna': h[..., S, sigma],
+        'rho': g[..., r],
+        'theta': - g[..., T],
+        'charm': - h[..., S, T],
+    }
+    return {name: float(value) if np.ndim(value) == 0 else np.array(value)
+            for name, value in greeks.items()}
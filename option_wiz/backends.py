@@ -0,0 +1,341 @@
+import importlib.util
+import os
+
+import numpy as np
+
+# per path statistics the statistic kernels can accumulate instead of returning the path
+STATISTICS = ('terminal', 'mean', 'log_mean', 'max', 'min')
+
+# constants of the splitmix64 hash behind the stream draws
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def stream_uniform(key: int, sims: np.array, step: int, lane: int) -> np.array:
+    """Returns the uniforms in (0, 1) of the paths sims at a step and lane of the stream key
+
+    Stream draws are counter based: the uniform is the splitmix64 hash of the key and the
+    counter ((sim * 2 ** 32 + step) * 8 + lane), so any path can generate its own draws at any
+    step without the others. The Numba kernels compute the same integers one path at a time."""
+
+    counter = ((sims.astype(np.uint64) << np.uint64(32)) + np.uint64(step)) * np.uint64(8) \
+        + np.uint64(lane)
+    z = np.uint64(key) + counter * _GOLDEN
+    z = (z ^ (z >> np.uint64(30))) * _MIX_1
+    z = (z ^ (z >> np.uint64(27))) * _MIX_2
+    z ^= z >> np.uint64(31)
+    return ((z >> np.uint64(11)).astype(np.float64) + 0.5) * 2.0 ** -53
+
+
+def stream_normal(key: int, sims: np.array, step: int, lane: int) -> np.array:
+    """Returns standard normals of the stream key, Box-Muller of the lanes lane and lane + 1"""
+    return np.sqrt(-2.0 * np.log(stream_uniform(key, sims, step, lane))) * \
+        np.cos(2 * np.pi * stream_uniform(key, sims, step, lane + 1))
+
+
+def poisson_table(lambda_dt: float) -> np.array:
+    """Returns the cumulative Poisson probabilities of 0, 1, ... jumps per step the stream
+    draws invert, empty when no jump is expected"""
+
+    if lambda_dt <= 0:
+        return np.empty(0)
+    probability = np.exp(- lambda_dt)
+    table = [probability]
+    while len(table) < 64:
+        probability *= lambda_dt / len(table)
+        if table[-1] + probability == table[-1]:
+            break
+        table.append(table[-1] + probability)
+    return np.array(table)
+
+
+def stream_jumps(key: int, sims: np.array, step: int, jump_table: np.array, mu_j: float,
+                 sigma_j: float) -> np.array:
+    """Returns the log jumps of the stream key at a step: the number of jumps k inverted from
+    jump_table, see poisson_table, and the sum k * mu_j + sqrt(k) * sigma_j * z of their sizes"""
+
+    counts = np.searchsorted(jump_table, stream_uniform(key, sims, step, 2), side='left')
+    return counts * mu_j + np.sqrt(counts) * sigma_j * stream_normal(key, sims, step, 3)
+
+
+def stream_heston_normals(key: int, sims: np.array, step: int, corr: float) -> tuple:
+    """Returns the price and variance normals of the stream key at a step, correlated by corr"""
+    draw_S = stream_normal(key, sims, step, 0)
+    return draw_S, corr * draw_S + np.sqrt(1 - corr ** 2) * stream_normal(key, sims, step, 2)
+
+
+class NumpyBackend():
+    """Default compute backend, whole array NumPy kernels.
+
+    Every kernel takes the random draws, or the key of a stream both backends generate the
+    same draws from, so backends only differ in how a path is stepped, the same seed giving
+    the same paths whichever backend runs."""
+
+    name = 'numpy'
+
+    def log_euler_path(self, S0: float, drift: float, diffusion: float, random_draws: np.array,
+                       random_jump_draws: np.array = None, dtype=np.float64) -> np.array:
+        """Returns the (n_steps + 1, num_sims) path S0 * exp(cumsum(drift + diffusion * draws + jumps))"""
+
+        dtype = np.dtype(dtype)
+        increments = random_draws.astype(dtype, copy=True)
+        increments *= dtype.type(diffusion)
+        increments += dtype.type(drift)
+        if random_jump_draws is not None:
+            increments += random_jump_draws.astype(dtype, copy=False)
+
+        path = np.empty((increments.shape[0] + 1,) + increments.shape[1:], dtype=dtype)
+        path[0] = np.log(S0)
+        np.cumsum(increments, axis=0, dtype=dtype, out=path[1:])
+        path[1:] += path[0]
+        return np.exp(path, out=path)
+
+    def log_euler_statistics(self, S0: float, drift: float, diffusion: float,
+                             random_draws: np.array, random_jump_draws: np.array = None,
+                             statistics: tuple = ('terminal',), dtype=np.float64) -> dict:
+        """Returns the requested STATISTICS of every path of log_euler_path"""
+        return _reduce_path(self.log_euler_path(S0, drift, diffusion, random_draws,
+                                                random_jump_draws, dtype), statistics)
+
+    def heston_path(self, S0: float, v0: float, mu: float, dt: float, kappa: float, theta: float,
+                    epsilon: float, random_draws: np.array, dtype=np.float64) -> np.array:
+        """Returns the (num_sims, n_steps + 1) Euler path of the Heston model from the
+        (num_sims, n_steps, 2) correlated standard normal draws"""
+
+        dtype = np.dtype(dtype)
+        num_sims, n_steps = random_draws.shape[:2]
+        S_t = dtype.type(S0)
+        v_t = dtype.type(v0)
+        mu, dt, kappa, theta, epsilon = (dtype.type(x) for x in (mu, dt, kappa, theta, epsilon))
+
+        prices = np.full(shape=(num_sims, n_steps+1), fill_value=S0, dtype=dtype)
+        WT = random_draws.astype(dtype, copy=False) * np.sqrt(dt)
+
+        for t in range(1, n_steps+1):
+
+            S_t = S_t*(np.exp((mu - 0.5*v_t)*dt + np.sqrt(v_t) * WT[:, t-1, 0]))
+
+            v_t = np.abs(v_t + kappa*(theta-v_t)*dt +
+                         epsilon * np.sqrt(v_t)*WT[:, t-1, 1])
+
+            prices[:, t] = S_t
+
+        return prices
+
+    def heston_statistics(self, S0: float, v0: float, mu: float, dt: float, kappa: float,
+                          theta: float, epsilon: float, random_draws: np.array,
+                          statistics: tuple = ('terminal',), dtype=np.float64) -> dict:
+        """Returns the requested STATISTICS of every path of heston_path"""
+        return _reduce_path(self.heston_path(S0, v0, mu, dt, kappa, theta, epsilon,
+                                             random_draws, dtype).T, statistics)
+
+    def log_euler_stream_statistics(self, S0: float, drifts: np.array, diffusion: float, key: int,
+                                    num_sims: int, jump_table: np.array = np.empty(0),
+                                    mu_j: float = 0.0, sigma_j: float = 0.0,
+                                    statistics: tuple = ('terminal',), dtype=np.float64) -> dict:
+        """Returns the requested STATISTICS of every path of log_euler_path, the draws being
+        generated step by step from the stream key rather than passed in
+
+        The n_steps increments are drifts[step] + diffusion * z + jumps, z from stream_normal
+        and the jumps from stream_jumps when jump_table is not empty. Paths are stepped in
+        float64, only the statistics are returned in dtype, and no (n_steps, num_sims) array
+        is allocated."""
+
+        sims = np.arange(num_sims)
+        total = np.zeros(num_sims)
+        values = _start_statistics(S0, num_sims)
+        for step, drift in enumerate(drifts):
+            increment = stream_normal(key, sims, step, 0) * diffusion + drift
+            if len(jump_table):
+                increment += stream_jumps(key, sims, step, jump_table, mu_j, sigma_j)
+            total += increment
+            log_spot = total + np.log(S0)
+            _step_statistics(values, np.exp(log_spot), log_spot)
+        return _end_statistics(values, len(drifts), statistics, dtype)
+
+    def heston_stream_statistics(self, S0: float, v0: float, carry: np.array, dt: float,
+                                 kappa: float, theta: float, epsilon: float, corr: float, key: int,
+                                 num_sims: int, statistics: tuple = ('terminal',),
+                                 dtype=np.float64) -> dict:
+        """Returns the requested STATISTICS of every path of heston_path, the draws being
+        generated step by step from the stream key by stream_heston_normals. carry holds the
+        drift mu * dt of every step, paths are stepped in float64 as in
+        log_euler_stream_statistics"""
+
+        sims = np.arange(num_sims)
+        S_t = np.full(num_sims, float(S0))
+        v_t = np.full(num_sims, float(v0))
+        values = _start_statistics(S0, num_sims)
+        for step, growth in enumerate(carry):
+            draw_S, draw_v = stream_heston_normals(key, sims, step, corr)
+            S_t = S_t * np.exp(growth - 0.5 * v_t * dt + np.sqrt(v_t) * (draw_S * np.sqrt(dt)))
+            v_t = np.abs(v_t + kappa * (theta - v_t) * dt + epsilon * np.sqrt(v_t) * (draw_v * np.sqrt(dt)))
+            _step_statistics(values, S_t, np.log(S_t))
+        return _end_statistics(values, len(carry), statistics, dtype)
+
+
+def _reduce_path(path: np.array, statistics: tuple) -> dict:
+    """Reduces a (n_steps + 1, num_sims) path to the requested per path statistics"""
+
+    reductions = {
+        'terminal': lambda: path[-1].copy(),
+        'mean': lambda: np.mean(path, axis=0),
+        'log_mean': lambda: np.mean(np.log(path), axis=0),
+        'max': lambda: np.max(path, axis=0),
+        'min': lambda: np.min(path, axis=0),
+    }
+    return {name: reductions[name]() for name in statistics}
+
+
+def _start_statistics(S0: float, num_sims: int) -> np.array:
+    """Returns the (len(STATISTICS), num_sims) running statistics of paths at S0"""
+    values = np.full((len(STATISTICS), num_sims), float(S0))
+    values[STATISTICS.index('log_mean')] = np.log(S0)
+    return values
+
+
+def _step_statistics(values: np.array, spot: np.array, log_spot: np.array) -> None:
+    """Adds the next price of every path to the running statistics"""
+    values[0] = spot
+    values[1] += spot
+    values[2] += log_spot
+    np.maximum(values[3], spot, out=values[3])
+    np.minimum(values[4], spot, out=values[4])
+
+
+def _end_statistics(values: np.array, n_steps: int, statistics: tuple, dtype) -> dict:
+    """Returns the requested statistics in dtype, the sums turned into means"""
+    values[1:3] /= n_steps + 1
+    return {name: values[STATISTICS.index(name)].astype(dtype) for name in statistics}
+
+
+class NumbaBackend(NumpyBackend):
+    """Numba compiled backend. Each kernel steps one path at a time, paths being spread over
+    threads, so no increment or volatility matrix is allocated and the statistic kernels
+    accumulate the payoff statistics while stepping without storing the path at all. The
+    draws themselves are still passed in as (n_steps, num_sims) matrices, except by the stream
+    kernels, which generate every path's draws inside its loop.
+
+    Results match NumpyBackend for the same draws, or stream key, up to the last bits of exp,
+    log and cos."""
+
+    name = 'numba'
+
+    def __init__(self) -> None:
+        from . import numba_kernels
+        self._kernels = numba_kernels
+
+    @staticmethod
+    def _scalars(dtype, *values) -> tuple:
+        return tuple(dtype.type(value) for value in values)
+
+    def _jumps(self, random_draws: np.array, random_jump_draws: np.array, dtype) -> np.array:
+        if random_jump_draws is None:
+            return np.empty((0, random_draws.shape[1]), dtype=dtype)
+        return np.ascontiguousarray(random_jump_draws, dtype=dtype)
+
+    def log_euler_path(self, S0: float, drift: float, diffusion: float, random_draws: np.array,
+                       random_jump_draws: np.array = None, dtype=np.float64) -> np.array:
+        dtype = np.dtype(dtype)
+        random_draws = np.ascontiguousarray(random_draws, dtype=dtype)
+        path = np.empty((random_draws.shape[0] + 1, random_draws.shape[1]), dtype=dtype)
+        self._kernels.log_euler_path(*self._scalars(dtype, np.log(S0), drift, diffusion),
+                                     random_draws, self._jumps(random_draws, random_jump_draws, dtype),
+                                     path)
+        return path
+
+    def log_euler_statistics(self, S0: float, drift: float, diffusion: float,
+                             random_draws: np.array, random_jump_draws: np.array = None,
+                             statistics: tuple = ('terminal',), dtype=np.float64) -> dict:
+        dtype = np.dtype(dtype)
+        random_draws = np.ascontiguousarray(random_draws, dtype=dtype)
+        values = np.empty((len(STATISTICS), random_draws.shape[1]), dtype=dtype)
+        self._kernels.log_euler_statistics(*self._scalars(dtype, np.log(S0), drift, diffusion),
+                                           random_draws, self._jumps(random_draws, random_jump_draws, dtype),
+                                           values)
+        return {name: values[STATISTICS.index(name)] for name in statistics}
+
+    def heston_path(self, S0: float, v0: float, mu: float, dt: float, kappa: float, theta: float,
+                    epsilon: float, random_draws: np.array, dtype=np.float64) -> np.array:
+        dtype = np.dtype(dtype)
+        random_draws = np.ascontiguousarray(random_draws, dtype=dtype)
+        prices = np.empty((random_draws.shape[0], random_draws.shape[1] + 1), dtype=dtype)
+        self._kernels.heston_path(*self._scalars(dtype, S0, v0, mu, dt, kappa, theta, epsilon, 0.5),
+                                  random_draws, prices)
+        return prices
+
+    def heston_statistics(self, S0: float, v0: float, mu: float, dt: float, kappa: float,
+                          theta: float, epsilon: float, random_draws: np.array,
+                          statistics: tuple = ('terminal',), dtype=np.float64) -> dict:
+        dtype = np.dtype(dtype)
+        random_draws = np.ascontiguousarray(random_draws, dtype=dtype)
+        values = np.empty((len(STATISTICS), random_draws.shape[0]), dtype=dtype)
+        self._kernels.heston_statistics(*self._scalars(dtype, S0, v0, mu, dt, kappa, theta, epsilon, 0.5),
+                                        random_draws, values)
+        return {name: values[STATISTICS.index(name)] for name in statistics}
+
+    def log_euler_stream_statistics(self, S0: float, drifts: np.array, diffusion: float, key: int,
+                                    num_sims: int, jump_table: np.array = np.empty(0),
+                                    mu_j: float = 0.0, sigma_j: float = 0.0,
+                                    statistics: tuple = ('terminal',), dtype=np.float64) -> dict:
+        values = np.empty((len(STATISTICS), num_sims))
+        self._kernels.log_euler_stream_statistics(
+            float(np.log(S0)), np.ascontiguousarray(drifts, dtype=np.float64), float(diffusion),
+            np.uint64(key), np.ascontiguousarray(jump_table, dtype=np.float64), float(mu_j),
+            float(sigma_j), values)
+        return {name: values[STATISTICS.index(name)].astype(dtype) for name in statistics}
+
+    def heston_stream_statistics(self, S0: float, v0: float, carry: np.array, dt: float,
+                                 kappa: float, theta: float, epsilon: float, corr: float, key: int,
+                                 num_sims: int, statistics: tuple = ('terminal',),
+                                 dtype=np.float64) -> dict:
+        values = np.empty((len(STATISTICS), num_sims))
+        self._kernels.heston_stream_statistics(
+            *(float(x) for x in (S0, v0)), np.ascontiguousarray(carry, dtype=np.float64),
+            *(float(x) for x in (dt, kappa, theta, epsilon, corr)), np.uint64(key), values)
+        return {name: values[STATISTICS.index(name)].astype(dtype) for name in statistics}
+
+
+_BACKEND_TYPES = {'numpy': NumpyBackend, 'numba': NumbaBackend}
+_backends = {}
+_active = None
+
+
+def available_backends() -> list:
+    """Returns the names of the backends that can be selected in this environment"""
+    return [name for name in _BACKEND_TYPES
+            if name == 'numpy' or importlib.util.find_spec(name) is not None]
+
+
+def set_backend(name: str = 'numpy') -> NumpyBackend:
+    """Selects the backend every quant_math kernel runs on from now on
+
+    Parameters
+    ----------
+        name : (str) 'numpy', 'numba', or 'auto' for numba when it is installed
+
+    Returns
+    -------
+        backend : (NumpyBackend) the selected backend"""
+
+    global _active
+    if name == 'auto':
+        name = 'numba' if 'numba' in available_backends() else 'numpy'
+    if name not in _BACKEND_TYPES:
+        raise ValueError(f"Unknown backend {name!r}, expected one of {list(_BACKEND_TYPES)} or 'auto'.")
+    if name not in available_backends():
+        raise ImportError(f"The {name} backend needs {name} to be installed.")
+    if name not in _backends:
+        _backends[name] = _BACKEND_TYPES[name]()
+    _active = _backends[name]
+    return _active
+
+
+def get_backend() -> NumpyBackend:
+    """Returns the selected backend, initially the one named by the OPTION_WIZ_BACKEND
+    environment variable, numpy by default"""
+
+    if _active is None:
+        return set_backend(os.environ.get('OPTION_WIZ_BACKEND', 'numpy'))
+    return _active
@@ -0,0 +1,168 @@
+"""Numba compiled path kernels behind backends.NumbaBackend, only imported when that backend
+is selected. Every kernel steps one path at a time and spreads the paths over threads, scalars
+are passed in the dtype of the draws so float32 paths are stepped in float32 as in NumPy.
+The stream kernels generate the draws of every path inside its loop from the counter based
+hash of backends.stream_uniform and step in float64."""
+
+import numba
+import numpy as np
+
+
+@numba.njit(parallel=True, cache=True)
+def log_euler_path(log_S0, drift, diffusion, random_draws, random_jump_draws, path):
+    n_steps, num_sims = random_draws.shape
+    jumps = random_jump_draws.shape[0] > 0
+    for sim in numba.prange(num_sims):
+        # increments are cumulated apart from log(S0) so sums round as np.cumsum does
+        total = drift * 0
+        path[0, sim] = np.exp(log_S0)
+        for step in range(n_steps):
+            increment = random_draws[step, sim] * diffusion + drift
+            if jumps:
+                increment += random_jump_draws[step, sim]
+            total += increment
+            path[step + 1, sim] = np.exp(total + log_S0)
+
+
+@numba.njit(parallel=True, cache=True)
+def log_euler_statistics(log_S0, drift, diffusion, random_draws, random_jump_draws, statistics):
+    n_steps, num_sims = random_draws.shape
+    jumps = random_jump_draws.shape[0] > 0
+    for sim in numba.prange(num_sims):
+        total = drift * 0
+        spot = np.exp(log_S0)
+        running_sum, log_sum, running_max, running_min = spot, log_S0, spot, spot
+        for step in range(n_steps):
+            increment = random_draws[step, sim] * diffusion + drift
+            if jumps:
+                increment += random_jump_draws[step, sim]
+            total += increment
+            log_spot = total + log_S0
+            spot = np.exp(log_spot)
+            running_sum += spot
+            log_sum += log_spot
+            running_max = max(running_max, spot)
+            running_min = min(running_min, spot)
+        statistics[0, sim] = spot
+        statistics[1, sim] = running_sum / (n_steps + 1)
+        statistics[2, sim] = log_sum / (n_steps + 1)
+        statistics[3, sim] = running_max
+        statistics[4, sim] = running_min
+
+
+@numba.njit(cache=True)
+def _heston_step(S_t, v_t, mu, dt, kappa, theta, epsilon, half, sqrt_dt, draw_S, draw_v):
+    S_t = S_t * np.exp((mu - half * v_t) * dt + np.sqrt(v_t) * (draw_S * sqrt_dt))
+    v_t = np.abs(v_t + kappa * (theta - v_t) * dt + epsilon * np.sqrt(v_t) * (draw_v * sqrt_dt))
+    return S_t, v_t
+
+
+@numba.njit(parallel=True, cache=True)
+def heston_path(S0, v0, mu, dt, kappa, theta, epsilon, half, random_draws, prices):
+    num_sims, n_steps = random_draws.shape[:2]
+    sqrt_dt = np.sqrt(dt)
+    for sim in numba.prange(num_sims):
+        S_t, v_t = S0, v0
+        prices[sim, 0] = S0
+        for step in range(n_steps):
+            S_t, v_t = _heston_step(S_t, v_t, mu, dt, kappa, theta, epsilon, half, sqrt_dt,
+                                    random_draws[sim, step, 0], random_draws[sim, step, 1])
+            prices[sim, step + 1] = S_t
+
+
+@numba.njit(parallel=True, cache=True)
+def heston_statistics(S0, v0, mu, dt, kappa, theta, epsilon, half, random_draws, statistics):
+    num_sims, n_steps = random_draws.shape[:2]
+    sqrt_dt = np.sqrt(dt)
+    for sim in numba.prange(num_sims):
+        S_t, v_t = S0, v0
+        running_sum, log_sum, running_max, running_min = S0, np.log(S0), S0, S0
+        for step in range(n_steps):
+            S_t, v_t = _heston_step(S_t, v_t, mu, dt, kappa, theta, epsilon, half, sqrt_dt,
+                                    random_draws[sim, step, 0], random_draws[sim, step, 1])
+            running_sum += S_t
+            log_sum += np.log(S_t)
+            running_max = max(running_max, S_t)
+            running_min = min(running_min, S_t)
+        statistics[0, sim] = S_t
+        statistics[1, sim] = running_sum / (n_steps + 1)
+        statistics[2, sim] = log_sum / (n_steps + 1)
+        statistics[3, sim] = running_max
+        statistics[4, sim] = running_min
+
+
+# constants of the splitmix64 hash of backends.stream_uniform
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+@numba.njit(cache=True)
+def _stream_uniform(key, sim, step, lane):
+    counter = ((np.uint64(sim) << np.uint64(32)) + np.uint64(step)) * np.uint64(8) + np.uint64(lane)
+    z = key + counter * _GOLDEN
+    z = (z ^ (z >> np.uint64(30))) * _MIX_1
+    z = (z ^ (z >> np.uint64(27))) * _MIX_2
+    z ^= z >> np.uint64(31)
+    return (np.float64(z >> np.uint64(11)) + 0.5) * 2.0 ** -53
+
+
+@numba.njit(cache=True)
+def _stream_normal(key, sim, step, lane):
+    return np.sqrt(-2.0 * np.log(_stream_uniform(key, sim, step, lane))) * \
+        np.cos(2 * np.pi * _stream_uniform(key, sim, step, lane + 1))
+
+
+@numba.njit(parallel=True, cache=True)
+def log_euler_stream_statistics(log_S0, drifts, diffusion, key, jump_table, mu_j, sigma_j,
+                                statistics):
+    n_steps, num_sims = drifts.shape[0], statistics.shape[1]
+    for sim in numba.prange(num_sims):
+        total = 0.0
+        spot = np.exp(log_S0)
+        running_sum, log_sum, running_max, running_min = spot, log_S0, spot, spot
+        for step in range(n_steps):
+            increment = _stream_normal(key, sim, step, 0) * diffusion + drifts[step]
+            if jump_table.shape[0] > 0:
+                # inverts the Poisson count as np.searchsorted(jump_table, u, side='left')
+                u = _stream_uniform(key, sim, step, 2)
+                count = 0
+                while count < jump_table.shape[0] and jump_table[count] < u:
+                    count += 1
+                increment += count * mu_j + np.sqrt(count) * sigma_j * _stream_normal(key, sim, step, 3)
+            total += increment
+            log_spot = total + log_S0
+            spot = np.exp(log_spot)
+            running_sum += spot
+            log_sum += log_spot
+            running_max = max(running_max, spot)
+            running_min = min(running_min, spot)
+        statistics[0, sim] = spot
+        statistics[1, sim] = running_sum / (n_steps + 1)
+        statistics[2, sim] = log_sum / (n_steps + 1)
+        statistics[3, sim] = running_max
+        statistics[4, sim] = running_min
+
+
+@numba.njit(parallel=True, cache=True)
+def heston_stream_statistics(S0, v0, carry, dt, kappa, theta, epsilon, corr, key, statistics):
+    n_steps, num_sims = carry.shape[0], statistics.shape[1]
+    sqrt_dt = np.sqrt(dt)
+    orthogonal = np.sqrt(1 - corr ** 2)
+    for sim in numba.prange(num_sims):
+        S_t, v_t = S0, v0
+        running_sum, log_sum, running_max, running_min = S0, np.log(S0), S0, S0
+        for step in range(n_steps):
+            draw_S = _stream_normal(key, sim, step, 0)
+            draw_v = corr * draw_S + orthogonal * _stream_normal(key, sim, step, 2)
+            S_t = S_t * np.exp(carry[step] - 0.5 * v_t * dt + np.sqrt(v_t) * (draw_S * sqrt_dt))
+            v_t = np.abs(v_t + kappa * (theta - v_t) * dt + epsilon * np.sqrt(v_t) * (draw_v * sqrt_dt))
+            running_sum += S_t
+            log_sum += np.log(S_t)
+            running_max = max(running_max, S_t)
+            running_min = min(running_min, S_t)
+        statistics[0, sim] = S_t
+        statistics[1, sim] = running_sum / (n_steps + 1)
+        statistics[2, sim] = log_sum / (n_steps + 1)
+        statistics[3, sim] = running_max
+        statistics[4, sim] = running_min
@@ -1,16 +1,191 @@
+import math
+import numbers
+from functools import lru_cache
+
 import numpy as np
 
+from .Instrumentation import SimulationStats, DISABLED_STATS
+from .autodiff import Dual, is_dual
+from .backends import (get_backend, _reduce_path, poisson_table, stream_heston_normals,
+                       stream_jumps, stream_normal)
+from .Curves import RateCurve, log_growth
+
+_SQRT_2 = math.sqrt(2)
+_INV_SQRT_2PI = 1 / math.sqrt(2 * math.pi)
+
+
+@lru_cache(maxsize=None)
+def _ndtr():
+    """Imports scipy.special.ndtr on first use, keeping SciPy out of the package import"""
+    from scipy.special import ndtr
+    return ndtr
+
+
+def norm_cdf(x):
+    """Standard normal cumulative distribution function. Real scalars go through math.erfc,
+    arrays through scipy.special.ndtr, both accurate in the tails unlike 1 - cdf(-x), Duals
+    carry the derivatives pdf(x) and -x pdf(x)"""
+
+    if isinstance(x, Dual):
+        density = norm_pdf(x.value)
+        return x._chain(_ndtr()(x.value), density, - x.value * density)
+    if isinstance(x, numbers.Real):
+        return 0.5 * math.erfc(-x / _SQRT_2)
+    return _ndtr()(x)
+
+
+def norm_pdf(x):
+    """Standard normal probability density function"""
+    return np.exp(-0.5 * x * x) * _INV_SQRT_2PI
+
+
+def _normal_draws(size: tuple, dtype=np.float64, loc: float = 0.0, scale: float = 1.0) -> np.array:
+    """Returns normal draws of the requested dtype. float64 draws come from np.random.normal,
+    other dtypes are generated natively by a Generator seeded from the global NumPy state so
+    np.random.seed still makes runs reproducible"""
+
+    dtype = np.dtype(dtype)
+    if dtype == np.float64:
+        return np.random.normal(loc, scale, size=size)
+
+    rng = np.random.default_rng(np.random.randint(0, 2 ** 32, size=4))
+    draws = rng.standard_normal(size=size, dtype=dtype)
+    if scale != 1.0:
+        draws *= dtype.type(scale)
+    if loc != 0.0:
+        draws += dtype.type(loc)
+    return draws
+
+
+def _jump_draws(size: tuple, lambda_dt: float, mu_j: float = -0.2, sigma_j: float = 0.3,
+                dtype=np.float64, return_counts: bool = False,
+                rng: np.random.Generator = None) -> np.array:
+    """Returns the (n_steps, num_sims) log jumps of a compound Poisson process with normal jump
+    sizes, lambda_dt jumps being expected per step, and the number of jumps of every path when
+    return_counts is set.
+
+    Only the jumps that occur are sampled: the number of jumps of every path, then the step and
+    the size of every jump, which are scattered into a zero matrix. Jumps falling on the same
+    step add up, as in Merton's model. Draws come from rng when given, from the global NumPy
+    state otherwise."""
+
+    dtype = np.dtype(dtype)
+    n_steps, num_sims = size
+    jumps = np.zeros(size, dtype=dtype)
+    poisson = np.random.poisson if rng is None else rng.poisson
+    counts = poisson(lambda_dt * n_steps, size=num_sims)
+    total = int(counts.sum())
+    if total:
+        sims = np.repeat(np.arange(num_sims), counts)
+        if rng is None:
+            steps = np.random.randint(0, n_steps, size=total)
+            sizes = _normal_draws((total,), dtype, mu_j, sigma_j)
+        else:
+            steps = rng.integers(0, n_steps, size=total)
+            sizes = rng.normal(mu_j, sigma_j, size=total).astype(dtype, copy=False)
+        np.add.at(jumps, (steps, sims), sizes)
+    return (jumps, counts) if return_counts else jumps
+
+
+def _correlated_normal_draws(num_sims: int, n_steps: int, corr: float, dtype=np.float64) -> np.array:
+    """Returns (num_sims, n_steps, 2) pairs of standard normal draws with correlation corr"""
+
+    dtype = np.dtype(dtype)
+    if dtype == np.float64:
+        return np.random.multivariate_normal(mean=np.array([0, 0]),
+                                             cov=np.array([[1, corr], [corr, 1]]),
+                                             size=(num_sims, n_steps))
+
+    draws = _normal_draws((num_sims, n_steps, 2), dtype)
+    draws[..., 1] *= dtype.type(np.sqrt(1 - corr ** 2))
+    draws[..., 1] += dtype.type(corr) * draws[..., 0]
+    return draws
+
+
+def _stream_key() -> int:
+    """Returns a key of the stream draws, drawn from the global NumPy state so np.random.seed
+    still makes runs reproducible"""
+    return int(np.random.randint(0, 2 ** 63, dtype=np.int64))
+
+
+def _stream_draws(key: int, n_steps: int, num_sims: int, lambda_dt: float = 0.0,
+                  mu_j: float = -0.2, sigma_j: float = 0.3, dtype=np.float64) -> tuple:
+    """Returns the (n_steps, num_sims) normal and jump draws of the stream key, the draws
+    gbm_stream_statistics generates path by path, for pay offs that need the whole paths"""
+
+    sims = np.arange(num_sims)
+    table = poisson_table(lambda_dt)
+    draws = np.empty((n_steps, num_sims), dtype=dtype)
+    jumps = np.zeros((n_steps, num_sims), dtype=dtype)
+    for step in range(n_steps):
+        draws[step] = stream_normal(key, sims, step, 0)
+        if len(table):
+            jumps[step] = stream_jumps(key, sims, step, table, mu_j, sigma_j)
+    return draws, jumps
+
+
+def _stream_correlated_draws(key: int, num_sims: int, n_steps: int, corr: float,
+                             dtype=np.float64) -> np.array:
+    """Returns the (num_sims, n_steps, 2) correlated draws heston_stream_statistics generates
+    path by path, see _correlated_normal_draws"""
+
+    sims = np.arange(num_sims)
+    draws = np.empty((num_sims, n_steps, 2), dtype=dtype)
+    for step in range(n_steps):
+        draws[:, step, 0], draws[:, step, 1] = stream_heston_normals(key, sims, step, corr)
+    return draws
+
+
+def _step_drifts(mu, T: float, n_steps: int) -> np.array:
+    """Returns the integral of the drift over every one of the n_steps steps, a RateCurve
+    drifting at its forward rates"""
+
+    if not isinstance(mu, RateCurve):
+        return np.full(n_steps, mu * T / n_steps)
+    return np.diff(log_growth(mu, np.arange(n_steps + 1) * (T / n_steps)))
+
+
+def _drift_growth(mu, T: float, n_steps: int) -> tuple:
+    """Splits a drift into the constant drift of the backends' kernels and, for a RateCurve
+    drift, the growth factors exp(integral of mu from 0 to t_k) of the n_steps + 1 dates. The
+    drift being deterministic, a path of the curve is the path without drift times them"""
+
+    if not isinstance(mu, RateCurve):
+        return mu, None
+    return 0.0, np.exp(log_growth(mu, np.arange(n_steps + 1) * (T / n_steps)))
+
+
+def _dual_log_euler_path(S0: Dual, drift: Dual, diffusion: Dual, random_draws: np.array,
+                         random_jump_draws: np.array = None) -> Dual:
+    """Log Euler path of the backends' log_euler_path for Dual parameters, pathwise
+    differentiated with the draws held fixed. With constant coefficients the log price after k
+    steps is log(S0) + k * drift + diffusion * W_k + J_k, linear in the coefficients, so the
+    cumulated draws W and jumps J are summed once as plain arrays and only this combination
+    carries derivatives"""
+
+    n_steps = random_draws.shape[0]
+    steps = np.arange(n_steps + 1, dtype=np.float64).reshape((-1,) + (1,) * (random_draws.ndim - 1))
+    walk = np.zeros((n_steps + 1,) + random_draws.shape[1:])
+    np.cumsum(random_draws, axis=0, dtype=np.float64, out=walk[1:])
+    log_path = np.log(S0) + steps * drift + diffusion * walk
+    if random_jump_draws is not None:
+        walk[0] = 0
+        np.cumsum(random_jump_draws, axis=0, dtype=np.float64, out=walk[1:])
+        log_path = log_path + walk
+    return np.exp(log_path)
+
 
 def gbm_simulation(S0: float, mu: float,
                    n_steps: int, T: float, sigma: float, num_sims: int,
-                   random_draws: np.array = None) -> np.array:
+                   random_draws: np.array = None, dtype=np.float64,
+                   stats: SimulationStats = DISABLED_STATS) -> np.array:
     """Simulates a Geometric Brownian motion walk
 
     Parameters
     ----------
         S0 : (float) starting point for randomness
 
-        mu : (float) drift coefficient
+        mu : (float or RateCurve) drift coefficient, a curve drifting at its forward rates
 
         n_steps : (int) number of time steps to take 
 
@@ -22,33 +197,48 @@ def gbm_simulation(S0: float, mu: float,
 
         random_draws : (np.array) pre-sample random draws of size (time_steps, num_sims)
 
+        dtype : (np.dtype) float type the draws and the path are generated and kept in
+
+        stats : (SimulationStats) collects the time and memory of the draw and path stages
+
     Returns
     -------
     """
     # each time step
 
+    dtype = np.dtype(dtype)
     dt = T / n_steps
 
     if random_draws is None:
-        random_draws = np.random.normal(0, 1, size=(n_steps, num_sims))
+        with stats.stage('draws') as stage:
+            random_draws = _normal_draws((n_steps, num_sims), dtype)
+            stage.add(random_draws)
 
-    St = np.log(S0) + np.cumsum(
-        (mu - sigma ** 2 / 2) * dt
-        + sigma * np.sqrt(dt) * random_draws, axis=0)
+    with stats.stage('path') as stage:
+        if is_dual(S0, mu, sigma, T):
+            return _dual_log_euler_path(S0, (mu - sigma ** 2 / 2) * dt, sigma * np.sqrt(dt),
+                                        random_draws)
+        mu, growth = _drift_growth(mu, T, n_steps)
+        path = get_backend().log_euler_path(S0, (mu - sigma ** 2 / 2) * dt, sigma * np.sqrt(dt),
+                                            random_draws, dtype=dtype)
+        if growth is not None:
+            path *= growth.astype(dtype)[:, np.newaxis]
+        stage.add(path)
 
-    return np.exp(np.vstack([np.log(S0) * np.ones((1, num_sims)), St]))
+    return path
 
 
 def merton_jump_diff(S0: float, mu: float, sigma: float, T: float,  n_steps: int, num_sims: int,
                      lambda_j: float = 0.1, mu_j: float = -0.2,  sigma_j: float = 0.3,
-                     random_draws: np.array = None, random_jump_draws: np.array = None):
+                     random_draws: np.array = None, random_jump_draws: np.array = None,
+                     dtype=np.float64, stats: SimulationStats = DISABLED_STATS):
     """ A jump-diffusion model for path simulation based off of Merton's analytical formula
 
     Parameters
     ----------
         S0 : (float) starting point for randomness
 
-        mu : (float) drift coefficient
+        mu : (float or RateCurve) drift coefficient, a curve drifting at its forward rates
 
         sigma : (float) variance
 
@@ -68,37 +258,53 @@ def merton_jump_diff(S0: float, mu: float, sigma: float, T: float,  n_steps: int
 
         random_jump_draws : (np.array) pre-sample random draws for the jump component of the model in size (time_steps, num_sims)
 
+        dtype : (np.dtype) float type the draws and the path are generated and kept in
+
+        stats : (SimulationStats) collects the time and memory of the draw and path stages
+
     Returns
     -------
     """
 
+    dtype = np.dtype(dtype)
     dt = T / n_steps
 
     if random_draws is None:
-        random_draws = np.random.normal(0, 1, size=(n_steps, num_sims))
+        with stats.stage('draws') as stage:
+            random_draws = _normal_draws((n_steps, num_sims), dtype)
+            stage.add(random_draws)
 
     if random_jump_draws is None:
-        random_jump_draws = np.random.normal(mu_j, sigma_j, size=(
-            n_steps, num_sims)) * np.random.poisson(lambda_j * dt, size=(n_steps, num_sims))
+        with stats.stage('jump_draws') as stage:
+            random_jump_draws = _jump_draws((n_steps, num_sims), lambda_j * dt, mu_j, sigma_j, dtype)
+            stage.add(random_jump_draws)
 
-    St = np.log(S0) + np.cumsum(
-        (mu - sigma ** 2 / 2) * dt
-        + sigma * np.sqrt(dt) * random_draws + random_jump_draws, axis=0)
+    with stats.stage('path') as stage:
+        if is_dual(S0, mu, sigma, T):
+            return _dual_log_euler_path(S0, (mu - sigma ** 2 / 2) * dt, sigma * np.sqrt(dt),
+                                        random_draws, random_jump_draws)
+        mu, growth = _drift_growth(mu, T, n_steps)
+        path = get_backend().log_euler_path(S0, (mu - sigma ** 2 / 2) * dt, sigma * np.sqrt(dt),
+                                            random_draws, random_jump_draws, dtype)
+        if growth is not None:
+            path *= growth.astype(dtype)[:, np.newaxis]
+        stage.add(path)
 
-    return np.exp(np.vstack([np.log(S0) * np.ones((1, num_sims)), St]))
+    return path
 
 
 def heston_path(S0: float, mu: float, n_steps: int, T: float,
                 sigma: float, corr: float, epsilon: float,
                 kappa: float, theta: float, num_sims: int,
-                random_draws: np.array = None) -> np.array:
+                random_draws: np.array = None, dtype=np.float64,
+                stats: SimulationStats = DISABLED_STATS) -> np.array:
     """Simulates a Geometric Brownian motion walk
 
     Parameters
     ----------
         S0 : (float) starting point for randomness
 
-        mu : (float) drift coefficient
+        mu : (float or RateCurve) drift coefficient, a curve drifting at its forward rates
 
         T : (float) total time to simulate over
 
@@ -117,39 +323,295 @@ def heston_path(S0: float, mu: float, n_steps: int, T: float,
         num_sim : (int) number of simulations to run 
 
         random_draws : (np.array) pre-sample random draws which must be
-                        np.random.multivariate_normal(mu=[0, 0], 
+                        np.random.multivariate_normal(mean=[0, 0], 
                                                       cov=np.array([[1, corr], [corr, 1]]),
                                                       size=(num_sims, n_steps))
 
+        dtype : (np.dtype) float type the draws and the path are generated and kept in
+
+        stats : (SimulationStats) collects the time and memory of the draw and path stages
+
     Returns
     -------
         path : (np.array) for asset prices over time 
     """
     # each time step
 
+    dtype = np.dtype(dtype)
     dt = T / n_steps
 
-    prices = np.full(shape=(num_sims, n_steps+1), fill_value=S0)
-    volatility = np.full(shape=(num_sims, n_steps+1), fill_value=sigma)
-    S_t = S0
-    v_t = sigma
+    # random variable with relationship corr
+    if random_draws is None:
+        with stats.stage('draws') as stage:
+            random_draws = _correlated_normal_draws(num_sims, n_steps, corr, dtype)
+            stage.add(random_draws)
+
+    with stats.stage('path') as stage:
+        mu, growth = _drift_growth(mu, T, n_steps)
+        prices = get_backend().heston_path(S0, sigma, mu, dt, kappa, theta, epsilon,
+                                           random_draws, dtype)
+        if growth is not None:
+            prices *= growth.astype(dtype)
+        stage.add(prices)
 
-    cov_matrix = np.array([[1, corr], [corr, 1]])
+    return prices
 
-    # random variable with relationship corr
-    WT = np.random.multivariate_normal(
-        mu=np.array([0, 0]),
-        cov=cov_matrix,
-        size=(num_sims, n_steps)) * np.sqrt(dt) if random_draws is None else random_draws
 
-    for t in range(1, n_steps+1):
+def gbm_path_statistics(S0: float, mu: float, sigma: float, T: float, n_steps: int, num_sims: int,
+                        statistics: tuple = ('terminal',), random_draws: np.array = None,
+                        random_jump_draws: np.array = None, dtype=np.float64,
+                        stats: SimulationStats = DISABLED_STATS) -> dict:
+    """Per path statistics of gbm_simulation, or of merton_jump_diff when jump draws are given,
+    without keeping the paths when the backend can fuse the stepping and the reduction
 
-        S_t = S_t*(np.exp((mu - 0.5*v_t)*dt + np.sqrt(v_t) * WT[:, t-1, 0]))
+    Parameters
+    ----------
+        S0, mu, sigma, T, n_steps, num_sims, random_draws, dtype, stats : as in gbm_simulation
 
-        v_t = np.abs(v_t + kappa*(theta-v_t)*dt +
-                     epsilon * np.sqrt(v_t)*WT[:, t-1, 1])
+        statistics : (tuple) names among backends.STATISTICS, e.g. ('terminal', 'log_mean')
 
-        prices[:, t] = S_t
-        volatility[:, t] = v_t
+        random_jump_draws : (np.array) jump component of size (n_steps, num_sims), see merton_jump_diff
 
-    return prices
+    Returns
+    -------
+        statistics : (dict) (num_sims,) array of every requested statistic, the path including S0
+    """
+
+    dtype = np.dtype(dtype)
+    dt = T / n_steps
+
+    if random_draws is None:
+        with stats.stage('draws') as stage:
+            random_draws = _normal_draws((n_steps, num_sims), dtype)
+            stage.add(random_draws)
+
+    with stats.stage('path') as stage:
+        mu, growth = _drift_growth(mu, T, n_steps)
+        if growth is not None and tuple(statistics) != ('terminal',):
+            # statistics along the path depend on when it grows, they are reduced from the path
+            path = get_backend().log_euler_path(S0, - sigma ** 2 / 2 * dt, sigma * np.sqrt(dt),
+                                                random_draws, random_jump_draws, dtype)
+            path *= growth.astype(dtype)[:, np.newaxis]
+            values = _reduce_path(path, statistics)
+        else:
+            values = get_backend().log_euler_statistics(S0, (mu - sigma ** 2 / 2) * dt,
+                                                        sigma * np.sqrt(dt), random_draws,
+                                                        random_jump_draws, statistics, dtype)
+            if growth is not None:
+                values['terminal'] = values['terminal'] * growth[-1].astype(dtype)
+        stage.add(*values.values())
+
+    return values
+
+
+def heston_path_statistics(S0: float, mu: float, n_steps: int, T: float,
+                           sigma: float, corr: float, epsilon: float,
+                           kappa: float, theta: float, num_sims: int,
+                           statistics: tuple = ('terminal',), random_draws: np.array = None,
+                           dtype=np.float64, stats: SimulationStats = DISABLED_STATS) -> dict:
+    """Per path statistics of heston_path, see gbm_path_statistics"""
+
+    dtype = np.dtype(dtype)
+    dt = T / n_steps
+
+    if random_draws is None:
+        with stats.stage('draws') as stage:
+            random_draws = _correlated_normal_draws(num_sims, n_steps, corr, dtype)
+            stage.add(random_draws)
+
+    with stats.stage('path') as stage:
+        mu, growth = _drift_growth(mu, T, n_steps)
+        if growth is not None and tuple(statistics) != ('terminal',):
+            # statistics along the path depend on when it grows, they are reduced from the path
+            path = get_backend().heston_path(S0, sigma, mu, dt, kappa, theta, epsilon,
+                                             random_draws, dtype).T
+            path *= growth.astype(dtype)[:, np.newaxis]
+            values = _reduce_path(path, statistics)
+        else:
+            values = get_backend().heston_statistics(S0, sigma, mu, dt, kappa, theta, epsilon,
+                                                     random_draws, statistics, dtype)
+            if growth is not None:
+                values['terminal'] = values['terminal'] * growth[-1].astype(dtype)
+        stage.add(*values.values())
+
+    return values
+
+
+def gbm_stream_statistics(S0: float, mu: float, sigma: float, T: float, n_steps: int,
+                          num_sims: int, key: int, statistics: tuple = ('terminal',),
+                          lambda_j: float = 0.0, mu_j: float = -0.2, sigma_j: float = 0.3,
+                          dtype=np.float64, stats: SimulationStats = DISABLED_STATS) -> dict:
+    """Per path statistics of merton_jump_diff, gbm_simulation when lambda_j is 0, from the
+    stream draws of key rather than pre-sampled draws
+
+    Every path generates its own draws while it is stepped, see backends.stream_uniform, so
+    memory is O(num_sims) however many steps there are. The stream draws are not those of
+    np.random: for the same seed the prices differ from gbm_path_statistics by Monte Carlo
+    noise, the jumps being inverted from a Poisson count per step rather than placed by
+    _jump_draws. A RateCurve drift is integrated step by step, and paths are stepped in
+    float64 whatever dtype the statistics are returned in.
+
+    Parameters
+    ----------
+        S0, mu, sigma, T, n_steps, num_sims, dtype, stats : as in gbm_simulation
+
+        key : (int) key of the stream draws, see _stream_key
+
+        statistics : (tuple) names among backends.STATISTICS, e.g. ('terminal', 'log_mean')
+
+        lambda_j, mu_j, sigma_j : as in merton_jump_diff
+
+    Returns
+    -------
+        statistics : (dict) (num_sims,) array of every requested statistic, the path including S0
+    """
+
+    dt = T / n_steps
+    with stats.stage('path') as stage:
+        values = get_backend().log_euler_stream_statistics(
+            S0, _step_drifts(mu, T, n_steps) - sigma ** 2 / 2 * dt, sigma * np.sqrt(dt), key,
+            num_sims, poisson_table(lambda_j * dt), mu_j, sigma_j, statistics, dtype)
+        stage.add(*values.values())
+    return values
+
+
+def heston_stream_statistics(S0: float, mu: float, n_steps: int, T: float,
+                             sigma: float, corr: float, epsilon: float,
+                             kappa: float, theta: float, num_sims: int, key: int,
+                             statistics: tuple = ('terminal',), dtype=np.float64,
+                             stats: SimulationStats = DISABLED_STATS) -> dict:
+    """Per path statistics of heston_path from the stream draws of key, see
+    gbm_stream_statistics"""
+
+    with stats.stage('path') as stage:
+        values = get_backend().heston_stream_statistics(
+            S0, sigma, _step_drifts(mu, T, n_steps), T / n_steps, kappa, theta, epsilon, corr,
+            key, num_sims, statistics, dtype)
+        stage.add(*values.values())
+    return values
+
+
+def correlation_factor(correlation: np.array, method: str = 'cholesky') -> np.array:
+    """Returns a factor L with L @ L.T equal to the correlation matrix, used to correlate
+    independent standard normal draws as L @ z
+
+    Parameters
+    ----------
+        correlation : (np.array) (n_assets, n_assets) correlation matrix
+
+        method : (str) 'cholesky', or 'eigen' which also accepts positive semi-definite matrices,
+                 negative eigenvalues from estimation noise being clipped to 0
+
+    Returns
+    -------
+        factor : (np.array) (n_assets, n_assets) factor"""
+
+    correlation = np.asarray(correlation, dtype=float)
+    if method == 'cholesky':
+        try:
+            return np.linalg.cholesky(correlation)
+        except np.linalg.LinAlgError:
+            raise ValueError("The correlation matrix is not positive definite, "
+                             "use method='eigen' to factor a semi-definite one.") from None
+    if method == 'eigen':
+        eigenvalues, eigenvectors = np.linalg.eigh(correlation)
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+    raise ValueError("method must be one of 'cholesky' or 'eigen'.")
+
+
+def correlated_gbm_terminal(S0: np.array, mu: float, sigma: np.array, T: float,
+                            factor: np.array, num_sims: int, random_draws: np.array = None,
+                            dtype=np.float64, rng: np.random.Generator = None,
+                            stats: SimulationStats = DISABLED_STATS) -> np.array:
+    """Samples the terminal prices of correlated Geometric Brownian motions exactly in one step
+
+    Parameters
+    ----------
+        S0 : (np.array) starting price of every asset
+
+        mu : (float or RateCurve) drift coefficient, the risk-free rate under the risk neutral measure
+
+        sigma : (np.array) volatility of every asset
+
+        T : (float) time till maturity in years
+
+        factor : (np.array) (n_assets, n_assets) correlation factor, see correlation_factor
+
+        num_sims : (int) number of simulations to run
+
+        random_draws : (np.array) pre-sampled independent standard normal draws of size (n_assets, num_sims)
+
+        dtype : (np.dtype) float type the draws and the prices are generated and kept in
+
+        rng : (np.random.Generator) generator of the draws, the global NumPy state when None
+
+        stats : (SimulationStats) collects the time and memory of the draw and path stages
+
+    Returns
+    -------
+        terminal : (np.array) (n_assets, num_sims) terminal prices
+    """
+
+    dtype = np.dtype(dtype)
+    S0, sigma = np.asarray(S0, dtype=float), np.asarray(sigma, dtype=float)
+
+    if random_draws is None:
+        with stats.stage('draws') as stage:
+            random_draws = rng.standard_normal((len(S0), num_sims), dtype=dtype) \
+                if rng is not None else _normal_draws((len(S0), num_sims), dtype)
+            stage.add(random_draws)
+
+    with stats.stage('path') as stage:
+        log_prices = factor.astype(dtype, copy=False) @ random_draws.astype(dtype, copy=False)
+        log_prices *= (sigma * np.sqrt(T)).astype(dtype)[:, np.newaxis]
+        drift = (mu - sigma ** 2 / 2) * T if not isinstance(mu, RateCurve) else \
+            log_growth(mu, T) - sigma ** 2 / 2 * T
+        log_prices += (np.log(S0) + drift).astype(dtype)[:, np.newaxis]
+        terminal = np.exp(log_prices, out=log_prices)
+        stage.add(terminal)
+
+    return terminal
+
+
+def correlated_gbm_simulation(S0: np.array, mu: float, sigma: np.array, T: float,
+                              factor: np.array, n_steps: int, num_sims: int,
+                              dtype=np.float64, rng: np.random.Generator = None,
+                              stats: SimulationStats = DISABLED_STATS) -> np.array:
+    """Simulates the paths of correlated Geometric Brownian motions, one step of draws at a
+    time so only the path itself is of size n_steps
+
+    Parameters
+    ----------
+        S0, mu, sigma, T, factor, num_sims, dtype, rng, stats : as in correlated_gbm_terminal
+
+        n_steps : (int) number of time steps to take
+
+    Returns
+    -------
+        path : (np.array) (n_steps + 1, n_assets, num_sims) prices of every asset
+    """
+
+    dtype = np.dtype(dtype)
+    S0, sigma = np.asarray(S0, dtype=float), np.asarray(sigma, dtype=float)
+    dt = T / n_steps
+    mu, growth = _drift_growth(mu, T, n_steps)
+    factor = factor.astype(dtype, copy=False)
+    diffusion = (sigma * np.sqrt(dt)).astype(dtype)[:, np.newaxis]
+    drift = ((mu - sigma ** 2 / 2) * dt).astype(dtype)[:, np.newaxis]
+
+    with stats.stage('path') as stage:
+        path = np.empty((n_steps + 1, len(S0), num_sims), dtype=dtype)
+        path[0] = np.log(S0).astype(dtype)[:, np.newaxis]
+        for step in range(1, n_steps + 1):
+            draws = rng.standard_normal((len(S0), num_sims), dtype=dtype) \
+                if rng is not None else _normal_draws((len(S0), num_sims), dtype)
+            np.matmul(factor, draws, out=path[step])
+            path[step] *= diffusion
+            path[step] += drift
+            path[step] += path[step - 1]
+        np.exp(path, out=path)
+        if growth is not None:
+            path *= growth.astype(dtype)[:, np.newaxis, np.newaxis]
+        stage.add(path)
+
+    return path
@@ -1,3 +1,5 @@
+import numpy as np
+
 
 # TODO: COMBINE THESE 
 def validate_option_type(option_type):
@@ -8,4 +10,15 @@ def validate_option_type(option_type):
 def validate_d_i(i):
     """Validates that a passed option_type is one of 'call' or 'put' """
     if i not in (1, 2):
-        raise ValueError("Invalid option_type. Allowed values are 1 or 2.")
\ No newline at end of file
+        raise ValueError("Invalid option_type. Allowed values are 1 or 2.")
+
+
+def option_type_sign(option_type):
+    """Returns +1 for 'call' and -1 for 'put', element-wise when option_type is array-like"""
+    option_types = np.asarray(option_type)
+    if option_types.ndim == 0:
+        validate_option_type(option_type)
+        return 1.0 if option_type == 'call' else -1.0
+    if not np.isin(option_types, ("call", "put")).all():
+        raise ValueError("Invalid option_type. Allowed values are 'call' or 'put'.")
+    return np.where(option_types == 'call', 1.0, -1.0)
@@ -29,7 +29,9 @@ setup(
     license='MIT',
     classifiers=[_f for _f in CLASSIFIERS.split('\n') if _f],
     platforms=["Windows", "Linux", "Solaris", "Mac OS-X", "Unix"],
-    packages=find_packages(where="option_py"),
-    package_dir={"": "option_wiz"},
-    python_requires=">=3.6"
+    packages=find_packages(include=["option_wiz", "option_wiz.*"]),
+    install_requires=["numpy", "scipy"],
+    extras_require={"numba": ["numba"]},
+    entry_points={"console_scripts": ["option-wiz-price=option_wiz.BatchPricer:main"]},
+    python_requires=">=3.8"
 )
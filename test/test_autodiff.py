@@ -0,0 +1,28 @@
+import numpy as np
+
+from option_wiz import autodiff
+from option_wiz.PricingModels import AnalyticFormula
+
+
+def test_second_order_chain_rule_matches_the_closed_form():
+    S, sigma, r, T = autodiff.variables(S=2.0, sigma=0.5, r=0.1, T=3.0)
+    value = np.exp(S * sigma) / T + np.sqrt(S) * np.log(T)
+    gradient = value.gradient
+    assert np.isclose(gradient[0], sigma.value * np.exp(1.0) / 3 + np.log(3) / (2 * np.sqrt(2)))
+    assert np.isclose(value.hessian[0, 1], (1 + 1.0) * np.exp(1.0) / 3)
+    assert np.isclose(value.hessian[3, 3], 2 * np.exp(1.0) / 27 - np.sqrt(2) / 9)
+    np.testing.assert_allclose(value.hessian, value.hessian.T)
+
+
+def test_sensitivities_match_the_closed_form_greeks():
+    formula = AnalyticFormula()
+    S, K, r, sigma, T, q = 100.0, np.array([90.0, 100.0, 110.0]), 0.03, 0.25, 0.75, 0.01
+    for option_type in ('call', 'put'):
+        greeks = formula.sensitivities(S, K, r, sigma, T, option_type, q)
+        np.testing.assert_allclose(greeks['price'],
+                                   formula.black_scholes_price(S, K, r, sigma, T, option_type, q))
+        np.testing.assert_allclose(greeks['delta'], formula.delta(S, K, r, sigma, T, option_type, q))
+        np.testing.assert_allclose(greeks['gamma'], formula.gamma(S, K, r, sigma, T, q))
+        np.testing.assert_allclose(greeks['vega'], formula.vega(S, K, r, sigma, T, q))
+        np.testing.assert_allclose(greeks['theta'], formula.theta(S, K, r, sigma, T, option_type, q))
+        np.testing.assert_allclose(greeks['rho'], formula.rho(S, K, r, sigma, T, option_type, q))
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from option_wiz.backends import (NumpyBackend, STATISTICS, available_backends, poisson_table,
+                                 set_backend, get_backend, stream_normal)
+from option_wiz.PayOff import PayOffEuropean
+from option_wiz.PricingModels import AnalyticFormula, MonteCarlo, StochasticVolatility
+from option_wiz.quant_math import _stream_draws, _stream_correlated_draws
+
+needs_numba = pytest.mark.skipif('numba' not in available_backends(), reason='numba not installed')
+
+
+@pytest.fixture
+def numba_backend():
+    previous = get_backend().name
+    yield set_backend('numba')
+    set_backend(previous)
+
+
+def test_stream_normals_are_standard_and_reproducible():
+    draws = stream_normal(7, np.arange(200_000), 3, 0)
+    assert abs(draws.mean()) < 0.01 and abs(draws.std() - 1) < 0.01
+    np.testing.assert_array_equal(draws[100:200], stream_normal(7, np.arange(100, 200), 3, 0))
+    assert not np.allclose(draws[:100], stream_normal(8, np.arange(100), 3, 0))
+
+
+def test_stream_statistics_step_the_stream_draws():
+    drifts = np.full(20, 0.001)
+    draws, jumps = _stream_draws(11, 20, 500, 0.2, -0.1, 0.2)
+    values = NumpyBackend().log_euler_stream_statistics(100, drifts, 0.02, 11, 500,
+                                                        poisson_table(0.2), -0.1, 0.2, STATISTICS)
+    path = NumpyBackend().log_euler_path(100, 0.001, 0.02, draws, jumps)
+    np.testing.assert_allclose(values['terminal'], path[-1], rtol=1e-12)
+    np.testing.assert_allclose(values['max'], path.max(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(values['log_mean'], np.log(path).mean(axis=0), rtol=1e-12)
+
+
+@needs_numba
+def test_numba_stream_kernels_match_numpy(numba_backend):
+    numpy = NumpyBackend()
+    drifts = np.full(30, 0.001)
+    for table in (np.empty(0), poisson_table(0.3)):
+        expected = numpy.log_euler_stream_statistics(100, drifts, 0.02, 5, 1000, table, -0.1, 0.2,
+                                                     STATISTICS)
+        actual = numba_backend.log_euler_stream_statistics(100, drifts, 0.02, 5, 1000, table,
+                                                           -0.1, 0.2, STATISTICS)
+        for name in STATISTICS:
+            np.testing.assert_allclose(actual[name], expected[name], rtol=1e-12)
+
+    expected = numpy.heston_stream_statistics(100, 0.04, drifts, 0.01, 2, 0.04, 0.3, -0.7, 5, 1000,
+                                              STATISTICS)
+    actual = numba_backend.heston_stream_statistics(100, 0.04, drifts, 0.01, 2, 0.04, 0.3, -0.7, 5,
+                                                    1000, STATISTICS)
+    for name in STATISTICS:
+        np.testing.assert_allclose(actual[name], expected[name], rtol=1e-12)
+
+
+def test_stream_correlated_draws_are_correlated():
+    draws = _stream_correlated_draws(3, 50_000, 2, -0.7)
+    assert abs(np.corrcoef(draws[:, 0, 0], draws[:, 0, 1])[0, 1] + 0.7) < 0.02
+
+
+def test_stream_draws_price_the_model():
+    np.random.seed(1)
+    engine = MonteCarlo(100, 100, 0.05, 0.2, 1, PayOffEuropean(100, 'call'), lambda_j=0,
+                        steps_per_year=52, stream_draws=True)
+    expected = AnalyticFormula().black_scholes_price(100, 100, 0.05, 0.2, 1, 'call')
+    assert abs(engine.option_price(100_000) - expected) < 0.15
+
+    np.random.seed(1)
+    heston = StochasticVolatility(100, 100, 0.05, 1, 0.04, -0.7, 0.3, 2, 0.04,
+                                  PayOffEuropean(100, 'call'), stream_draws=True)
+    heston.steps_per_year = 52
+    assert abs(heston.option_price(50_000) - 10.4) < 0.3
+
+
+def test_stream_draws_are_not_importance_sampled():
+    with pytest.raises(ValueError):
+        MonteCarlo(100, 100, 0.05, 0.2, 1, PayOffEuropean(100, 'call'), importance_sampling=True,
+                   stream_draws=True)
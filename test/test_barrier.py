@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from option_wiz.Options import BarrierOption
+from option_wiz.PayOff import PayOffBarrier
+from option_wiz.PricingModels import AnalyticFormula, MonteCarlo
+
+S, K, r, sigma, T = 100.0, 100.0, 0.05, 0.2, 1.0
+
+
+def reflected_price(H, option_type):
+    """Knock-in price by the reflection principle, (H / S)^(2 lambda - 2) times the vanilla price
+    at H^2 / S, for a down-and-in call with H <= K or an up-and-in put with H >= K"""
+    ratio = (r + sigma ** 2 / 2) / sigma ** 2
+    return (H / S) ** (2 * ratio - 2) * \
+        AnalyticFormula().black_scholes_price(H ** 2 / S, K, r, sigma, T, option_type)
+
+
+@pytest.mark.parametrize('barrier, barrier_type, option_type', [
+    (90, 'down-and-in', 'call'),
+    (110, 'up-and-in', 'put'),
+])
+def test_knock_in_matches_the_reflection_principle(barrier, barrier_type, option_type):
+    price = AnalyticFormula().barrier_price(S, K, r, sigma, T, barrier, barrier_type, option_type)
+    assert price == pytest.approx(reflected_price(barrier, option_type), rel=1e-12)
+
+
+@pytest.mark.parametrize('barrier, direction', [(120, 'up'), (80, 'down')])
+@pytest.mark.parametrize('option_type', ['call', 'put'])
+def test_knock_in_and_knock_out_add_up_to_the_vanilla(barrier, direction, option_type):
+    formula = AnalyticFormula()
+    knock_in = formula.barrier_price(S, K, r, sigma, T, barrier, f'{direction}-and-in', option_type)
+    knock_out = formula.barrier_price(S, K, r, sigma, T, barrier, f'{direction}-and-out', option_type)
+    assert knock_in > 0 and knock_out > 0
+    assert knock_in + knock_out == pytest.approx(
+        formula.black_scholes_price(S, K, r, sigma, T, option_type))
+
+
+def test_up_and_out_reference_value_and_knocked_out_spot():
+    formula = AnalyticFormula()
+    assert formula.barrier_price(S, K, r, sigma, T, 120, 'up-and-out', 'call') == \
+        pytest.approx(1.1760654, abs=1e-6)
+    assert formula.barrier_price(125, K, r, sigma, T, 120, 'up-and-out', 'call') == 0
+    with pytest.raises(ValueError):
+        formula.barrier_price(S, K, r, sigma, T, 120, 'sideways', 'call')
+
+
+@pytest.mark.parametrize('correction', ['bridge', 'bgk'])
+def test_corrections_converge_to_the_continuous_barrier_on_a_weekly_grid(correction):
+    expected = AnalyticFormula().barrier_price(S, K, r, sigma, T, 120, 'up-and-out', 'call')
+    prices = {}
+    for barrier_correction in (None, correction):
+        np.random.seed(0)
+        prices[barrier_correction] = MonteCarlo(
+            S, K, r, sigma, T, PayOffBarrier(K, 'call', 120, 'up-and-out'), lambda_j=0,
+            steps_per_year=52, barrier_correction=barrier_correction).option_price(100_000)
+    # weekly monitoring misses crossings between the dates, the corrections account for them
+    assert prices[None] - expected > 0.25
+    assert abs(prices[correction] - expected) < 0.05
+
+
+def test_barrier_option_prices_with_the_bridge_on_a_daily_grid():
+    option = BarrierOption(K, r, T, S, sigma, 120, 'up-and-out')
+    assert option.black_scholes_price() == pytest.approx(
+        AnalyticFormula().barrier_price(S, K, r, sigma, T, 120, 'up-and-out', 'call'))
+    assert option.MONTE_CARLO.barrier_correction == 'bridge'
+
+    option.MONTE_CARLO.lambda_j = 0
+    np.random.seed(0)
+    assert abs(option.monte_carlo_pricing(num_sims=50_000) - option.black_scholes_price()) < 0.05
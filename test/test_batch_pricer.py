@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from option_wiz.BatchPricer import BatchPricer, main
+from option_wiz.Curves import YieldCurve
+from option_wiz.PricingModels import AnalyticFormula
+
+ROWS = 257
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def chain():
+    rng = np.random.default_rng(0)
+    columns = {'S': rng.uniform(80, 120, ROWS), 'K': rng.uniform(80, 120, ROWS),
+               'r': np.full(ROWS, 0.03), 'q': np.full(ROWS, 0.01),
+               'sigma': rng.uniform(0.1, 0.5, ROWS), 'T': rng.uniform(0.1, 2, ROWS),
+               'option_type': np.where(rng.random(ROWS) < 0.5, 1.0, -1.0)}
+    columns['option_price'] = AnalyticFormula().black_scholes_price(
+        columns['S'], columns['K'], 0.03, columns['sigma'], columns['T'],
+        np.where(columns['option_type'] > 0, 'call', 'put'), 0.01)
+    return columns
+
+
+def expected_prices(chain, r=0.03):
+    return AnalyticFormula().black_scholes_price(
+        chain['S'], chain['K'], r, chain['sigma'], chain['T'],
+        np.where(chain['option_type'] > 0, 'call', 'put'), 0.01)
+
+
+def test_npz_chain_is_priced_in_input_order_across_chunks(tmp_path, chain):
+    np.savez(tmp_path / 'chain.npz', **chain)
+    summary = BatchPricer(('price', 'implied_volatility'), chunk_size=50, workers=0).run(
+        str(tmp_path / 'chain.npz'), str(tmp_path / 'out.npy'))
+    assert (summary['rows'], summary['chunks']) == (ROWS, 6)
+    output = np.load(tmp_path / 'out.npy')
+    np.testing.assert_allclose(output['price'], expected_prices(chain))
+    np.testing.assert_allclose(output['implied_volatility'], chain['sigma'], atol=1e-6)
+
+
+def test_csv_chain_through_the_command_line(tmp_path, chain):
+    names = ['S', 'K', 'r', 'q', 'sigma', 'T', 'option_type']
+    table = np.column_stack([chain[name] for name in names]).astype(object)
+    table[:, -1] = np.where(chain['option_type'] > 0, 'call', 'put')
+    with open(tmp_path / 'chain.csv', 'w') as file:
+        file.write(','.join(names) + '\n')
+        file.writelines(','.join(str(value) for value in row) + '\n' for row in table)
+
+    assert main([str(tmp_path / 'chain.csv'), str(tmp_path / 'out.csv'), '--fields', 'price',
+                 '--chunk-size', '100', '--workers', '0', '--quiet']) == 0
+    prices = np.loadtxt(tmp_path / 'out.csv', delimiter=',', skiprows=1)
+    np.testing.assert_allclose(prices, expected_prices(chain), rtol=1e-9)
+
+
+def test_a_rate_curve_replaces_the_rate_column(tmp_path, chain):
+    curve = YieldCurve([0.5, 1, 2], [0.02, 0.03, 0.04])
+    del chain['r']
+    np.savez(tmp_path / 'chain.npz', **chain)
+    BatchPricer(('price',), chunk_size=100, workers=0, rate_curve=curve).run(
+        str(tmp_path / 'chain.npz'), str(tmp_path / 'out.npy'))
+    np.testing.assert_allclose(np.load(tmp_path / 'out.npy')['price'],
+                               expected_prices(chain, r=curve))
+
+
+def test_missing_columns_are_reported(tmp_path, chain):
+    del chain['sigma']
+    np.savez(tmp_path / 'chain.npz', **chain)
+    with pytest.raises(ValueError, match='sigma'):
+        BatchPricer(('price',), workers=0).run(str(tmp_path / 'chain.npz'), str(tmp_path / 'out.npy'))
+
+
+def test_a_failing_chunk_reports_its_error_and_cancels_the_rest(tmp_path, chain):
+    option_type = np.where(chain['option_type'] > 0, 'call', 'put')
+    option_type[60] = 'straddle'
+    chain['option_type'] = option_type
+    np.savez(tmp_path / 'chain.npz', **chain)
+    # a fresh interpreter, forking the test process after Numba started its threads can hang
+    result = subprocess.run([sys.executable, '-m', 'option_wiz.BatchPricer', str(tmp_path / 'chain.npz'),
+                             str(tmp_path / 'out.npy'), '--fields', 'price', '--chunk-size', '10',
+                             '--workers', '1'], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 1
+    assert result.stderr.startswith('option-wiz-price: error: Invalid option_type')
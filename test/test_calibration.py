@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from option_wiz.Calibration import HestonCalibrator, MertonCalibrator
+from option_wiz.PricingModels import AnalyticFormula
+
+K = np.array([80, 90, 100, 110, 120] * 3, dtype=float)
+T = np.repeat([0.25, 1.0, 2.0], 5)
+TYPES = np.where(K < 100, 'put', 'call')
+
+
+def black_scholes(sigma):
+    return AnalyticFormula().black_scholes_price(100, K, 0.03, sigma, T, TYPES)
+
+
+def test_heston_without_vol_of_vol_prices_black_scholes():
+    calibrator = HestonCalibrator(100, K, 0.03, T, np.zeros_like(K), TYPES)
+    prices = calibrator.prices({'sigma': 0.04, 'kappa': 1.0, 'theta': 0.04, 'epsilon': 1e-3,
+                                'corr': 0.0})
+    np.testing.assert_allclose(prices, black_scholes(0.2), atol=1e-3)
+
+
+def test_merton_without_jumps_prices_black_scholes():
+    calibrator = MertonCalibrator(100, K, 0.03, T, np.zeros_like(K), TYPES)
+    prices = calibrator.prices({'sigma': 0.2, 'lambda_j': 0.0, 'mu_j': -0.1, 'sigma_j': 0.2})
+    np.testing.assert_allclose(prices, black_scholes(0.2), rtol=1e-10)
+
+
+@pytest.mark.parametrize('calibrator_type, params, tolerance', [
+    (HestonCalibrator, {'sigma': 0.05, 'kappa': 2.0, 'theta': 0.06, 'epsilon': 0.5, 'corr': -0.7},
+     0.02),
+    (MertonCalibrator, {'sigma': 0.15, 'lambda_j': 0.8, 'mu_j': -0.15, 'sigma_j': 0.2}, 0.02),
+])
+def test_calibration_recovers_the_parameters_of_its_prices(calibrator_type, params, tolerance):
+    quotes = calibrator_type(100, K, 0.03, T, np.zeros_like(K), TYPES).prices(params)
+    calibrator = calibrator_type(100, K, 0.03, T, quotes, TYPES)
+    result = calibrator.calibrate(starts=3, seed=0)
+    assert result['rmse'] < 1e-6
+    for name, value in params.items():
+        assert result['params'][name] == pytest.approx(value, rel=tolerance)
@@ -0,0 +1,38 @@
+import numpy as np
+
+from option_wiz.Curves import RateCurve, YieldCurve, DividendCurve, discount_factor, zero_rate
+from option_wiz.PricingModels import AnalyticFormula
+
+CURVE = YieldCurve([0.5, 1, 2, 5], [0.02, 0.03, 0.035, 0.04])
+
+
+def test_knots_are_repriced_and_forwards_are_flat_between_them():
+    np.testing.assert_allclose(CURVE.zero_rate(CURVE.knots), CURVE.rates)
+    forward = (0.035 * 2 - 0.03 * 1) / 1
+    np.testing.assert_allclose(CURVE.forward_rate([1.0, 1.3, 1.99]), forward)
+    np.testing.assert_allclose(-np.log(CURVE.discount(1.5)), 0.03 + forward * 0.5)
+
+
+def test_lookups_of_a_book_match_single_lookups():
+    maturities = np.linspace(0, 8, 1001)
+    np.testing.assert_allclose(CURVE.discount(maturities), [CURVE.discount(T) for T in maturities])
+    # past the last knot the last forward is extended
+    np.testing.assert_allclose(CURVE.forward_rate(8.0), CURVE.forward_rate(4.0))
+
+
+def test_a_flat_curve_prices_as_its_rate():
+    formula = AnalyticFormula()
+    T = np.array([0.3, 1.0, 4.0])
+    np.testing.assert_allclose(
+        formula.black_scholes_price(100, 100, RateCurve.flat(0.03), 0.2, T, 'call',
+                                    DividendCurve.flat(0.01)),
+        formula.black_scholes_price(100, 100, 0.03, 0.2, T, 'call', 0.01))
+    assert discount_factor(0.03, 2.0) == np.exp(-0.06) and zero_rate(0.03, 2.0) == 0.03
+
+
+def test_curves_combine_knot_by_knot():
+    dividends = DividendCurve([1, 3], [0.01, 0.015])
+    carry = CURVE - dividends
+    T = np.linspace(0.1, 6, 50)
+    np.testing.assert_allclose(carry.zero_rate(T), CURVE.zero_rate(T) - dividends.zero_rate(T))
+    np.testing.assert_allclose((CURVE + 0.01).zero_rate(T), CURVE.zero_rate(T) + 0.01)
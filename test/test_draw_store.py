@@ -0,0 +1,41 @@
+import numpy as np
+
+from option_wiz.DrawStore import DrawStore
+from option_wiz.PayOff import PayOffEuropean
+from option_wiz.PricingModels import MonteCarlo, StochasticVolatility
+
+
+def engines():
+    pay_off = PayOffEuropean(100, 'call')
+    heston = StochasticVolatility(100, 100, 0.05, 1, 0.04, -0.7, 0.3, 2, 0.04, pay_off)
+    heston.steps_per_year = 12
+    return [MonteCarlo(100, 100, 0.05, 0.2, 1, pay_off, steps_per_year=12), heston]
+
+
+def test_stored_runs_price_as_seeded_runs(tmp_path):
+    store = DrawStore(str(tmp_path))
+    for engine in engines():
+        np.random.seed(5)
+        expected = engine.option_price(1_000)
+        engine.use_draw_store(store, seed=5)
+        assert engine.option_price(1_000) == expected
+        assert engine.option_price(1_000) == expected
+    assert (store.misses, store.hits) == (2, 2)
+
+
+def test_a_reopened_store_serves_its_draws(tmp_path):
+    engine = engines()[0]
+    engine.use_draw_store(DrawStore(str(tmp_path)), seed=1)
+    price = engine.option_price(1_000)
+    reopened = DrawStore(str(tmp_path))
+    engine.use_draw_store(reopened, seed=1)
+    assert engine.option_price(1_000) == price and reopened.hits == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    store = DrawStore(str(tmp_path), max_bytes=100 * 8 * 2)
+    for seed in range(3):
+        store.fetch(seed, (100,), np.float64, (), lambda: {'draws': np.random.normal(size=100)})
+    assert len(store) == 2 and store.size() <= store.max_bytes
+    assert DrawStore.key('numpy.random.RandomState', 0, (100,), np.float64, ()) not in store
+    assert DrawStore.key('numpy.random.RandomState', 2, (100,), np.float64, ()) in store
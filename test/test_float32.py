@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from option_wiz.PayOff import PayOff, PayOffEuropean
+from option_wiz.PricingModels import AnalyticFormula, MonteCarlo, StochasticVolatility
+from option_wiz.quant_math import (_jump_draws, _normal_draws, gbm_path_statistics, gbm_simulation,
+                                   heston_path, merton_jump_diff)
+
+
+class PayOffAlternating(PayOff):
+    """Pays 2^24 and 1 on alternate paths as float32, whose float32 sum rounds the 1 away"""
+
+    path_statistics = ('terminal',)
+
+    def __init__(self) -> None:
+        super().__init__(0.0, 'call')
+
+    def pay_off(self, spot_prices: np.array) -> np.array:
+        return np.where(np.arange(spot_prices.shape[-1]) % 2, 1, 2 ** 24).astype(np.float32)
+
+
+def test_draws_and_paths_keep_the_dtype():
+    np.random.seed(0)
+    assert _normal_draws((10, 20), np.float32).dtype == np.float32
+    assert _jump_draws((10, 20), 0.1, dtype=np.float32).dtype == np.float32
+
+    args = dict(S0=100, mu=0.05, sigma=0.2, T=1, n_steps=10, num_sims=20, dtype=np.float32)
+    assert gbm_simulation(**args).dtype == np.float32
+    assert merton_jump_diff(**args).dtype == np.float32
+    statistics = gbm_path_statistics(statistics=('terminal', 'max'), **args)
+    assert all(values.dtype == np.float32 for values in statistics.values())
+    assert heston_path(100, 0.05, 10, 1, 0.04, -0.7, 0.3, 2, 0.04, 20, dtype=np.float32).dtype == \
+        np.float32
+
+
+def test_float32_draws_are_seeded_by_the_global_state():
+    np.random.seed(4)
+    draws = _normal_draws((100,), np.float32)
+    np.random.seed(4)
+    np.testing.assert_array_equal(draws, _normal_draws((100,), np.float32))
+
+
+def test_pay_offs_are_averaged_in_float64():
+    engine = MonteCarlo(100, 100, 0.0, 0.2, 1, PayOffAlternating(), lambda_j=0, dtype=np.float32,
+                        steps_per_year=4)
+    # a float32 accumulator gives (2^24 + 1 rounded to 2^24) / 2
+    assert engine.option_price(2) == (2 ** 24 + 1) / 2
+
+
+@pytest.mark.parametrize('engine_type', [MonteCarlo, StochasticVolatility])
+def test_float32_prices_agree_with_float64(engine_type):
+    def engine(dtype):
+        if engine_type is MonteCarlo:
+            return MonteCarlo(100, 100, 0.05, 0.2, 1, PayOffEuropean(100, 'call'), lambda_j=0,
+                              steps_per_year=52, dtype=dtype)
+        simulator = StochasticVolatility(100, 100, 0.05, 1, 0.04, -0.7, 0.3, 2, 0.04,
+                                         PayOffEuropean(100, 'call'), dtype=dtype)
+        simulator.steps_per_year = 52
+        return simulator
+
+    prices = {}
+    for dtype in (np.float64, np.float32):
+        np.random.seed(0)
+        simulator = engine(dtype)
+        values = simulator._discounted_pay_offs(simulator._get_pricing_params(50_000))
+        prices[dtype] = values.mean(), values.std() / np.sqrt(values.size)
+    assert abs(prices[np.float32][0] - prices[np.float64][0]) < 4 * prices[np.float64][1]
+    if engine_type is MonteCarlo:
+        expected = AnalyticFormula().black_scholes_price(100, 100, 0.05, 0.2, 1, 'call')
+        assert abs(prices[np.float32][0] - expected) < 4 * prices[np.float32][1]
@@ -0,0 +1,24 @@
+import numpy as np
+
+from option_wiz.Hedging import HedgingSimulator
+from option_wiz.PricingModels import AnalyticFormula
+
+
+def test_hedging_error_falls_with_the_rebalancing_frequency():
+    simulator = HedgingSimulator(100, 100, 0.05, 0.2, 1.0, quantity=-1)
+    weekly = simulator.run(num_sims=20_000, rebalance_per_year=52)
+    daily = simulator.run(num_sims=20_000, rebalance_per_year=252)
+
+    premium = AnalyticFormula().black_scholes_price(100, 100, 0.05, 0.2, 1.0, 'call')
+    assert abs(daily['mean']) < 0.02 * premium
+    # the error of a Black-Scholes delta hedge scales as one over the root of the rebalances
+    assert 1.8 < weekly['std'] / daily['std'] < 2.6
+    assert daily['rebalances'] == 252 and daily['transaction_costs'] == 0
+
+
+def test_transaction_costs_are_charged_to_the_pnl():
+    free = HedgingSimulator(100, 100, 0.05, 0.2, 1.0).run(num_sims=5_000, rebalance_per_year=52)
+    costly = HedgingSimulator(100, 100, 0.05, 0.2, 1.0, transaction_cost=1e-3).run(
+        num_sims=5_000, rebalance_per_year=52)
+    assert costly['transaction_costs'] > 0
+    np.testing.assert_allclose(free['mean'] - costly['mean'], costly['transaction_costs'], rtol=0.05)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from option_wiz.ImpliedVolatility import ImpliedVolatilityTracker
+from option_wiz.PricingModels import AnalyticFormula
+
+S, K, R, T = 100.0, np.array([90.0, 100.0, 110.0]), 0.03, 0.75
+
+
+def quotes(volatility):
+    return AnalyticFormula().black_scholes_price(S, K, R, np.asarray(volatility), T, 'call')
+
+
+def test_recovers_volatility_of_a_chain():
+    tracker = ImpliedVolatilityTracker()
+    np.testing.assert_allclose(tracker.update(['a', 'b', 'c'], S, K, R, T, quotes([0.2, 0.25, 0.3])),
+                               [0.2, 0.25, 0.3], atol=1e-6)
+
+
+def test_warm_start_skips_unmoved_quotes():
+    tracker = ImpliedVolatilityTracker()
+    prices = quotes([0.2, 0.25, 0.3])
+    tracker.update(['a', 'b', 'c'], S, K, R, T, prices)
+    tracker.update(['a', 'b', 'c'], S, K, R, T, prices)
+    assert np.all(tracker.iterations == 0)
+
+
+def test_forgotten_slots_are_not_shared_with_live_keys():
+    tracker = ImpliedVolatilityTracker()
+    tracker.update(['a', 'b', 'c'], S, K, R, T, quotes([0.2, 0.25, 0.3]))
+    tracker.forget(['a'])
+    tracker.update(['d'], S, K[:1], R, T, quotes([0.45])[:1])
+
+    assert 'a' not in tracker
+    assert len(tracker) == 3
+    assert tracker['b'] == pytest.approx(0.25, abs=1e-6)
+    assert tracker['c'] == pytest.approx(0.3, abs=1e-6)
+    assert tracker['d'] == pytest.approx(0.45, abs=1e-6)
+
+
+def test_forget_makes_the_next_solve_cold():
+    tracker = ImpliedVolatilityTracker()
+    tracker.update(['a'], S, K[:1], R, T, quotes([0.2])[:1])
+    tracker.forget(['a'])
+    tracker.update(['a'], S, K[:1], R, T, quotes([0.2])[:1])
+    assert tracker.iterations[0] > 0
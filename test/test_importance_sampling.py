@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from option_wiz.Calibration import MertonCalibrator
+from option_wiz.PayOff import PayOffDigital, PayOffEuropean
+from option_wiz.PricingModels import MonteCarlo
+from option_wiz.quant_math import norm_cdf
+
+
+def estimate(engine, num_sims=20_000):
+    """Returns the price and its standard error from the per path estimates"""
+    np.random.seed(0)
+    values = engine._discounted_pay_offs(engine._get_pricing_params(num_sims))
+    return values.mean(), values.std() / np.sqrt(num_sims)
+
+
+def engines(**kwargs):
+    return [MonteCarlo(importance_sampling=importance_sampling, steps_per_year=12, **kwargs)
+            for importance_sampling in (False, True)]
+
+
+def test_deep_out_of_the_money_digital():
+    d_2 = (np.log(100 / 160) + (0.05 - 0.2 ** 2 / 2)) / 0.2
+    expected = np.exp(-0.05) * norm_cdf(d_2)
+
+    plain, tilted = (estimate(engine) for engine in engines(
+        S0=100, K=160, r=0.05, sigma=0.2, T=1, pay_off=PayOffDigital(160, 'call', 1.0), lambda_j=0))
+    assert abs(tilted[0] - expected) < 4 * tilted[1]
+    assert abs(plain[0] - expected) < 4 * plain[1]
+    assert plain[1] > 4 * tilted[1]
+
+
+def test_merton_crash_put():
+    params = {'sigma': 0.15, 'lambda_j': 0.5, 'mu_j': -0.3, 'sigma_j': 0.15}
+    expected = MertonCalibrator(100, [60.0], 0.05, [1.0], [0.0], 'put').prices(params)[0]
+
+    plain, tilted = (estimate(engine) for engine in engines(
+        S0=100, K=60, r=0.05, T=1, pay_off=PayOffEuropean(60, 'put'), **params))
+    assert abs(tilted[0] - expected) < 4 * tilted[1]
+    assert plain[1] > 2 * tilted[1]
+
+
+def test_tilt_moves_the_jumps_towards_the_crash():
+    engine = MonteCarlo(100, 60, 0.05, 0.15, 1, PayOffEuropean(60, 'put'), lambda_j=0.5, mu_j=-0.3,
+                        sigma_j=0.15, importance_sampling=True)
+    tilt = engine.importance_parameters()
+    assert tilt['drift_shift'] < 0 and tilt['lambda_j'] > 0.5 and tilt['mu_j'] < -0.3
+
+    np.random.seed(0)
+    price = engine.option_price(1_000)
+    assert estimate(engine, 1_000)[0] == pytest.approx(price)
@@ -0,0 +1,55 @@
+import numpy as np
+
+from option_wiz.Instrumentation import DISABLED_STATS, SimulationStats
+from option_wiz.PayOff import PayOffEuropean
+from option_wiz.PricingModels import MonteCarlo
+
+
+def engine():
+    return MonteCarlo(100, 100, 0.05, 0.2, 1, PayOffEuropean(100, 'call'), lambda_j=0.1,
+                      steps_per_year=52)
+
+
+def test_stages_accumulate_calls_bytes_and_last_shapes():
+    stats = SimulationStats()
+    for num_sims in (10, 20):
+        with stats.stage('draws') as stage:
+            stage.add(np.zeros((5, num_sims)), np.zeros(num_sims, dtype=np.float32))
+
+    entry = stats.to_dict()['stages']['draws']
+    assert entry['calls'] == 2
+    assert entry['bytes'] == 8 * 5 * 30 + 4 * 30
+    assert entry['shapes'] == [[5, 20], [20]]
+    assert stats.total_seconds() == entry['seconds'] > 0
+    assert 'draws' in repr(stats)
+
+    stats.reset()
+    assert stats.to_dict() == {'total_seconds': 0, 'stages': {}}
+
+
+def test_instrumented_engine_records_every_stage_of_a_price():
+    simulator = engine()
+    stats = simulator.instrument()
+    assert simulator.stats is stats
+    simulator.option_price(1_000)
+    simulator.option_price(1_000)
+
+    stages = stats.to_dict()['stages']
+    assert list(stages) == ['draws', 'jump_draws', 'path', 'payoff', 'discount']
+    assert all(entry['calls'] == 2 for entry in stages.values())
+    assert stages['draws']['shapes'] == [[52, 1_000]]
+    assert stages['draws']['bytes'] == 2 * 8 * 52 * 1_000
+    assert stages['payoff']['bytes'] == 2 * 8 * 1_000
+
+
+def test_disabled_stats_record_nothing():
+    with DISABLED_STATS.stage('draws') as stage:
+        stage.add(np.zeros(10))
+    assert DISABLED_STATS.stages == {} and not DISABLED_STATS.enabled
+
+    simulator = engine()
+    assert simulator.stats is DISABLED_STATS
+    simulator.option_price(1_000)
+    assert simulator.instrument(False) is DISABLED_STATS
+    simulator.option_price(1_000)
+    assert DISABLED_STATS.to_dict() == {'total_seconds': 0, 'stages': {}}
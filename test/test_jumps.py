@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from option_wiz.Calibration import MertonCalibrator
+from option_wiz.PayOff import PayOffEuropean
+from option_wiz.PricingModels import MonteCarlo
+from option_wiz.quant_math import _jump_draws
+
+
+@pytest.mark.parametrize('lambda_dt', [0.001, 0.2])
+def test_jump_draws_are_compound_poisson(lambda_dt):
+    np.random.seed(0)
+    n_steps, num_sims, mu_j, sigma_j = 50, 40_000, -0.2, 0.3
+    jumps, counts = _jump_draws((n_steps, num_sims), lambda_dt, mu_j, sigma_j, return_counts=True)
+    assert jumps.shape == (n_steps, num_sims) and counts.shape == (num_sims,)
+
+    intensity = lambda_dt * n_steps
+    assert counts.mean() == pytest.approx(intensity, rel=0.05)
+    assert counts.var() == pytest.approx(intensity, rel=0.05)
+    # a path's log jumps sum to counts N(mu_j, sigma_j) sizes
+    totals = jumps.sum(axis=0)
+    assert totals.mean() == pytest.approx(intensity * mu_j, rel=0.05)
+    assert totals.var() == pytest.approx(intensity * (mu_j ** 2 + sigma_j ** 2), rel=0.05)
+    # jumps fall on every step alike
+    early, late = np.count_nonzero(jumps[:n_steps // 2]), np.count_nonzero(jumps[n_steps // 2:])
+    assert abs(early - late) < 4 * np.sqrt(early + late)
+    np.testing.assert_array_equal(jumps[:, counts == 0], 0)
+
+
+def test_jump_draws_from_a_generator_are_reproducible():
+    draws = [_jump_draws((20, 1_000), 0.05, rng=np.random.default_rng(3)) for _ in range(2)]
+    np.testing.assert_array_equal(*draws)
+
+
+@pytest.mark.parametrize('lambda_j', [0.1, 5.0])
+def test_merton_prices_match_the_poisson_series(lambda_j):
+    params = {'sigma': 0.2, 'lambda_j': lambda_j, 'mu_j': -0.1, 'sigma_j': 0.15}
+    K = np.array([80.0, 100.0, 120.0])
+    expected = MertonCalibrator(100, K, 0.05, 1.0, np.zeros(3), 'call').prices(params)
+    for strike, price in zip(K, expected):
+        np.random.seed(0)
+        engine = MonteCarlo(100, strike, 0.05, params['sigma'], 1, PayOffEuropean(strike, 'call'),
+                            lambda_j=lambda_j, mu_j=params['mu_j'], sigma_j=params['sigma_j'],
+                            steps_per_year=52)
+        values = engine._discounted_pay_offs(engine._get_pricing_params(100_000))
+        assert abs(values.mean() - price) < 4 * values.std() / np.sqrt(values.size)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from option_wiz.LiveBook import LiveBook, GREEK_FIELDS
+from option_wiz.PricingModels import AnalyticFormula
+
+
+def book(**kwargs):
+    return LiveBook(S=[100.0, 50.0, 100.0], K=[95.0, 55.0, 110.0], r=0.03,
+                    sigma=[0.2, 0.25, 0.3], T=[0.5, 1.0, 2.0],
+                    option_type=['call', 'put', 'call'], quantity=[1.0, -2.0, 3.0],
+                    underlying=['B', 'A', 'B'], **kwargs)
+
+
+def analytic_prices(S, sigma):
+    formula = AnalyticFormula()
+    return formula.black_scholes_price(np.array(S), np.array([95.0, 55.0, 110.0]), 0.03,
+                                       np.array(sigma), np.array([0.5, 1.0, 2.0]),
+                                       np.array(['call', 'put', 'call']))
+
+
+def test_prices_in_input_order():
+    np.testing.assert_allclose(book().prices(), analytic_prices([100, 50, 100], [0.2, 0.25, 0.3]))
+
+
+def test_update_volatility_of_every_contract_is_in_input_order():
+    live = book()
+    live.update_volatility([0.1, 0.3, 0.5])
+    np.testing.assert_allclose(live.sigma[live._position], [0.1, 0.3, 0.5])
+    np.testing.assert_allclose(live.prices(), analytic_prices([100, 50, 100], [0.1, 0.3, 0.5]))
+
+
+def test_update_volatility_of_some_contracts():
+    live = book()
+    live.update_volatility(0.4, indices=[2])
+    np.testing.assert_allclose(live.prices(), analytic_prices([100, 50, 100], [0.2, 0.25, 0.4]))
+
+
+def test_update_volatility_of_a_repeated_contract_counts_it_once():
+    live = book()
+    live.update_volatility([0.25, 0.3], indices=[1, -2])
+    np.testing.assert_allclose(live.prices(), analytic_prices([100, 50, 100], [0.2, 0.3, 0.3]))
+
+    incremental = live.book_greeks('A')
+    live.revalue()
+    for field, total in live.book_greeks('A').items():
+        assert incremental[field] == pytest.approx(total)
+
+
+def test_update_spot_only_moves_its_underlying_and_totals():
+    live = book()
+    live.update_spot('B', 104.0)
+    np.testing.assert_allclose(live.prices(), analytic_prices([104, 50, 104], [0.2, 0.25, 0.3]))
+
+    incremental = live.book_greeks()
+    live.revalue()
+    for underlying, totals in live.book_greeks().items():
+        for field in GREEK_FIELDS:
+            assert incremental[underlying][field] == pytest.approx(totals[field])
+
+
+def test_taylor_mode_falls_back_to_full_revaluation_outside_tolerance():
+    live = book(tolerance=0.01)
+    live.update_spot('A', 60.0, mode='taylor')
+    np.testing.assert_allclose(live.prices(), analytic_prices([100, 60, 100], [0.2, 0.25, 0.3]))
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from option_wiz.PayOff import PayOffBasket, PayOffBestOf, PayOffSpread
+from option_wiz.PricingModels import AnalyticFormula, MultiAssetMonteCarlo
+from option_wiz.quant_math import norm_cdf
+
+S0, SIGMA = np.array([100.0, 90.0]), np.array([0.2, 0.3])
+CORRELATION = np.array([[1.0, 0.5], [0.5, 1.0]])
+
+
+class PayOffPathBasket(PayOffBasket):
+    """Basket priced from whole paths instead of terminal draws"""
+
+    path_statistics = None
+
+
+def estimate(engine, num_sims=100_000):
+    """Returns the price and its standard error from the per path estimates"""
+    np.random.seed(0)
+    values = engine._discounted_pay_offs(engine._get_pricing_params(num_sims))
+    return values.mean(), values.std() / np.sqrt(num_sims)
+
+
+def test_equal_seeds_give_equal_prices_whatever_the_chunks():
+    pay_off = PayOffBasket(95, 'call', [0.5, 0.5])
+    engine = MultiAssetMonteCarlo(S0, 95, 0.05, SIGMA, 1, pay_off, CORRELATION)
+    np.random.seed(0)
+    price = engine.option_price(50_000)
+    np.random.seed(0)
+    assert engine.option_price(50_000) == price
+
+    # 64 KiB chunks hold 2048 paths of two assets, each drawn from a (seed, chunk) generator
+    chunked = MultiAssetMonteCarlo(S0, 95, 0.05, SIGMA, 1, pay_off, CORRELATION,
+                                   memory_cap=2 ** 16)
+    assert chunked._chunk_size(pay_off) == 2048
+    np.random.seed(0)
+    assert chunked.option_price(50_000) == pytest.approx(price, abs=0.4)
+    prices = []
+    for simulator in (engine, chunked):
+        np.random.seed(0)
+        prices.append(simulator.option_price(2048))
+    assert prices[0] == prices[1]
+
+
+@pytest.mark.parametrize('pay_off', [PayOffBasket(100, 'put', [1.0]),
+                                     PayOffPathBasket(100, 'put', [1.0])])
+def test_one_asset_basket_prices_black_scholes(pay_off):
+    engine = MultiAssetMonteCarlo([100.0], 100, 0.05, [0.2], 1, pay_off, [[1.0]], n_steps=12)
+    price, error = estimate(engine, 50_000)
+    expected = AnalyticFormula().black_scholes_price(100, 100, 0.05, 0.2, 1, 'put')
+    assert abs(price - expected) < 4 * error
+
+
+@pytest.mark.parametrize('factorization', ['cholesky', 'eigen'])
+def test_exchange_option_prices_margrabe(factorization):
+    engine = MultiAssetMonteCarlo(S0, 0, 0.05, SIGMA, 1, PayOffSpread(0, 'call'), CORRELATION,
+                                  factorization=factorization)
+    volatility = np.sqrt(SIGMA[0] ** 2 + SIGMA[1] ** 2 - 2 * CORRELATION[0, 1] * SIGMA[0] * SIGMA[1])
+    d_1 = (np.log(S0[0] / S0[1]) + volatility ** 2 / 2) / volatility
+    expected = S0[0] * norm_cdf(d_1) - S0[1] * norm_cdf(d_1 - volatility)
+
+    price, error = estimate(engine)
+    assert abs(price - expected) < 4 * error
+
+
+def test_best_of_is_worth_more_than_either_call():
+    engine = MultiAssetMonteCarlo(S0, 100, 0.05, SIGMA, 1, PayOffBestOf(100, 'call'), CORRELATION)
+    price, error = estimate(engine)
+    calls = AnalyticFormula().black_scholes_price(S0, 100, 0.05, SIGMA, 1, 'call')
+    assert calls.max() + 4 * error < price < calls.sum()
+
+
+def test_assets_must_agree():
+    with pytest.raises(ValueError):
+        MultiAssetMonteCarlo(S0, 100, 0.05, [0.2], 1, PayOffBestOf(100, 'call'), CORRELATION)
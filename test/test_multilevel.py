@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from option_wiz.Calibration import HestonCalibrator
+from option_wiz.Curves import DividendCurve, YieldCurve
+from option_wiz.Multilevel import MultilevelMonteCarlo
+from option_wiz.PayOff import (PayOffAsianOptionArithmetic, PayOffAsianOptionGeometric, PayOffBarrier,
+                               PayOffEuropean)
+from option_wiz.PricingModels import AnalyticFormula, MonteCarlo, StochasticVolatility
+
+
+def test_estimate_meets_the_target_error():
+    np.random.seed(0)
+    engine = MonteCarlo(100, 100, 0.05, 0.2, 1, PayOffEuropean(100, 'call'), lambda_j=0)
+    estimate = MultilevelMonteCarlo(engine).estimate(rmse=0.05)
+
+    expected = AnalyticFormula().black_scholes_price(100, 100, 0.05, 0.2, 1, 'call')
+    assert estimate['converged'] and estimate['rmse'] < 0.06
+    assert abs(estimate['price'] - expected) < 0.15
+    # the level corrections shrink as the coupled grids refine
+    assert estimate['variances'][-1] < 0.1 * estimate['variances'][0]
+
+
+def test_arithmetic_asian_matches_a_fine_grid():
+    pay_off = PayOffAsianOptionArithmetic(100, 'call')
+    np.random.seed(0)
+    reference = MonteCarlo(100, 100, 0.05, 0.2, 1, pay_off, lambda_j=0,
+                           steps_per_year=512).option_price(100_000)
+    # the geometric mean is below the arithmetic one, the strike of the geometric option too
+    np.random.seed(0)
+    assert reference < MonteCarlo(100, 100, 0.05, 0.2, 1, PayOffAsianOptionGeometric(100, 'call'),
+                                  lambda_j=0, steps_per_year=512).option_price(100_000)
+    np.random.seed(1)
+    estimate = MultilevelMonteCarlo(MonteCarlo(100, 100, 0.05, 0.2, 1, pay_off,
+                                               lambda_j=0)).estimate(rmse=0.02)
+    assert estimate['converged'] and estimate['levels'] > 3
+    assert abs(estimate['price'] - reference) < 0.1
+
+
+def test_arithmetic_asian_averages_every_path_separately():
+    np.random.seed(0)
+    paths = 100 * np.exp(np.cumsum(np.random.standard_normal((13, 5)) * 0.05, axis=0))
+    pay_off = PayOffAsianOptionArithmetic(100, 'call')
+    expected = np.maximum(paths[-1] - paths.mean(axis=0), 0)
+    np.testing.assert_allclose(pay_off.pay_off(paths), expected)
+    np.testing.assert_allclose(pay_off.pay_off_statistics(
+        {'terminal': paths[-1], 'mean': paths.mean(axis=0)}), expected)
+
+
+def test_corrected_barrier_converges_to_the_closed_form():
+    np.random.seed(0)
+    engine = MonteCarlo(100, 100, 0.05, 0.2, 1, PayOffBarrier(100, 'call', 120, 'up-and-out'),
+                        lambda_j=0, barrier_correction='bridge')
+    estimate = MultilevelMonteCarlo(engine).estimate(rmse=0.02)
+    expected = AnalyticFormula().barrier_price(100, 100, 0.05, 0.2, 1, 120, 'up-and-out', 'call')
+    assert abs(estimate['price'] - expected) < 3 * estimate['rmse']
+
+
+def test_heston_converges_to_the_characteristic_function_price():
+    np.random.seed(0)
+    engine = StochasticVolatility(100, 100, 0.05, 1, 0.04, -0.7, 0.3, 2, 0.04,
+                                  PayOffEuropean(100, 'call'))
+    estimate = MultilevelMonteCarlo(engine).estimate(rmse=0.05)
+    expected = HestonCalibrator(100, [100.0], 0.05, [1.0], [0.0]).prices([0.04, 2, 0.04, 0.3, -0.7])[0]
+    assert estimate['converged'] and estimate['levels'] > 2
+    assert abs(estimate['price'] - expected) < 3 * estimate['rmse']
+
+
+@pytest.mark.parametrize('r, q', [
+    (0.05, 0.03),
+    (YieldCurve([0.5, 1, 2], [0.02, 0.03, 0.04]), DividendCurve([0.5, 3], [0.01, 0.02])),
+])
+def test_paths_drift_at_the_carry_and_discount_at_r(r, q):
+    np.random.seed(0)
+    engine = MonteCarlo(100, 100, r, 0.2, 1, PayOffEuropean(100, 'call'), lambda_j=0, q=q)
+    estimate = MultilevelMonteCarlo(engine).estimate(rmse=0.05)
+    expected = AnalyticFormula().black_scholes_price(100, 100, r, 0.2, 1, 'call', q)
+    assert abs(estimate['price'] - expected) < 3 * estimate['rmse']
+
+
+def test_engine_must_simulate_paths():
+    with pytest.raises(TypeError):
+        MultilevelMonteCarlo(AnalyticFormula())
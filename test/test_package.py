@@ -0,0 +1,29 @@
+import importlib.util
+from unittest import mock
+
+import option_wiz
+
+
+def test_every_export_resolves_to_a_class_or_function_not_a_module():
+    for name in option_wiz.__all__:
+        value = getattr(option_wiz, name)
+        assert getattr(value, '__name__', None) == name
+
+
+def test_exports_never_shadow_a_submodule():
+    for name in option_wiz.__all__:
+        assert importlib.util.find_spec(f'option_wiz.{name}') is None
+
+
+def test_submodules_named_after_their_class_import_as_modules():
+    import option_wiz.PayOff as pay_off
+
+    assert pay_off.PayOffEuropean is option_wiz.PayOffEuropean
+    assert option_wiz.PayOff is pay_off
+
+
+def test_submodule_attributes_can_be_patched():
+    with mock.patch('option_wiz.LiveBook.norm_cdf') as patched:
+        from option_wiz.LiveBook import LiveBook  # noqa: F401
+        import option_wiz.LiveBook as live_book
+        assert live_book.norm_cdf is patched
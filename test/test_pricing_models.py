@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from option_wiz.Curves import DividendCurve, YieldCurve
+from option_wiz.PayOff import PayOff, PayOffEuropean
+from option_wiz.PricingModels import AnalyticFormula, MonteCarlo
+
+
+class PayOffSquare(PayOff):
+    """Smooth pay off S_T ** 2, priced S0 ** 2 * exp((r + sigma ** 2) * T)"""
+
+    path_statistics = ('terminal',)
+    smooth = True
+
+    def __init__(self) -> None:
+        super().__init__(0.0, 'call')
+
+    def pay_off(self, spot_prices: np.array) -> np.array:
+        return spot_prices[-1] ** 2
+
+
+def engine(pay_off):
+    return MonteCarlo(100, 100, 0.05, 0.2, 1, pay_off, lambda_j=0, steps_per_year=52)
+
+
+def test_pathwise_greeks_of_a_kinked_pay_off_are_first_order():
+    np.random.seed(0)
+    greeks = engine(PayOffEuropean(100, 'call')).pathwise_greeks(50_000)
+    assert set(greeks) == {'price', 'delta', 'vega', 'rho', 'theta'}
+
+    formula = AnalyticFormula()
+    assert abs(greeks['delta'] - formula.delta(100, 100, 0.05, 0.2, 1, 'call')) < 0.01
+    assert abs(greeks['vega'] - formula.vega(100, 100, 0.05, 0.2, 1)) < 1.0
+
+
+def test_pathwise_greeks_of_a_smooth_pay_off_include_second_order():
+    np.random.seed(0)
+    greeks = engine(PayOffSquare()).pathwise_greeks(50_000)
+    assert abs(greeks['gamma'] - 2 * np.exp(0.05 + 0.04)) < 0.05
+    assert abs(greeks['vanna'] - 2 * 100 * 0.4 * np.exp(0.05 + 0.04)) < 5
+
+
+@pytest.mark.parametrize('T', [1.0, 0.7, np.array([0.7, 1.5])])
+def test_sensitivities_move_curves_with_maturity(T):
+    formula = AnalyticFormula()
+    r, q = YieldCurve([0.5, 1, 2], [0.02, 0.03, 0.04]), DividendCurve([0.5, 3], [0.01, 0.02])
+    greeks = formula.sensitivities(100, 100, r, 0.2, T, 'call', q)
+    np.testing.assert_allclose(greeks['theta'], formula.theta(100, 100, r, 0.2, T, 'call', q))
+    np.testing.assert_allclose(greeks['rho'], formula.rho(100, 100, r, 0.2, T, 'call', q))
@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from option_wiz.PricingModels import AnalyticFormula
+from option_wiz.PricingService import PricingService
+
+
+def test_concurrent_requests_are_batched_and_answered_in_order():
+    async def scenario():
+        async with PricingService(max_batch_size=64, max_delay=1e-3) as service:
+            strikes = np.linspace(80, 120, 200)
+            prices = await asyncio.gather(*(service.price(100, K, 0.03, 0.2, 1.0, 'put')
+                                            for K in strikes))
+            greeks = await service.greeks(100, 100, 0.03, 0.2, 1.0)
+            volatility = await service.implied_volatility(100, strikes[100], 0.03, 1.0, prices[100], 'put')
+            return strikes, prices, greeks, volatility, service.metrics()
+
+    strikes, prices, greeks, volatility, metrics = asyncio.run(scenario())
+    formula = AnalyticFormula()
+    np.testing.assert_allclose(prices, formula.black_scholes_price(100, strikes, 0.03, 0.2, 1.0, 'put'))
+    assert greeks['gamma'] == pytest.approx(formula.gamma(100, 100, 0.03, 0.2, 1.0))
+    assert volatility == pytest.approx(0.2, abs=1e-6)
+    assert metrics['requests'] == 202 and 1 < metrics['mean_batch_size'] <= 64
+
+
+def test_invalid_requests_are_rejected():
+    async def scenario():
+        async with PricingService() as service:
+            with pytest.raises(ValueError):
+                await service.request('price', S=100, K=100)
+            with pytest.raises(ValueError):
+                await service.request('forward', S=100)
+
+    asyncio.run(scenario())
+
+
+def test_socket_answers_newline_delimited_json():
+    async def scenario():
+        async with PricingService() as service:
+            server = await service.serve(port=0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            for request_id, K in enumerate((90, 110)):
+                writer.write((json.dumps({'id': request_id, 'kind': 'price', 'S': 100, 'K': K,
+                                          'r': 0.03, 'sigma': 0.2, 'T': 1.0}) + '\n').encode())
+            writer.write(b'{"id": 2, "kind": "price"}\n')
+            await writer.drain()
+            replies = [json.loads(await reader.readline()) for _ in range(3)]
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return {reply['id']: reply for reply in replies}
+
+    replies = asyncio.run(scenario())
+    assert replies[0]['result'] == pytest.approx(
+        AnalyticFormula().black_scholes_price(100, 90, 0.03, 0.2, 1.0, 'call'))
+    assert 'error' in replies[2]
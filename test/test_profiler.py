@@ -0,0 +1,35 @@
+import pytest
+
+from option_wiz.PayOff import PayOffEuropean
+from option_wiz.PricingModels import AnalyticFormula, MonteCarlo, Simulator
+from option_wiz.Profiler import EngineProfiler, analytic_price, candidate_engines
+
+
+def engine():
+    return MonteCarlo(100, 100, 0.05, 0.2, 1, PayOffEuropean(100, 'call'), lambda_j=0)
+
+
+def test_every_engine_must_simulate_its_pay_offs():
+    class PriceOnly(Simulator):
+        def _get_pricing_params(self, num_sims):
+            return {}
+
+        def _model_pricing(self):
+            return 0.0
+
+    with pytest.raises(TypeError):
+        PriceOnly(100, 100, 0.05, 0.2, 1, PayOffEuropean(100, 'call'))
+
+
+def test_analytic_reference_is_black_scholes():
+    expected = AnalyticFormula().black_scholes_price(100, 100, 0.05, 0.2, 1, 'call')
+    assert analytic_price(engine()) == pytest.approx(expected)
+
+
+def test_profile_fits_the_per_path_spread_of_the_pay_offs():
+    candidates = candidate_engines(engine(), steps_per_year=(0, 12))
+    profile = EngineProfiler(candidates, budgets=(500, 2_000), repeats=2, seed=3).run()
+    for candidate in profile.candidates:
+        # the discounted pay off of an at the money call spreads by about 14.7
+        assert 10 < candidate['fit']['path_std'] < 20
+    assert profile.select(tolerance=1.0)['engine'] in candidates
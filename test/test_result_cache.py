@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from option_wiz.Curves import DividendCurve, RateCurve, YieldCurve
+from option_wiz.DrawStore import DrawStore
+from option_wiz.PayOff import PayOffEuropean
+from option_wiz.PricingModels import MonteCarlo
+from option_wiz.ResultCache import ResultCache
+
+
+def engine(r=0.05, **kwargs):
+    return MonteCarlo(100, 100, r, 0.2, 1, PayOffEuropean(100, 'call'), lambda_j=0,
+                      steps_per_year=12, **kwargs)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with ResultCache(str(tmp_path / 'results.sqlite')) as cache:
+        yield cache
+
+
+def test_reruns_are_served_from_the_cache(cache):
+    engines = [engine(), engine(sigma_j=0.4)]
+    first = cache.price_batch(engines + [engine()], num_sims=2_000, seed=1)
+    assert first[0] == first[2]
+    np.random.seed(1)
+    assert first[0] == engine().option_price(2_000)
+
+    assert cache.price_batch(engines, num_sims=2_000, seed=1) == first[:2]
+    assert cache.report()['hits'] == 2
+
+
+def test_membership_leaves_counters_and_recency_alone(cache):
+    key = ResultCache.key(engine(), 2_000, 1)
+    cache.put(key, 1.0)
+    last_used = cache._connection.execute("SELECT last_used FROM results").fetchone()[0]
+    assert key in cache and 'missing' not in cache
+    assert (cache.hits, cache.misses) == (0, 0)
+    assert cache._connection.execute("SELECT last_used FROM results").fetchone()[0] == last_used
+
+
+def test_expired_results_are_not_contained(tmp_path):
+    with ResultCache(str(tmp_path / 'results.sqlite'), ttl=-1) as cache:
+        cache._connection.execute("INSERT INTO results VALUES ('old', '1.0', 3, 0, 0)")
+        assert 'old' not in cache
+
+
+def test_keys_ignore_instrumentation_and_draw_stores(tmp_path):
+    instrumented = engine()
+    instrumented.instrument()
+    assert ResultCache.key(instrumented, 2_000, 1) == ResultCache.key(engine(), 2_000, 1)
+
+    stored = engine()
+    stored.use_draw_store(DrawStore(str(tmp_path / 'draws')), seed=1)
+    assert 'draw_store' not in stored.description() and stored.description()['seed'] == 1
+
+
+def test_attributes_that_cannot_be_described_raise(cache):
+    described = engine()
+    described.custom = object()
+    with pytest.raises(TypeError):
+        ResultCache.key(described, 2_000, 1)
+
+
+def test_keys_tell_rate_and_dividend_curves_apart():
+    keys = {ResultCache.key(engine(r=r, q=q), 2_000, 1) for r, q in (
+        (YieldCurve([0.5, 1, 2], [0.02, 0.03, 0.04]), 0.0),
+        (YieldCurve([0.5, 1, 2], [0.02, 0.03, 0.05]), 0.0),
+        (YieldCurve([0.5, 1.5, 2], [0.02, 0.03, 0.04]), 0.0),
+        (RateCurve([0.5, 1, 2], [0.02, 0.03, 0.04]), 0.0),
+        (YieldCurve([0.5, 1, 2], [0.02, 0.03, 0.04]), DividendCurve([1], [0.01])),
+        (0.03, DividendCurve([1], [0.01])),
+        (0.03, DividendCurve([1], [0.02])))}
+    assert len(keys) == 7
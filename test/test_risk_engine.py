@@ -0,0 +1,40 @@
+import numpy as np
+
+from option_wiz.Options import EuropeanOption
+from option_wiz.PricingModels import AnalyticFormula
+from option_wiz.RiskEngine import ScenarioEngine, ValueAtRisk
+
+
+def book():
+    return [EuropeanOption(95, 0.03, 0.5, 100, 0.2, 'call'),
+            EuropeanOption(105, 0.03, 1.0, 100, 0.25, 'put'),
+            EuropeanOption(50, 0.03, 0.25, 48, 0.3, 'call')]
+
+
+def test_scenario_pnl_is_the_analytic_repricing():
+    engine = ScenarioEngine(book(), quantity=[1, -2, 3], underlying=['A', 'A', 'B'],
+                            memory_cap=2_000)
+    result = engine.run(spot_shocks=[-0.1, 0.0, 0.1], vol_shocks=[0.0, 0.05],
+                        rate_shocks=[0.0, 0.01], full_cube=True)
+
+    formula = AnalyticFormula()
+    shocked = formula.black_scholes_price(100 * 1.1, 105, 0.04, 0.3, 1.0, 'put')
+    base = formula.black_scholes_price(100, 105, 0.03, 0.25, 1.0, 'put')
+    np.testing.assert_allclose(result['prices'][1, 2, 1, 1], shocked)
+    np.testing.assert_allclose(result['pnl'][0, 1, 0, 0], 0.0, atol=1e-12)
+    np.testing.assert_allclose(result['book_pnl'], result['pnl'].sum(axis=0))
+    np.testing.assert_allclose(result['pnl'][0],
+                               result['prices'][0] - 2 * result['prices'][1] - result['base_value'][0])
+    np.testing.assert_allclose(result['prices'][1, 1, 0, 0], base)
+
+
+def test_value_at_risk_contributions_add_up_to_the_shortfall():
+    risk = ValueAtRisk(book(), quantity=[1, -2, 3], underlying=['A', 'A', 'B'], horizon_days=5)
+    result = risk.run(num_scenarios=20_000, chunk_size=3_000, num_bootstrap=100, seed=4)
+    assert 0 < result['var'] <= result['es']
+    np.testing.assert_allclose(np.sum(result['contributions']), result['es'])
+    assert result['var_interval'][0] <= result['var'] <= result['var_interval'][1]
+
+    approximate = risk.run(num_scenarios=20_000, chunk_size=3_000, num_bootstrap=100, seed=4,
+                           approximate=True)
+    assert abs(approximate['var'] - result['var']) < 0.1 * result['var']
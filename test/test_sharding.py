@@ -0,0 +1,43 @@
+import pytest
+
+from option_wiz.Curves import YieldCurve
+from option_wiz.PayOff import PayOffEuropean
+from option_wiz.PricingModels import MonteCarlo
+from option_wiz.Sharding import RunState, ShardedRun
+
+
+def sharded_run(r=0.05, **kwargs):
+    engine = MonteCarlo(100, 100, r, 0.2, 1, PayOffEuropean(100, 'call'), lambda_j=0,
+                        steps_per_year=12)
+    return ShardedRun(engine, seed=7, num_sims=5_000, batch_size=1_000, **kwargs)
+
+
+def test_merged_shards_give_the_single_run_estimates_exactly():
+    run = sharded_run(greeks=True)
+    single = run.run().estimates()
+    merged = RunState.merge([run.run(shard, 3) for shard in (2, 0, 1)]).estimates()
+    assert merged == single
+
+
+def test_checkpoint_resumes_a_shard(tmp_path):
+    run = sharded_run()
+    checkpoint = str(tmp_path / 'shard.json')
+    state = run.state()
+    run.run_batch(state, 0)
+    state.save(checkpoint)
+    resumed = run.run(checkpoint=checkpoint)
+    assert resumed.estimates() == run.run().estimates()
+
+
+def test_shards_of_different_runs_do_not_merge():
+    state = sharded_run().run(0, 2)
+    other = ShardedRun(MonteCarlo(100, 110, 0.05, 0.2, 1, PayOffEuropean(110, 'call'), lambda_j=0,
+                                  steps_per_year=12), seed=7, num_sims=5_000, batch_size=1_000)
+    with pytest.raises(ValueError):
+        RunState.merge([state, other.run(1, 2)])
+
+
+def test_runs_on_different_curves_are_different_engines():
+    engines = {sharded_run(r=YieldCurve([0.5, 1, 2], rates)).engine
+               for rates in ([0.02, 0.03, 0.04], [0.02, 0.03, 0.05])}
+    assert len(engines) == 2
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from option_wiz.PayOff import PayOffEuropean
+from option_wiz.PricingModels import AnalyticFormula, MonteCarlo, StochasticVolatility
+from option_wiz.VolatilitySurface import SVISlice, VolatilitySurface
+
+S, R = 100.0, 0.02
+
+
+@pytest.fixture(scope='module')
+def surface():
+    slices = [SVISlice(0.01, 0.1, -0.4, 0.0, 0.2, 0.5), SVISlice(0.03, 0.12, -0.3, 0.05, 0.25, 1.5)]
+    K = np.linspace(70, 130, 25)
+    T = np.repeat([0.5, 1.5], K.size)
+    k = np.log(np.tile(K, 2) / (S * np.exp(R * T)))
+    volatility = np.concatenate([svi_slice.implied_volatility(k[T == svi_slice.T])
+                                 for svi_slice in slices])
+    return VolatilitySurface.from_implied_volatilities(S, np.tile(K, 2), R, T, volatility)
+
+
+def test_fitted_surface_reproduces_its_quotes(surface):
+    svi_slice = SVISlice(0.01, 0.1, -0.4, 0.0, 0.2, 0.5)
+    K = np.array([80.0, 100.0, 120.0])
+    expected = svi_slice.implied_volatility(np.log(K / (S * np.exp(R * 0.5))))
+    np.testing.assert_allclose(surface(K, 0.5), expected, rtol=1e-4)
+
+
+def test_total_variance_interpolates_between_expiries(surface):
+    variance = surface.total_variance(np.array([100.0, 100.0, 100.0]), np.array([0.5, 1.0, 1.5]))
+    assert variance[0] < variance[1] < variance[2]
+
+
+def test_analytic_pricer_reads_the_surface(surface):
+    formula = AnalyticFormula()
+    volatility = float(surface(105.0, 1.0))
+    assert formula.black_scholes_price(S, 105.0, R, surface, 1.0) == \
+        pytest.approx(formula.black_scholes_price(S, 105.0, R, volatility, 1.0))
+
+
+def test_simulators_read_a_volatility_and_heston_a_variance(surface):
+    volatility = float(surface(105.0, 1.0))
+    pay_off = PayOffEuropean(105.0, 'call')
+    assert MonteCarlo(S, 105.0, R, surface, 1.0, pay_off).sigma == pytest.approx(volatility)
+    heston = StochasticVolatility(S, 105.0, R, 1.0, surface, -0.7, 0.3, 2.0, 0.04, pay_off)
+    assert heston.sigma == pytest.approx(volatility ** 2)